@@ -0,0 +1,87 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: object) -> str:
+    """Weak ETag over `parts`; equal parts mean an equivalent page."""
+    digest = hashlib.blake2b(
+        "|".join(repr(part) for part in parts).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def fingerprint_directory(directory: Path, pattern: str = "*.html") -> str:
+    """Digest of the files matching `pattern`, so a deploy that changes a
+    template also changes every ETag built with it."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(directory.rglob(pattern)):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def http_date(moment: datetime) -> str:
+    # Timestamps are stored as naive UTC.
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """Headers sent with both the full page and its 304.
+
+    Pages differ per viewer, so shared caches are kept out and browsers
+    revalidate every time.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Whether the client's cached copy is current (RFC 9110, section 13.2.2).
+
+    If-None-Match wins when present; If-Modified-Since is only consulted
+    without it, and only when the page has a Last-Modified at all.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second precision.
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # GET uses the weak comparison: W/"x" and "x" match.
+    wanted = _opaque(etag)
+    return any(_opaque(candidate) == wanted for candidate in header.split(","))
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
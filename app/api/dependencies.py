@@ -1,27 +1,289 @@
+import inspect
+from collections.abc import AsyncIterable
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from datetime import timedelta
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Generator, Iterable, List, Optional, Union
 
 from fastapi import Cookie, Depends
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.config import Settings, get_settings
+from app.domain.events import ImageVariantsReady, PostCreated, SessionRevoked
+from app.domain.sessions import SessionPolicy
 from app.domain.interfaces import (
     UserRepository,
     PostRepository,
     SessionRepository,
+    AsyncUserRepository,
+    AsyncPostRepository,
+    AsyncSessionRepository,
     ImageStorageService,
+    PasswordHasher,
 )
-from app.infrastructure.db import SessionLocal
+from app.infrastructure.db import (
+    BASE_DIR,
+    SessionLocal,
+    engine_pools,
+    get_engine,
+    ReadSessionLocal,
+    get_async_session_factory,
+    get_async_read_session_factory,
+)
+from app.infrastructure.change_bus import SqliteChangeBus
+from app.infrastructure.hashing_pool import PooledPasswordHasher, TimedPasswordHasher
+from app.infrastructure.image_variants import ImageVariantPipeline
+from app.infrastructure.metrics import MetricsRegistry, PoolMetrics, Sample
 from app.infrastructure.repositories import (
     SqlAlchemyUserRepository,
     SqlAlchemyPostRepository,
     SqlAlchemySessionRepository,
+    AsyncSqlAlchemyUserRepository,
+    AsyncSqlAlchemyPostRepository,
+    AsyncSqlAlchemySessionRepository,
+    AuthorNameCache,
+)
+from app.infrastructure.session_reaper import SessionReaper
+from app.infrastructure.session_tokens import (
+    AsyncSignedTokenSessionRepository,
+    SessionTokenCodec,
+    SignedTokenSessionRepository,
+    TokenRevocationList,
+    parse_signing_keys,
 )
+from app.infrastructure.storage_cas import ContentAddressedImageStorage
 from app.infrastructure.storage_local import LocalImageStorage
-from app.use_cases.auth_service import AuthService
-from app.use_cases.blog_service import BlogService
+from app.infrastructure.ttl_cache import TTLCache
+from app.use_cases.auth_service import AuthService, AsyncAuthService, BcryptPasswordHasher
+from app.use_cases.blog_service import BlogService, AsyncBlogService
+from .feeds import RenderedFeed
+from .page_cache import PageCache, RenderedPage
+from .request_metrics import HttpMetrics
+from .static_assets import StaticAssets
+
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "web" / "static"
+UPLOAD_DIR = STATIC_DIR / "uploads"
+
+static_assets = StaticAssets(STATIC_DIR, exclude=("uploads",))
+
+_settings = get_settings()
+TEMPLATE_CACHE_DIR = Path(_settings.template_cache_dir or BASE_DIR / "app_data" / "template_cache")
+
+# Shared with the other workers once started (see main.lifespan).
+event_bus = SqliteChangeBus(
+    get_engine,
+    poll_seconds=_settings.change_bus_poll_seconds,
+    retention_seconds=_settings.change_log_retention_seconds,
+)
+
+feed_page_cache: "PageCache[RenderedPage]" = PageCache(
+    max_entries=_settings.page_cache_max_entries,
+    ttl_seconds=_settings.page_cache_ttl_seconds,
+    stale_seconds=_settings.page_cache_stale_seconds,
+)
+event_bus.subscribe(PostCreated, lambda event: feed_page_cache.invalidate(), cross_worker=True)
+# Serialized /feed.xml pages; they carry no per-viewer or image content, so
+# only new posts change them.
+feed_xml_cache: "PageCache[RenderedFeed]" = PageCache(
+    max_entries=_settings.page_cache_max_entries,
+    ttl_seconds=_settings.feed_cache_ttl_seconds,
+)
+event_bus.subscribe(PostCreated, lambda event: feed_xml_cache.invalidate(), cross_worker=True)
+
+
+class CurrentUser:
+    def __init__(
+        self,
+        id: int,
+        username: str,
+    ) -> None:
+        self.id = id
+        self.username = username
+
+
+session_user_cache: "TTLCache[str, CurrentUser]" = TTLCache(
+    max_entries=_settings.session_cache_max_entries,
+    ttl_seconds=_settings.session_cache_ttl_seconds,
+)
+event_bus.subscribe(
+    SessionRevoked, lambda event: session_user_cache.pop(event.session_id), cross_worker=True
+)
+
+
+def session_policy_for(settings: Settings) -> SessionPolicy:
+    # Signed tokens record no activity, so only their expiry (the absolute
+    # TTL) applies to them.
+    idle_ttl = 0.0 if settings.session_store == "token" else settings.session_idle_ttl_seconds
+    return SessionPolicy(
+        absolute_ttl=timedelta(seconds=settings.session_absolute_ttl_seconds),
+        idle_ttl=timedelta(seconds=idle_ttl),
+        touch_interval=timedelta(seconds=settings.session_touch_interval_seconds),
+    )
+
+
+session_revocations = TokenRevocationList(
+    SessionLocal, refresh_seconds=_settings.session_revocation_refresh_seconds
+)
+
+
+@lru_cache(maxsize=4)
+def _session_token_codec(signing_keys: str) -> SessionTokenCodec:
+    return SessionTokenCodec(parse_signing_keys(signing_keys))
+
+
+def _session_token_args(settings: Settings) -> Dict[str, Any]:
+    return {
+        "codec": _session_token_codec(settings.session_signing_keys),
+        "revocations": session_revocations,
+        "ttl": timedelta(seconds=settings.session_absolute_ttl_seconds),
+    }
+
+
+def session_repo_for(db: Session) -> SessionRepository:
+    """The configured session store (BLOG_SESSION_STORE) over `db`."""
+    settings = get_settings()
+    if settings.session_store == "token":
+        # Never touches `db`, so no connection is checked out for it.
+        return SignedTokenSessionRepository(**_session_token_args(settings))
+    return SqlAlchemySessionRepository(db)
+
+
+session_reaper = SessionReaper(
+    SessionLocal,
+    session_policy_for(_settings),
+    batch_size=_settings.session_reap_batch_size,
+    interval_seconds=_settings.session_reap_interval_seconds,
+    repository=session_repo_for,
+)
+
+author_name_cache: AuthorNameCache = TTLCache(
+    max_entries=_settings.author_cache_max_entries,
+    ttl_seconds=24 * 3600,
+)
+
+
+def _store_image_variants(post_id: int, variants: Dict[int, str]) -> None:
+    with SessionLocal() as db:
+        SqlAlchemyPostRepository(db).set_image_variants(post_id, variants)
+    event_bus.publish(ImageVariantsReady(post_id=post_id, variants=variants))
+
+
+image_variant_pipeline = ImageVariantPipeline(
+    on_ready=_store_image_variants,
+    widths=_settings.image_variant_widths,
+    workers=_settings.image_variant_workers,
+)
+
+
+def _render_image_variants(event: PostCreated) -> None:
+    post = event.post
+    if get_settings().image_variants_enabled and post is not None and post.image_path:
+        image_variant_pipeline.submit(UPLOAD_DIR, event.post_id, post.image_path)
+
+
+# Only where the post was created; the variants are then shared as
+# ImageVariantsReady.
+event_bus.subscribe(PostCreated, _render_image_variants)
+# Cached feed pages still point at the originals until re-rendered.
+event_bus.subscribe(
+    ImageVariantsReady, lambda event: feed_page_cache.invalidate(), cross_worker=True
+)
+
+
+def _build_password_hasher(settings: Settings) -> PasswordHasher:
+    if settings.password_hash_pool == "inline":
+        return BcryptPasswordHasher()
+    return PooledPasswordHasher(
+        BcryptPasswordHasher(),
+        workers=settings.password_hash_workers,
+        queue_size=settings.password_hash_queue_size,
+        kind=settings.password_hash_pool,
+    )
+
+
+metrics_registry = MetricsRegistry()
+http_metrics = HttpMetrics(metrics_registry)
+pool_metrics = PoolMetrics(metrics_registry, engine_pools)
+password_hash_seconds = metrics_registry.histogram(
+    "blog_password_hash_duration_seconds",
+    "bcrypt hash/verify time as seen by callers, pool queueing included.",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+
+template_render_seconds = metrics_registry.histogram(
+    "blog_template_render_seconds",
+    "Time to render a page template, layout and partials included.",
+    ["template"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+
+password_hasher = TimedPasswordHasher(
+    _build_password_hasher(_settings), password_hash_seconds.observe
+)
+
+
+def _hashing_pool_samples(field: str) -> Callable[[], List[Sample]]:
+    def collect() -> List[Sample]:
+        inner = getattr(password_hasher, "inner", password_hasher)
+        if not isinstance(inner, PooledPasswordHasher):
+            return []
+        return [("", {}, float(getattr(inner.stats(), field)))]
+
+    return collect
+
+
+for _name, _kind, _field, _help in (
+    ("blog_password_hash_in_flight", "gauge", "in_flight", "Hash/verify calls running or queued."),
+    ("blog_password_hash_queue_depth", "gauge", "queue_depth", "Hash/verify calls waiting for a worker."),
+    ("blog_password_hash_rejected_total", "counter", "rejected", "Hash/verify calls refused with 503."),
+):
+    metrics_registry.collected(_name, _help, _kind, _hashing_pool_samples(_field))
+
+# Routes accept either flavour; see `call_service`.
+AnyAuthService = Union[AuthService, AsyncAuthService]
+AnyBlogService = Union[BlogService, AsyncBlogService]
+
 
+async def call_service(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call a sync or async service method and return its result.
 
-UPLOAD_DIR = Path(__file__).resolve().parent.parent / "web" / "static" / "uploads"
+    Routes are shared by both DB modes, so they may be handed BlogService or
+    AsyncBlogService (likewise for auth) and go through this helper.
+    """
+    result = fn(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def iterate_service(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """Iterate what a sync or async service method streams.
+
+    Sync iterators read the database as they go, so each step of one runs
+    on the threadpool rather than in the event loop.
+    """
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        async for item in iterate_in_threadpool(items):
+            yield item
+
+
+async def call_service_offloaded(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Like `call_service`, but runs sync methods on the threadpool.
+
+    For calls that wait on CPU-heavy work (password hashing), so the sync
+    DB mode doesn't hold the event loop while they do.
+    """
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    return await run_in_threadpool(fn, *args, **kwargs)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -32,57 +294,220 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """Session on the read engine, for routes that never write."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def get_user_repo(db: Session = Depends(get_db)) -> UserRepository:  # type: ignore[override]
     return SqlAlchemyUserRepository(db)
 
 
 def get_post_repo(db: Session = Depends(get_db)) -> PostRepository:  # type: ignore[override]
-    return SqlAlchemyPostRepository(db)
+    return SqlAlchemyPostRepository(db, author_name_cache)
 
 
 def get_session_repo(db: Session = Depends(get_db)) -> SessionRepository:  # type: ignore[override]
-    return SqlAlchemySessionRepository(db)
+    return session_repo_for(db)
+
+
+def get_read_post_repo(db: Session = Depends(get_read_db)) -> PostRepository:  # type: ignore[override]
+    return SqlAlchemyPostRepository(db, author_name_cache)
+
+
+def get_read_user_repo(db: Session = Depends(get_read_db)) -> UserRepository:  # type: ignore[override]
+    return SqlAlchemyUserRepository(db)
+
+
+def get_read_session_repo(db: Session = Depends(get_read_db)) -> SessionRepository:  # type: ignore[override]
+    return session_repo_for(db)
 
 
 def get_image_storage() -> ImageStorageService:  # type: ignore[override]
-    return LocalImageStorage(UPLOAD_DIR)
+    settings = get_settings()
+    if settings.image_storage == "content":
+        return ContentAddressedImageStorage(
+            UPLOAD_DIR, SessionLocal, max_bytes=settings.upload_max_bytes
+        )
+    return LocalImageStorage(UPLOAD_DIR, max_bytes=settings.upload_max_bytes)
+
+
+@asynccontextmanager
+async def open_blog_service(read_only: bool = False) -> AsyncIterator[AnyBlogService]:
+    """Blog service with its own DB session, for work outside a request scope."""
+    if get_settings().db_mode == "async":
+        factory = get_async_read_session_factory() if read_only else get_async_session_factory()
+        async with factory() as async_db:
+            yield AsyncBlogService(
+                post_repo=AsyncSqlAlchemyPostRepository(async_db, author_name_cache),
+                image_storage=get_image_storage(),
+                events=event_bus,
+            )
+        return
+    with contextmanager(get_read_db if read_only else get_db)() as db:
+        yield BlogService(
+            post_repo=SqlAlchemyPostRepository(db, author_name_cache),
+            image_storage=get_image_storage(),
+            events=event_bus,
+        )
 
 
 def get_auth_service(
     user_repo: UserRepository = Depends(get_user_repo),  # type: ignore[assignment]
     session_repo: SessionRepository = Depends(get_session_repo),  # type: ignore[assignment]
 ) -> AuthService:
-    return AuthService(user_repo=user_repo, session_repo=session_repo)
+    return AuthService(
+        user_repo=user_repo,
+        session_repo=session_repo,
+        hasher=password_hasher,
+        events=event_bus,
+        session_policy=session_policy_for(get_settings()),
+    )
+
+
+def get_session_auth_service(
+    user_repo: UserRepository = Depends(get_read_user_repo),  # type: ignore[assignment]
+    session_repo: SessionRepository = Depends(get_read_session_repo),  # type: ignore[assignment]
+    session_writer: SessionRepository = Depends(get_session_repo),  # type: ignore[assignment]
+) -> AuthService:
+    """AuthService that looks sessions up on the read engine.
+
+    The writer's DB session only checks out a connection when a session
+    has expired or is due a last-seen update.
+    """
+    return AuthService(
+        user_repo=user_repo,
+        session_repo=session_repo,
+        hasher=password_hasher,
+        events=event_bus,
+        session_policy=session_policy_for(get_settings()),
+        session_writer=session_writer,
+    )
 
 
 def get_blog_service(
     post_repo: PostRepository = Depends(get_post_repo),  # type: ignore[assignment]
     image_storage: ImageStorageService = Depends(get_image_storage),  # type: ignore[assignment]
 ) -> BlogService:
-    return BlogService(post_repo=post_repo, image_storage=image_storage)
+    return BlogService(post_repo=post_repo, image_storage=image_storage, events=event_bus)
 
 
-class CurrentUser:
-    def __init__(
-        self,
-        id: int,
-        username: str,
-    ) -> None:
-        self.id = id
-        self.username = username
+def get_read_blog_service(
+    post_repo: PostRepository = Depends(get_read_post_repo),  # type: ignore[assignment]
+    image_storage: ImageStorageService = Depends(get_image_storage),  # type: ignore[assignment]
+) -> BlogService:
+    return BlogService(post_repo=post_repo, image_storage=image_storage, events=event_bus)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_read_session_factory()() as db:
+        yield db
+
+
+def get_async_user_repo(db: AsyncSession = Depends(get_async_db)) -> AsyncUserRepository:
+    return AsyncSqlAlchemyUserRepository(db)
+
+
+def get_async_post_repo(db: AsyncSession = Depends(get_async_db)) -> AsyncPostRepository:
+    return AsyncSqlAlchemyPostRepository(db, author_name_cache)
+
+
+def get_async_session_repo(db: AsyncSession = Depends(get_async_db)) -> AsyncSessionRepository:
+    settings = get_settings()
+    if settings.session_store == "token":
+        return AsyncSignedTokenSessionRepository(**_session_token_args(settings))
+    return AsyncSqlAlchemySessionRepository(db)
+
+
+def get_async_read_post_repo(db: AsyncSession = Depends(get_async_read_db)) -> AsyncPostRepository:
+    return AsyncSqlAlchemyPostRepository(db, author_name_cache)
+
+
+def get_async_read_user_repo(db: AsyncSession = Depends(get_async_read_db)) -> AsyncUserRepository:
+    return AsyncSqlAlchemyUserRepository(db)
+
+
+def get_async_read_session_repo(
+    db: AsyncSession = Depends(get_async_read_db),
+) -> AsyncSessionRepository:
+    return get_async_session_repo(db)
+
+
+def get_async_auth_service(
+    user_repo: AsyncUserRepository = Depends(get_async_user_repo),
+    session_repo: AsyncSessionRepository = Depends(get_async_session_repo),
+) -> AsyncAuthService:
+    return AsyncAuthService(
+        user_repo=user_repo,
+        session_repo=session_repo,
+        hasher=password_hasher,
+        events=event_bus,
+        session_policy=session_policy_for(get_settings()),
+    )
+
+
+def get_async_session_auth_service(
+    user_repo: AsyncUserRepository = Depends(get_async_read_user_repo),
+    session_repo: AsyncSessionRepository = Depends(get_async_read_session_repo),
+    session_writer: AsyncSessionRepository = Depends(get_async_session_repo),
+) -> AsyncAuthService:
+    return AsyncAuthService(
+        user_repo=user_repo,
+        session_repo=session_repo,
+        hasher=password_hasher,
+        events=event_bus,
+        session_policy=session_policy_for(get_settings()),
+        session_writer=session_writer,
+    )
+
+
+def get_async_blog_service(
+    post_repo: AsyncPostRepository = Depends(get_async_post_repo),
+    image_storage: ImageStorageService = Depends(get_image_storage),  # type: ignore[assignment]
+) -> AsyncBlogService:
+    return AsyncBlogService(post_repo=post_repo, image_storage=image_storage, events=event_bus)
+
+
+def get_async_read_blog_service(
+    post_repo: AsyncPostRepository = Depends(get_async_read_post_repo),
+    image_storage: ImageStorageService = Depends(get_image_storage),  # type: ignore[assignment]
+) -> AsyncBlogService:
+    return AsyncBlogService(post_repo=post_repo, image_storage=image_storage, events=event_bus)
+
+
+def async_db_overrides() -> Dict[Callable[..., Any], Callable[..., Any]]:
+    """`app.dependency_overrides` that switch the routes to the async DB mode."""
+    return {
+        get_auth_service: get_async_auth_service,
+        get_session_auth_service: get_async_session_auth_service,
+        get_blog_service: get_async_blog_service,
+        get_read_blog_service: get_async_read_blog_service,
+    }
 
 
 async def get_current_user(
     session_id: Optional[str] = Cookie(default=None, alias="session_id"),
-    auth_service: AuthService = Depends(get_auth_service),
-    user_repo: UserRepository = Depends(get_user_repo),  # type: ignore[assignment]
+    auth_service: AnyAuthService = Depends(get_session_auth_service),  # type: ignore[assignment]
 ) -> Optional[CurrentUser]:
     if not session_id:
         return None
-    session = auth_service.get_session(session_id)
-    if session is None:
-        return None
-    user = user_repo.get_by_id(session.user_id)
+    cached = session_user_cache.get(session_id)
+    if cached is not None:
+        return cached
+    # Looked up on the read engine; only deleting an expired session or
+    # refreshing an idle one's last-seen time reaches the writer.
+    user = await call_service(auth_service.get_session_user, session_id)
     if user is None:
         return None
-    return CurrentUser(id=user.id, username=user.username)  # type: ignore[arg-type]
+    current_user = CurrentUser(id=user.id, username=user.username)  # type: ignore[arg-type]
+    session_user_cache.set(session_id, current_user)
+    return current_user
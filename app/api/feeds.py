@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+from app.domain.entities import Post
+from .conditional import make_etag
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+# Prefix of the Atom paging links inside RSS. Atom feeds declare their
+# namespace as the default on the root instead, and use plain tags.
+ET.register_namespace("atom", ATOM_NS)
+
+FEED_TITLE = "My Blog"
+FEED_FORMATS = {"atom": "application/atom+xml", "rss": "application/rss+xml"}
+
+# Rendered in place of the base URL, so one cached body serves every host;
+# `with_base_url` puts the real one in per response.
+BASE_URL_MARK = "urn:x-blog-base-url/"
+
+
+@dataclass(frozen=True)
+class RenderedFeed:
+    """Serialized feed XML and its ETag, cached together."""
+
+    body: bytes
+    etag: str
+    media_type: str
+
+
+def render_feed(
+    file_format: str,
+    posts: List[Post],
+    base_url: str,
+    cursor: Optional[str],
+    next_cursor: Optional[str],
+) -> RenderedFeed:
+    """One page of the feed; `next_cursor` becomes its ``rel="next"`` link
+    (RFC 5005 paging). `base_url` ends in a slash."""
+    self_url = _page_url(base_url, file_format, cursor)
+    next_url = _page_url(base_url, file_format, next_cursor) if next_cursor else None
+    build = _atom if file_format == "atom" else _rss
+    body = ET.tostring(
+        build(posts, base_url, self_url, next_url), encoding="utf-8", xml_declaration=True
+    )
+    return RenderedFeed(
+        body=body, etag=make_etag("feed", body), media_type=FEED_FORMATS[file_format]
+    )
+
+
+def with_base_url(feed: RenderedFeed, base_url: str) -> Tuple[bytes, str]:
+    """The body and ETag of `feed`, rendered with BASE_URL_MARK, for
+    readers of the site at `base_url`."""
+    escaped = escape(base_url, {'"': "&quot;"})
+    body = feed.body.replace(BASE_URL_MARK.encode(), escaped.encode())
+    return body, make_etag(feed.etag, base_url)
+
+
+def _page_url(base_url: str, file_format: str, cursor: Optional[str]) -> str:
+    params = {}
+    if file_format != "atom":
+        params["format"] = file_format
+    if cursor:
+        params["cursor"] = cursor
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{base_url}feed.xml{query}"
+
+
+def _atom(posts: List[Post], base_url: str, self_url: str, next_url: Optional[str]) -> ET.Element:
+    feed = ET.Element("feed", xmlns=ATOM_NS)
+    _text(feed, "id", base_url)
+    _text(feed, "title", FEED_TITLE)
+    _text(feed, "updated", _rfc3339(_updated(posts)))
+    _link(feed, "link", "self", self_url)
+    _link(feed, "link", "alternate", base_url, "text/html")
+    if next_url:
+        _link(feed, "link", "next", next_url)
+    for post in posts:
+        url = f"{base_url}posts/{post.id}"
+        entry = ET.SubElement(feed, "entry")
+        _text(entry, "id", url)
+        _text(entry, "title", post.title)
+        _text(entry, "updated", _rfc3339(post.created_at))
+        _text(entry, "published", _rfc3339(post.created_at))
+        author = ET.SubElement(entry, "author")
+        _text(author, "name", post.author_username or "unknown")
+        _link(entry, "link", "alternate", url, "text/html")
+        _text(entry, "content", post.content).set("type", "text")
+    return feed
+
+
+def _rss(posts: List[Post], base_url: str, self_url: str, next_url: Optional[str]) -> ET.Element:
+    rss = ET.Element("rss", version="2.0")
+    channel = ET.SubElement(rss, "channel")
+    _text(channel, "title", FEED_TITLE)
+    _text(channel, "link", base_url)
+    _text(channel, "description", f"Latest posts from {FEED_TITLE}")
+    _text(channel, "lastBuildDate", _rfc822(_updated(posts)))
+    # RSS has no paging of its own; readers that page use Atom's links.
+    _link(channel, f"{{{ATOM_NS}}}link", "self", self_url, "application/rss+xml")
+    if next_url:
+        _link(channel, f"{{{ATOM_NS}}}link", "next", next_url, "application/rss+xml")
+    for post in posts:
+        url = f"{base_url}posts/{post.id}"
+        item = ET.SubElement(channel, "item")
+        _text(item, "title", post.title)
+        _text(item, "link", url)
+        _text(item, "guid", url).set("isPermaLink", "true")
+        _text(item, "pubDate", _rfc822(post.created_at))
+        _text(item, f"{{{DC_NS}}}creator", post.author_username or "unknown")
+        _text(item, "description", post.content)
+    return rss
+
+
+def _text(parent: ET.Element, tag: str, text: str) -> ET.Element:
+    element = ET.SubElement(parent, tag)
+    element.text = text
+    return element
+
+
+def _link(
+    parent: ET.Element, tag: str, rel: str, href: str, media_type: Optional[str] = None
+) -> None:
+    link = ET.SubElement(parent, tag, rel=rel, href=href)
+    if media_type is not None:
+        link.set("type", media_type)
+
+
+def _updated(posts: List[Post]) -> datetime:
+    # Pages are newest first.
+    return posts[0].created_at if posts else datetime(1970, 1, 1)
+
+
+def _utc(moment: datetime) -> datetime:
+    # Timestamps are stored as naive UTC.
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def _rfc3339(moment: datetime) -> str:
+    return _utc(moment).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _rfc822(moment: datetime) -> str:
+    return format_datetime(_utc(moment).astimezone(timezone.utc), usegmt=True)
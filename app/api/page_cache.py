@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Generic, Optional, Set, Tuple, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+# What a cache holds: rendered HTML for pages, or any other rendered value.
+T = TypeVar("T")
+
+Renderer = Callable[[], Awaitable[T]]
+
+HIT = "HIT"
+MISS = "MISS"
+STALE = "STALE"
+
+
+@dataclass
+class _Entry(Generic[T]):
+    body: T
+    stored_at: float
+    generation: int
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    """Rendered HTML and the ETag of the data it was rendered from, cached
+    together so a stale copy is always sent with its own validator."""
+
+    body: str
+    etag: str
+
+
+@dataclass(frozen=True)
+class PageCacheStats:
+    hits: int
+    misses: int
+    stale_hits: int
+    evictions: int
+    invalidations: int
+    size: int
+
+
+class PageCache(Generic[T]):
+    """Bounded LRU cache of rendered HTML pages (or other bodies) with a TTL.
+
+    `invalidate()` marks every entry out of date. With `stale_seconds` > 0
+    an out-of-date entry keeps being served for that long while a single
+    background render replaces it, so a burst of requests right after a
+    write costs one render instead of one per request. Concurrent misses for
+    the same key also share one render.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 60.0,
+        stale_seconds: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._stale = stale_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry[T]]" = OrderedDict()
+        self._generation = 0
+        # invalidate() may be called from worker threads (e.g. a post created
+        # inside a threadpool), so guard the shared state.
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, "asyncio.Future[T]"] = {}
+        self._refreshing: Set[str] = set()
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    async def get_or_render(self, key: str, render: "Renderer[T]") -> Tuple[T, str]:
+        """Return `(body, status)` where status is HIT, STALE or MISS."""
+        now = self._clock()
+        body: Optional[T] = None
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if self._is_fresh(entry, now):
+                    self._hits += 1
+                    return entry.body, HIT
+                if self._stale > 0 and now - entry.stored_at < self._ttl + self._stale:
+                    self._stale_hits += 1
+                    body = entry.body
+                    refresh = key not in self._refreshing
+                    if refresh:
+                        self._refreshing.add(key)
+
+        if body is not None:
+            if refresh:
+                asyncio.get_running_loop().create_task(self._refresh(key, render))
+            return body, STALE
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            with self._lock:
+                self._hits += 1
+            return await asyncio.shield(pending), HIT
+
+        with self._lock:
+            self._misses += 1
+        return await self._render_and_store(key, render), MISS
+
+    def contains(self, key: str) -> bool:
+        """Whether `get_or_render` would answer `key` without rendering."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if self._is_fresh(entry, now):
+                return True
+            return self._stale > 0 and now - entry.stored_at < self._ttl + self._stale
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._invalidations += 1
+            self._generation += 1
+            if self._stale <= 0:
+                self._entries.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> PageCacheStats:
+        with self._lock:
+            return PageCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                stale_hits=self._stale_hits,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+                size=len(self._entries),
+            )
+
+    def _is_fresh(self, entry: "_Entry[T]", now: float) -> bool:
+        return entry.generation == self._generation and now - entry.stored_at < self._ttl
+
+    async def _render_and_store(self, key: str, render: "Renderer[T]") -> T:
+        future: "asyncio.Future[T]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        with self._lock:
+            # Tag the entry with the generation the render started under so a
+            # write landing mid-render leaves it out of date.
+            generation = self._generation
+        try:
+            body = await render()
+            future.set_result(body)
+        except Exception as ex:
+            future.set_exception(ex)
+            # Mark retrieved so an unobserved failure doesn't warn at GC time.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+        self._store(key, body, generation)
+        return body
+
+    async def _refresh(self, key: str, render: "Renderer[T]") -> None:
+        try:
+            await self._render_and_store(key, render)
+        except Exception:
+            logger.exception("Background refresh of cached page %r failed", key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key: str, body: T, generation: int) -> None:
+        with self._lock:
+            self._entries[key] = _Entry(body=body, stored_at=self._clock(), generation=generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+
+def viewer_key(username: Optional[str]) -> str:
+    return f"user:{username}" if username else "anon"
@@ -0,0 +1,81 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.metrics import MetricsRegistry
+
+# Requests that matched no route share one label, so scanners probing random
+# paths can't grow the number of series without bound.
+UNMATCHED = "<unmatched>"
+
+
+class HttpMetrics:
+    """The per-request instruments, registered on `registry`."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.requests = registry.counter(
+            "blog_http_requests_total",
+            "HTTP requests handled, by route template and status.",
+            ["method", "route", "status"],
+        )
+        self.duration = registry.histogram(
+            "blog_http_request_duration_seconds",
+            "Time from receiving a request to sending the last body byte.",
+            ["method", "route"],
+        )
+        self.in_flight = registry.gauge(
+            "blog_http_requests_in_flight", "HTTP requests being handled right now."
+        )
+
+
+class RequestMetricsMiddleware:
+    """Counts and times every HTTP request under its route template.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, so it adds no task or
+    stream per request: the router writes the matched route into the scope,
+    which is read once the response has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: HttpMetrics) -> None:
+        self.app = app
+        self._metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self._metrics
+        metrics.in_flight.add(1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.in_flight.add(-1)
+            method = scope["method"]
+            route = route_template(scope)
+            metrics.requests.inc(method, route, str(status))
+            metrics.duration.observe(elapsed, method, route)
+
+
+def route_template(scope: Scope) -> str:
+    """``/posts/{post_id}`` rather than ``/posts/42``, once routing has run."""
+    root_path = scope.get("root_path", "")
+    # Below a Mount, the root path has moved past the mount's prefix.
+    mount_prefix = root_path[len(scope.get("app_root_path", root_path)):]
+    route = scope.get("route")
+    if route is not None:
+        return mount_prefix + route.path
+    if mount_prefix:
+        # A mounted plain ASGI app (the static files) sets no route.
+        return f"{mount_prefix}/{{path}}"
+    return UNMATCHED
@@ -3,8 +3,13 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Form, HTTPException, Response, Cookie
 from fastapi.responses import RedirectResponse
 
-from app.use_cases.auth_service import AuthService
-from .dependencies import get_auth_service
+from app.domain.interfaces import PasswordHasherBusy
+from .dependencies import (
+    AnyAuthService,
+    call_service,
+    call_service_offloaded,
+    get_auth_service,
+)
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -15,9 +20,14 @@ async def login(
     response: Response,
     username: str = Form(...),
     password: str = Form(...),
-    auth_service: AuthService = Depends(get_auth_service),
+    auth_service: AnyAuthService = Depends(get_auth_service),
 ):
-    session = auth_service.authenticate(username=username, password=password)
+    try:
+        session = await call_service_offloaded(
+            auth_service.authenticate, username=username, password=password
+        )
+    except PasswordHasherBusy as ex:
+        raise _server_busy() from ex
     if session is None:
         raise HTTPException(status_code=400, detail="Invalid username or password")
     redirect = RedirectResponse(url="/", status_code=302)
@@ -29,23 +39,35 @@ async def login(
 async def register(
     username: str = Form(...),
     password: str = Form(...),
-    auth_service: AuthService = Depends(get_auth_service),
+    auth_service: AnyAuthService = Depends(get_auth_service),
 ):
     try:
-        auth_service.register(username=username, password=password)
+        await call_service_offloaded(
+            auth_service.register, username=username, password=password
+        )
     except ValueError as ex:
         raise HTTPException(status_code=400, detail=str(ex)) from ex
+    except PasswordHasherBusy as ex:
+        raise _server_busy() from ex
     return RedirectResponse(url="/", status_code=302)
 
 
 @router.post("/logout")
 async def logout(
     response: Response,
-    auth_service: AuthService = Depends(get_auth_service),
+    auth_service: AnyAuthService = Depends(get_auth_service),
     session_id: Optional[str] = Cookie(default=None, alias="session_id"),
 ):
     if session_id is not None:
-        auth_service.logout(session_id)
+        await call_service(auth_service.logout, session_id)
     redirect = RedirectResponse(url="/", status_code=302)
     redirect.delete_cookie("session_id")
     return redirect
+
+
+def _server_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
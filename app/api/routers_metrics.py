@@ -0,0 +1,36 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.config import get_settings
+from .dependencies import metrics_registry
+
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_TEXT = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def require_metrics_token(authorization: Optional[str] = Header(default=None)) -> None:
+    """Reject scrapes without the BLOG_METRICS_TOKEN bearer token, if one is set."""
+    token = get_settings().metrics_token
+    if not token:
+        return
+    expected = f"Bearer {token}".encode()
+    if not hmac.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(
+            status_code=401, detail="Metrics token required", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_metrics_token)],
+)
+def metrics() -> PlainTextResponse:
+    # Sync: rendering reads the pools and takes the metric locks, which is
+    # better done on a worker thread than on the event loop.
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_TEXT)
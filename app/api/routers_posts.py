@@ -1,14 +1,75 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Depends, File, Form, Request, UploadFile
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from markupsafe import Markup, escape
+from starlette.types import Receive, Scope, Send
 
-from app.use_cases.blog_service import BlogService
-from .dependencies import get_blog_service, get_current_user, CurrentUser
+from app.config import get_settings
+from app.domain.entities import PostPage
+from app.domain.interfaces import ImageTooLarge
+from app.domain.search import HIGHLIGHT_START, HIGHLIGHT_END
+from .dependencies import (
+    AnyBlogService,
+    call_service,
+    get_blog_service,
+    get_read_blog_service,
+    get_current_user,
+    iterate_service,
+    open_blog_service,
+    feed_page_cache,
+    feed_xml_cache,
+    static_assets,
+    template_render_seconds,
+    CurrentUser,
+    TEMPLATE_CACHE_DIR,
+)
+from .conditional import (
+    fingerprint_directory,
+    is_not_modified,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
+from .feeds import BASE_URL_MARK, RenderedFeed, render_feed, with_base_url
+from .page_cache import RenderedPage, viewer_key
+from .templating import TEMPLATE_DIR, build_templates
 
 
-templates = Jinja2Templates(directory="app/web/templates")
+templates = build_templates(
+    TEMPLATE_DIR,
+    TEMPLATE_CACHE_DIR,
+    auto_reload=get_settings().template_auto_reload,
+    on_render=template_render_seconds.observe,
+)
+templates.env.globals["static_url"] = static_assets.url
+
+# Part of every page ETag, so pages whose markup or asset URLs changed in a
+# deploy are never answered with 304.
+_TEMPLATES_VERSION = "{}.{}".format(
+    fingerprint_directory(TEMPLATE_DIR),
+    static_assets.version,
+)
+
+
+def _highlight(snippet: str) -> Markup:
+    """Escape a search snippet, then turn its match markers into <mark> tags."""
+    escaped = str(escape(snippet))
+    return Markup(escaped.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>"))
+
+
+templates.env.filters["highlight"] = _highlight
+
+_UPLOAD_CHUNK_BYTES = 256 * 1024
+
+_FEED_PAGE_SIZE = 20
+
+_EXPORT_MEDIA_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# User id -> exports this worker is streaming for them.
+_exports_running: Dict[int, int] = {}
 
 router = APIRouter(tags=["posts"])
 
@@ -16,26 +77,148 @@ router = APIRouter(tags=["posts"])
 @router.get("/")
 async def index(
     request: Request,
-    blog_service: BlogService = Depends(get_blog_service),
+    cursor: Optional[str] = None,
     current_user: Optional[CurrentUser] = Depends(get_current_user),
 ):
-    posts = blog_service.list_recent_posts(limit=20)
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "posts": posts, "current_user": current_user},
+    viewer = viewer_key(current_user.username if current_user else None)
+
+    # Reading opens its own DB session so a stale-while-revalidate refresh
+    # can outlive this request.
+    async def load() -> PostPage:
+        async with open_blog_service(read_only=True) as blog_service:
+            return await call_service(
+                blog_service.list_posts_page, after_cursor=cursor, limit=20
+            )
+
+    def render_page(page: PostPage) -> RenderedPage:
+        body = templates.get_template("index.html").render(
+            {
+                "posts": page.items,
+                "next_cursor": page.next_cursor,
+                "current_user": current_user,
+            }
+        )
+        return RenderedPage(body=body, etag=_feed_etag(viewer, cursor, page))
+
+    async def render() -> RenderedPage:
+        return render_page(await load())
+
+    caching = get_settings().page_cache_enabled
+    key = f"{viewer}|{cursor or ''}"
+    status: Optional[str] = None
+    try:
+        conditional = "if-none-match" in request.headers
+        if caching and (feed_page_cache.contains(key) or not conditional):
+            rendered, status = await feed_page_cache.get_or_render(key, render)
+        else:
+            # The validator needs only the page's data, so a reader whose
+            # copy is current gets a 304 without the template being rendered.
+            page = await load()
+            etag = _feed_etag(viewer, cursor, page)
+            if is_not_modified(request, etag):
+                return not_modified(validator_headers(etag))
+            rendered = render_page(page)
+            if caching:
+
+                async def rendered_already() -> RenderedPage:
+                    return rendered
+
+                rendered, status = await feed_page_cache.get_or_render(
+                    key, rendered_already
+                )
+    except ValueError:
+        return RedirectResponse(url="/", status_code=302)
+    # A cached or stale page is sent with the ETag of the data it shows, so
+    # it never answers for a newer one and a cache hit needs no query. There
+    # is no Last-Modified: whole-second dates can't tell such pages apart.
+    headers = validator_headers(rendered.etag)
+    if status is not None:
+        headers["X-Cache"] = status
+    if is_not_modified(request, rendered.etag):
+        return not_modified(headers)
+    return HTMLResponse(rendered.body, headers=headers)
+
+
+def _feed_etag(viewer: str, cursor: Optional[str], page: PostPage) -> str:
+    # Posts are never edited, so ids and times stand for their text; image
+    # variants appear once rendered, and change the markup.
+    return make_etag(
+        "feed",
+        _TEMPLATES_VERSION,
+        viewer,
+        cursor,
+        page.next_cursor,
+        [
+            (post.id, post.created_at, sorted(post.image_variants.items()))
+            for post in page.items
+        ],
     )
 
 
+@router.get("/feed.xml")
+async def feed_xml(
+    request: Request,
+    file_format: str = Query("atom", alias="format", pattern="^(atom|rss)$"),
+    cursor: Optional[str] = None,
+):
+    """Atom (or RSS) feed of the newest posts, paged with ``rel="next"``.
+
+    The same for every reader, so it needs no session lookup, and a cached
+    page is answered without touching the database or serializing again.
+    Cached pages hold no host: their links get BLOG_PUBLIC_BASE_URL, or
+    the request's own base URL, as each response is sent, so a client's
+    Host header neither reaches other readers nor picks cache keys.
+    """
+    public_base_url = get_settings().public_base_url
+    if public_base_url:
+        base_url = public_base_url.rstrip("/") + "/"
+    else:
+        base_url = str(request.base_url)
+
+    async def render() -> RenderedFeed:
+        async with open_blog_service(read_only=True) as blog_service:
+            page = await call_service(
+                blog_service.list_posts_page, after_cursor=cursor, limit=_FEED_PAGE_SIZE
+            )
+        return render_feed(file_format, page.items, BASE_URL_MARK, cursor, page.next_cursor)
+
+    try:
+        feed, status = await feed_xml_cache.get_or_render(
+            f"{file_format}|{cursor or ''}", render
+        )
+    except ValueError:
+        first_page = "/feed.xml" if file_format == "atom" else f"/feed.xml?format={file_format}"
+        return RedirectResponse(url=first_page, status_code=302)
+    body, etag = with_base_url(feed, base_url)
+    # Public: shared caches may keep it, but must revalidate with the ETag.
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache", "X-Cache": status}
+    if is_not_modified(request, etag):
+        return not_modified(headers)
+    return Response(body, media_type=feed.media_type, headers=headers)
+
+
 @router.get("/posts/{post_id}")
 async def post_detail(
     post_id: int,
     request: Request,
-    blog_service: BlogService = Depends(get_blog_service),
+    blog_service: AnyBlogService = Depends(get_read_blog_service),
     current_user: Optional[CurrentUser] = Depends(get_current_user),
 ):
-    post = blog_service.get_post(post_id)
+    post = await call_service(blog_service.get_post, post_id)
     if post is None:
         return RedirectResponse(url="/", status_code=302)
+    etag = make_etag(
+        "post",
+        _TEMPLATES_VERSION,
+        viewer_key(current_user.username if current_user else None),
+        post.id,
+        post.created_at,
+        sorted(post.image_variants.items()),
+    )
+    last_modified = post.created_at if current_user is None else None
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
     return templates.TemplateResponse(
         "post_detail.html",
         {
@@ -43,6 +226,82 @@ async def post_detail(
             "post": post,
             "current_user": current_user,
         },
+        headers=headers,
+    )
+
+
+@router.get("/search")
+async def search(
+    request: Request,
+    q: str = "",
+    cursor: Optional[str] = None,
+    blog_service: AnyBlogService = Depends(get_read_blog_service),
+    current_user: Optional[CurrentUser] = Depends(get_current_user),
+):
+    try:
+        page = await call_service(blog_service.search, q, limit=20, cursor=cursor)
+    except ValueError:
+        return RedirectResponse(url=f"/search?{urlencode({'q': q})}", status_code=302)
+    return templates.TemplateResponse(
+        "search.html",
+        {
+            "request": request,
+            "query": q,
+            "hits": page.hits,
+            "next_cursor": page.next_cursor,
+            "current_user": current_user,
+        },
+    )
+
+
+@router.get("/export")
+async def export_posts(
+    file_format: str = Query("jsonl", alias="format", pattern="^(jsonl|csv)$"),
+    gzip: bool = False,
+    current_user: Optional[CurrentUser] = Depends(get_current_user),
+):
+    """Every post as a JSONL or CSV download, streamed as it is read.
+
+    Each download holds a DB connection until it ends, so a user may only
+    run `export_max_per_user` of them at once on a worker.
+    """
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Sign in to export posts")
+    user_id = current_user.id
+    running = _exports_running.get(user_id, 0)
+    if running >= get_settings().export_max_per_user:
+        raise HTTPException(
+            status_code=429,
+            detail="An export is already running, please wait for it to finish",
+            headers={"Retry-After": "10"},
+        )
+    filename = f"posts-{datetime.utcnow():%Y%m%d}.{file_format}"
+    media_type = _EXPORT_MEDIA_TYPES[file_format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    # The export opens its own DB session: the request's is closed before
+    # the body is sent.
+    async def body() -> AsyncIterator[bytes]:
+        async with open_blog_service(read_only=True) as blog_service:
+            chunks = blog_service.export_posts(file_format, compress=gzip)
+            async for chunk in iterate_service(chunks):
+                yield chunk
+
+    def release() -> None:
+        remaining = _exports_running[user_id] - 1
+        if remaining:
+            _exports_running[user_id] = remaining
+        else:
+            del _exports_running[user_id]
+
+    _exports_running[user_id] = running + 1
+    return _ExportResponse(
+        body(),
+        on_close=release,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
@@ -65,24 +324,56 @@ async def create_post(
     title: str = Form(...),
     content: str = Form(...),
     image: Optional[UploadFile] = File(default=None),
-    blog_service: BlogService = Depends(get_blog_service),
+    blog_service: AnyBlogService = Depends(get_blog_service),
     current_user: Optional[CurrentUser] = Depends(get_current_user),
 ):
     if not current_user:
         return RedirectResponse(url="/", status_code=302)
 
-    image_filename: Optional[str] = None
-    image_bytes: Optional[bytes] = None
-    if image is not None:
-        image_bytes = await image.read()
-        if image_bytes:
-            image_filename = image.filename
-
-    blog_service.create_post(
-        author_id=current_user.id,
-        title=title,
-        content=content,
-        image_filename=image_filename,
-        image_bytes=image_bytes,
-    )
+    image_path: Optional[str] = None
+    if image is not None and image.filename:
+        try:
+            stored = await blog_service.save_image_upload(image.filename, _read_chunks(image))
+        except ImageTooLarge as ex:
+            raise HTTPException(status_code=413, detail="Image is too large") from ex
+        if stored is not None:
+            image_path = stored.path
+
+    try:
+        await call_service(
+            blog_service.create_post,
+            author_id=current_user.id,
+            title=title,
+            content=content,
+            image_path=image_path,
+        )
+    except BaseException:
+        # No post points at the image, so nothing would ever remove it.
+        if image_path is not None:
+            await blog_service.discard_image_upload(image_path)
+        raise
     return RedirectResponse(url="/", status_code=302)
+
+
+class _ExportResponse(StreamingResponse):
+    """A StreamingResponse that calls `on_close` once sending ends, however
+    it ends: a body generator's cleanup never runs if the client leaves
+    before its first chunk."""
+
+    def __init__(self, *args: Any, on_close: Callable[[], None], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+
+async def _read_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(_UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,33 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.sql_instrumentation import QueryStats, collect_queries
+
+
+class ServerTimingMiddleware:
+    """Reports each request's query count and DB time in ``Server-Timing``.
+
+    Debug mode only: the header tells anyone reading responses how much
+    work a page does. Browsers show it in the network panel's timing tab.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing(stats))
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+
+def server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries"'
@@ -0,0 +1,161 @@
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Optional, Sequence
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .conditional import etag_matches
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone is understood by every browser.
+    brotli = None
+
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_COMPRESSIBLE = {".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml", ".html"}
+# Below this, compression headers cost about as much as they save.
+_MIN_COMPRESS_BYTES = 256
+# Most preferred first.
+_CODINGS = ("br", "gzip")
+
+
+@dataclass(frozen=True)
+class Asset:
+    media_type: str
+    digest: str
+    # Content-coding -> body; "identity" is always present.
+    bodies: Dict[str, bytes]
+
+
+class StaticAssets:
+    """Content-hashed names for the files of a static directory.
+
+    Built once at startup: every file is read, hashed and, when it is text
+    worth compressing, gzipped (and brotli-compressed when the ``brotli``
+    package is installed) at maximum level, so requests never compress
+    anything. ``url("style.css")`` gives ``/static/style.<hash>.css``,
+    which changes whenever the file does and can therefore be cached
+    forever. Files under `exclude` (uploads) are left alone.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        url_prefix: str = "/static",
+        exclude: Sequence[str] = (),
+    ) -> None:
+        self._prefix = url_prefix.rstrip("/")
+        self._urls: Dict[str, str] = {}
+        self._assets: Dict[str, Asset] = {}
+        version = hashlib.blake2b(digest_size=8)
+        for file in sorted(directory.rglob("*")):
+            relative = PurePosixPath(file.relative_to(directory).as_posix())
+            if not file.is_file() or _is_hidden(relative) or relative.parts[0] in exclude:
+                continue
+            data = file.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = str(relative.with_name(f"{relative.stem}.{digest}{relative.suffix}"))
+            media_type = mimetypes.guess_type(relative.name)[0] or "application/octet-stream"
+            self._urls[str(relative)] = f"{self._prefix}/{hashed}"
+            self._assets[hashed] = Asset(
+                media_type=media_type, digest=digest, bodies=_encode(data, relative.suffix)
+            )
+            version.update(f"{relative}:{digest}".encode())
+        self.version = version.hexdigest()
+
+    def url(self, path: str) -> str:
+        """Fingerprinted URL of `path`, or its plain URL if it isn't an asset."""
+        return self._urls.get(path.lstrip("/"), f"{self._prefix}/{path.lstrip('/')}")
+
+    def get(self, hashed_path: str) -> Optional[Asset]:
+        return self._assets.get(hashed_path)
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles that serves fingerprinted assets from memory.
+
+    A fingerprinted path is answered with the smallest encoding the client
+    accepts and one-year immutable caching. Plain paths fall through to
+    StaticFiles; those under `immutable_prefixes` (uploads, whose names are
+    never reused for different bytes) are marked immutable too.
+    """
+
+    def __init__(
+        self,
+        *,
+        assets: StaticAssets,
+        immutable_prefixes: Sequence[str] = (),
+        **kwargs: object,
+    ) -> None:
+        super().__init__(**kwargs)  # type: ignore[arg-type]
+        self._assets = assets
+        self._immutable_prefixes = tuple(immutable_prefixes)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        asset = self._assets.get(PurePosixPath(path).as_posix())
+        if asset is None:
+            response = await super().get_response(path, scope)
+            if response.status_code in (200, 304) and path.startswith(self._immutable_prefixes):
+                response.headers["Cache-Control"] = IMMUTABLE
+            return response
+
+        request_headers = Headers(scope=scope)
+        coding = choose_encoding(request_headers.get("accept-encoding", ""), asset.bodies)
+        headers = {
+            "Cache-Control": IMMUTABLE,
+            # Each coding is a different representation, so it gets its own tag.
+            "ETag": f'"{asset.digest}-{coding}"',
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(asset.bodies[coding], media_type=asset.media_type, headers=headers)
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> str:
+    """Most preferred coding in `available` that `accept_encoding` allows."""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    offered = set(available)
+    for coding in _CODINGS:
+        if coding in offered and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def _encode(data: bytes, suffix: str) -> Dict[str, bytes]:
+    bodies = {"identity": data}
+    if suffix.lower() not in _COMPRESSIBLE or len(data) < _MIN_COMPRESS_BYTES:
+        return bodies
+    compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(data, quality=11)
+    for coding, body in compressed.items():
+        if len(body) < len(data):
+            bodies[coding] = body
+    return bodies
+
+
+def _is_hidden(path: PurePosixPath) -> bool:
+    return any(part.startswith(".") for part in path.parts)
@@ -0,0 +1,80 @@
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+# Resolved from the package, so the app can be started from any directory.
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "web" / "templates"
+
+# Called with (seconds, template name) after every top-level render.
+RenderObserver = Callable[[float, str], None]
+
+
+class TimedTemplate(jinja2.Template):
+    """Reports how long each render took to its environment's `on_render`.
+
+    Only the template asked for is timed; the layouts it extends and the
+    partials it includes are part of its time.
+    """
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            on_render = getattr(self.environment, "on_render", None)
+            if on_render is not None:
+                on_render(time.perf_counter() - started, self.name or "<string>")
+
+
+class TemplateEnvironment(jinja2.Environment):
+    template_class = TimedTemplate
+
+    def __init__(self, on_render: Optional[RenderObserver] = None, **options: Any) -> None:
+        super().__init__(**options)
+        self.on_render = on_render
+
+
+def build_templates(
+    directory: Path,
+    cache_dir: Optional[Path],
+    auto_reload: bool = False,
+    on_render: Optional[RenderObserver] = None,
+) -> Jinja2Templates:
+    """Templates under `directory`, with compiled bytecode kept in `cache_dir`.
+
+    The bytecode cache is keyed by template and checked against the
+    source's checksum, so a restart (or another worker) skips compiling
+    any template that hasn't changed, while an edited one is recompiled.
+    Without `auto_reload`, a loaded template is never checked against its
+    file again; restart to pick up edits. Nothing is written until
+    `precompile_templates`, which also creates `cache_dir`, so building the
+    environment at import time leaves the filesystem alone.
+    """
+    bytecode_cache = None
+    if cache_dir is not None:
+        bytecode_cache = jinja2.FileSystemBytecodeCache(str(cache_dir))
+    env = TemplateEnvironment(
+        on_render=on_render,
+        loader=jinja2.FileSystemLoader(directory),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=bytecode_cache,
+    )
+    return Jinja2Templates(env=env)
+
+
+def precompile_templates(env: jinja2.Environment) -> int:
+    """Load every template now, so no request pays for compiling one.
+
+    Run once the environment's filters and globals are registered, since
+    compiling checks that the filters a template uses exist.
+    """
+    if isinstance(env.bytecode_cache, jinja2.FileSystemBytecodeCache):
+        Path(env.bytecode_cache.directory).mkdir(parents=True, exist_ok=True)
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return len(names)
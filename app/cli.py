@@ -0,0 +1,284 @@
+"""Maintenance commands, run as ``python -m app.cli <command>``."""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from app.api.dependencies import (
+    UPLOAD_DIR,
+    get_image_storage,
+    session_policy_for,
+    session_repo_for,
+    session_reaper,
+)
+from app.config import get_settings
+from app.domain.entities import Post
+from app.infrastructure.db import SessionLocal, get_engine
+from app.infrastructure.repositories import SqlAlchemyPostRepository, SqlAlchemyUserRepository
+from app.infrastructure.schema import ensure_schema
+from app.infrastructure.search import rebuild_search_index
+from app.infrastructure.storage_cas import ContentAddressedImageStorage
+from app.use_cases.auth_service import AuthService
+from app.use_cases.post_export import export_posts
+from app.use_cases.post_import import (
+    FORMATS,
+    ImportCheckpoint,
+    PostImportError,
+    PostImportReport,
+    PostImportService,
+    read_post_records,
+)
+
+
+def _prepare_schema() -> None:
+    """The schema check `create_app` runs, for commands used before a deploy."""
+    ensure_schema(get_engine())
+
+
+def _content_storage() -> ContentAddressedImageStorage:
+    _prepare_schema()
+    return ContentAddressedImageStorage(UPLOAD_DIR, SessionLocal)
+
+
+def _migrate_uploads(args: argparse.Namespace) -> int:
+    report = _content_storage().migrate_flat_uploads()
+    print(
+        f"{report.files_seen} files -> {report.blobs_created} new blobs, "
+        f"{report.duplicates_removed} duplicates removed ({report.bytes_freed} bytes freed)"
+    )
+    print("Set BLOG_IMAGE_STORAGE=content so new uploads use the same layout.")
+    return 0
+
+
+def _gc_images(args: argparse.Namespace) -> int:
+    report = _content_storage().collect_garbage(grace_seconds=args.grace_seconds)
+    print(
+        f"{report.blobs_checked} blobs checked, {report.blobs_removed} removed "
+        f"({report.bytes_freed} bytes freed)"
+    )
+    return 0
+
+
+def _rebuild_search(args: argparse.Namespace) -> int:
+    _prepare_schema()
+    rebuild_search_index(get_engine())
+    print("Search index rebuilt.")
+    return 0
+
+
+def _reap_sessions(args: argparse.Namespace) -> int:
+    _prepare_schema()
+    print(f"{session_reaper.reap()} expired sessions deleted")
+    return 0
+
+
+def _revoke_sessions(args: argparse.Namespace) -> int:
+    _prepare_schema()
+    with SessionLocal() as db:
+        users = SqlAlchemyUserRepository(db)
+        user = users.get_by_username(args.username)
+        if user is None:
+            print(f"No user named {args.username!r}", file=sys.stderr)
+            return 1
+        service = AuthService(
+            users, session_repo_for(db), session_policy=session_policy_for(get_settings())
+        )
+        revoked = service.revoke_all_sessions(user.id)  # type: ignore[arg-type]
+    if get_settings().session_store == "token":
+        # Tokens can't be listed, only refused from now on.
+        print(f"Every session token issued to {args.username} so far is revoked")
+    else:
+        print(f"{revoked} sessions revoked for {args.username}")
+    print("Workers may keep honouring them until their session cache entries expire.")
+    return 0
+
+
+def _import_posts(args: argparse.Namespace) -> int:
+    source = Path(args.source)
+    file_format = args.format or source.suffix.lstrip(".").lower()
+    if file_format not in FORMATS:
+        print(f"Can't tell the format of {source}; pass --format", file=sys.stderr)
+        return 1
+    checkpoint = ImportCheckpoint(
+        Path(args.checkpoint or f"{source}.checkpoint"), str(source.resolve())
+    )
+    try:
+        done = 0 if args.restart else checkpoint.load()
+    except ValueError as exc:
+        print(f"{exc}; pass --checkpoint or --restart", file=sys.stderr)
+        return 1
+    if done:
+        print(f"Resuming after record {done} (from {checkpoint.path})")
+    _prepare_schema()
+
+    def on_batch(last_record: int, report: PostImportReport) -> None:
+        checkpoint.save(last_record)
+        print(f"{last_record} records done, {report.rows_per_second:,.0f} rows/s")
+
+    with SessionLocal() as db, source.open(encoding="utf-8", newline="") as stream:
+        service = PostImportService(
+            SqlAlchemyPostRepository(db),
+            SqlAlchemyUserRepository(db),
+            get_image_storage(),
+            image_dir=Path(args.images) if args.images else None,
+            batch_size=args.batch_size,
+            image_workers=args.image_workers,
+        )
+        try:
+            report = service.run(
+                read_post_records(stream, file_format, skip=done),
+                first_record=done + 1,
+                on_batch=on_batch,
+            )
+        except PostImportError as exc:
+            print(f"{exc}; rerun to resume after the last saved batch", file=sys.stderr)
+            return 1
+    print(
+        f"{report.posts_added} posts and {report.images_copied} images imported "
+        f"in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s)"
+    )
+    return 0
+
+
+def _write_atomically(target: Path, chunks: Iterable[bytes]) -> None:
+    """Write beside `target` and rename once complete, so a nightly job
+    never leaves a truncated file under the real name."""
+    partial = target.with_name(f".{target.name}.part")
+    try:
+        with partial.open("wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        os.replace(partial, target)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+
+def _export_posts(args: argparse.Namespace) -> int:
+    to_stdout = args.output == "-"
+    compress = args.gzip or args.output.endswith(".gz")
+    suffix = "" if to_stdout else Path(args.output.removesuffix(".gz")).suffix
+    file_format = args.format or suffix.lstrip(".").lower() or "jsonl"
+    if file_format not in FORMATS:
+        print(f"Can't tell the format of {args.output}; pass --format", file=sys.stderr)
+        return 1
+    _prepare_schema()
+    exported = 0
+
+    def counted(posts: Iterator[Post]) -> Iterator[Post]:
+        nonlocal exported
+        for post in posts:
+            exported += 1
+            yield post
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        posts = counted(SqlAlchemyPostRepository(db).iter_all(batch_size=args.batch_size))
+        chunks = export_posts(posts, file_format, compress)
+        if to_stdout:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            _write_atomically(Path(args.output), chunks)
+    seconds = time.perf_counter() - started
+    rate = exported / seconds if seconds > 0 else 0.0
+    print(f"{exported} posts exported in {seconds:.1f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser(
+        "migrate-uploads",
+        help="Dedupe the uploads directory into the content-addressed layout",
+    )
+    migrate.set_defaults(handler=_migrate_uploads)
+
+    gc = commands.add_parser(
+        "gc-images", help="Delete content-addressed images no post references"
+    )
+    gc.add_argument(
+        "--grace-seconds",
+        type=float,
+        default=3600.0,
+        help="Keep unreferenced images saved more recently than this (default: 3600)",
+    )
+    gc.set_defaults(handler=_gc_images)
+
+    search = commands.add_parser(
+        "rebuild-search", help="Rebuild and optimize the full-text search index"
+    )
+    search.set_defaults(handler=_rebuild_search)
+
+    reap = commands.add_parser("reap-sessions", help="Delete expired sessions now")
+    reap.set_defaults(handler=_reap_sessions)
+
+    revoke = commands.add_parser(
+        "revoke-sessions", help="Sign a user out of every session"
+    )
+    revoke.add_argument("username")
+    revoke.set_defaults(handler=_revoke_sessions)
+
+    importer = commands.add_parser(
+        "import-posts",
+        help="Bulk-add posts from a JSONL or CSV export, resuming from a checkpoint",
+    )
+    importer.add_argument("source", help="File with one post per JSON line or CSV row")
+    importer.add_argument(
+        "--format", choices=FORMATS, help="Input format (default: from the file extension)"
+    )
+    importer.add_argument("--images", help="Directory the records' image paths are relative to")
+    importer.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Posts inserted per transaction (default: 5000)",
+    )
+    importer.add_argument(
+        "--image-workers",
+        type=int,
+        default=8,
+        help="Threads copying images into storage (default: 8)",
+    )
+    importer.add_argument(
+        "--checkpoint", help="Progress file (default: SOURCE.checkpoint); rerun to resume"
+    )
+    importer.add_argument(
+        "--restart", action="store_true", help="Ignore the checkpoint and start from the top"
+    )
+    importer.set_defaults(handler=_import_posts)
+
+    exporter = commands.add_parser(
+        "export-posts", help="Stream every post to a JSONL or CSV file, optionally gzipped"
+    )
+    exporter.add_argument(
+        "output", help="File to write, e.g. posts.jsonl.gz, or - for standard output"
+    )
+    exporter.add_argument(
+        "--format", choices=FORMATS, help="Output format (default: from the file extension)"
+    )
+    exporter.add_argument(
+        "--gzip", action="store_true", help="Compress the output (implied by a .gz name)"
+    )
+    exporter.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Posts read per query (default: 1000)",
+    )
+    exporter.set_defaults(handler=_export_posts)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_int_tuple(name: str, default: Tuple[int, ...]) -> Tuple[int, ...]:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return tuple(int(part) for part in value.split(",") if part.strip())
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Runtime configuration, read from ``BLOG_*`` environment variables."""
+
+    # Empty means app_data/blog.sqlite3 under the project root.
+    database_path: str = ""
+    # "sync" runs repositories on a plain Session; "async" uses AsyncSession
+    # over aiosqlite so queries don't block the event loop.
+    db_mode: str = "sync"
+
+    page_cache_enabled: bool = True
+    page_cache_max_entries: int = 256
+    page_cache_ttl_seconds: float = 60.0
+    # Seconds past expiry (or invalidation) during which a stale page may be
+    # served while a single background render refreshes it. 0 disables it.
+    page_cache_stale_seconds: float = 0.0
+    # /feed.xml pages are dropped when a post is created; the TTL bounds how
+    # long a worker that missed the change keeps serving the previous feed.
+    feed_cache_ttl_seconds: float = 3600.0
+    # Scheme and host the site is served at, e.g. "https://blog.example.com",
+    # for the absolute links in /feed.xml. Empty builds them from each
+    # request's Host header.
+    public_base_url: str = ""
+
+    # Workers share new posts and logouts through the change_log table,
+    # noticing each other's commits via PRAGMA data_version, which is read
+    # this often. 0 keeps every worker to its own events.
+    change_bus_poll_seconds: float = 0.05
+    change_log_retention_seconds: float = 3600.0
+
+    # "thread" or "process" run bcrypt on a bounded pool; "inline" hashes on
+    # the calling thread.
+    password_hash_pool: str = "thread"
+    password_hash_workers: int = 2
+    # Operations allowed to wait for a worker before logins get a 503.
+    password_hash_queue_size: int = 32
+
+    # SQLite profile applied to every new connection (see infrastructure/db.py).
+    db_journal_mode: str = "wal"
+    db_synchronous: str = "normal"
+    db_busy_timeout_ms: int = 5000
+    db_mmap_size: int = 256 * 1024 * 1024
+    # Negative values are KiB, as in PRAGMA cache_size.
+    db_cache_size: int = -32_000
+    db_temp_store: str = "memory"
+    db_pool_size: int = 10
+    # -1 lets the pool open (and later close) extra connections rather than
+    # make a checkout wait; SQLite connections are only file handles.
+    db_max_overflow: int = -1
+    db_pool_timeout_seconds: float = 10.0
+    # Serve GET routes from a second, query_only engine with its own pool.
+    db_read_engine: bool = False
+
+    # Uploads are streamed to disk and rejected once they pass this size.
+    upload_max_bytes: int = 10 * 1024 * 1024
+    # "local" names every upload uniquely; "content" stores each distinct
+    # image once under its SHA-256 (see infrastructure/storage_cas.py).
+    image_storage: str = "local"
+    # Resized WebP copies rendered after a post with an image is created.
+    image_variants_enabled: bool = True
+    image_variant_widths: Tuple[int, ...] = (320, 640, 1280)
+    image_variant_workers: int = 2
+    # Exports a user may stream from one worker at once; each holds a DB
+    # connection for as long as the download lasts.
+    export_max_per_user: int = 1
+
+    # Session id -> user lookups cached in-process; the TTL bounds how long a
+    # session deleted by another worker can still be honoured here.
+    session_cache_max_entries: int = 10_000
+    session_cache_ttl_seconds: float = 60.0
+
+    # Sessions end this long after login, or after this long without a
+    # request; 0 disables either limit. Expired rows are deleted by a
+    # background reaper, `session_reap_batch_size` rows per transaction.
+    session_absolute_ttl_seconds: float = 30 * 24 * 3600.0
+    session_idle_ttl_seconds: float = 7 * 24 * 3600.0
+    session_touch_interval_seconds: float = 300.0
+    session_reap_interval_seconds: float = 600.0
+    session_reap_batch_size: int = 500
+
+    # "database" keeps a row per session; "token" issues HMAC-signed tokens
+    # verified in memory (see infrastructure/session_tokens.py). Signing
+    # keys are "<id>:<secret>" pairs, comma-separated, the signing key
+    # first. Logouts reach other workers within the refresh interval.
+    session_store: str = "database"
+    session_signing_keys: str = ""
+    session_revocation_refresh_seconds: float = 5.0
+
+    # Author id -> username lookups for post listings. Usernames never
+    # change, so entries only age out to bound memory.
+    author_cache_max_entries: int = 10_000
+
+    # Compiled template bytecode, kept across restarts. Empty means
+    # app_data/template_cache under the project root. Templates are only
+    # re-read from disk when auto-reload is on, for editing them live.
+    template_cache_dir: str = ""
+    template_auto_reload: bool = False
+
+    # Per-route request counts and latency histograms, DB pool and bcrypt
+    # stats, served in the Prometheus text format at /metrics. When a token
+    # is set, scrapes must send it as "Authorization: Bearer <token>".
+    metrics_enabled: bool = False
+    metrics_token: str = ""
+    # Statements slower than this are logged with the repository method
+    # that ran them; 0 disables the log.
+    slow_query_ms: float = 100.0
+    # Diagnostics for development, such as Server-Timing headers with each
+    # request's query count and DB time. Not for production.
+    debug: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_path=_env_str("BLOG_DATABASE_PATH", cls.database_path),
+            db_mode=_env_str("BLOG_DB_MODE", cls.db_mode),
+            db_journal_mode=_env_str("BLOG_DB_JOURNAL_MODE", cls.db_journal_mode),
+            db_synchronous=_env_str("BLOG_DB_SYNCHRONOUS", cls.db_synchronous),
+            db_busy_timeout_ms=_env_int("BLOG_DB_BUSY_TIMEOUT_MS", cls.db_busy_timeout_ms),
+            db_mmap_size=_env_int("BLOG_DB_MMAP_SIZE", cls.db_mmap_size),
+            db_cache_size=_env_int("BLOG_DB_CACHE_SIZE", cls.db_cache_size),
+            db_temp_store=_env_str("BLOG_DB_TEMP_STORE", cls.db_temp_store),
+            db_pool_size=_env_int("BLOG_DB_POOL_SIZE", cls.db_pool_size),
+            db_max_overflow=_env_int("BLOG_DB_MAX_OVERFLOW", cls.db_max_overflow),
+            db_pool_timeout_seconds=_env_float("BLOG_DB_POOL_TIMEOUT_SECONDS", cls.db_pool_timeout_seconds),
+            db_read_engine=_env_bool("BLOG_DB_READ_ENGINE", cls.db_read_engine),
+            page_cache_enabled=_env_bool("BLOG_PAGE_CACHE_ENABLED", cls.page_cache_enabled),
+            page_cache_max_entries=_env_int("BLOG_PAGE_CACHE_MAX_ENTRIES", cls.page_cache_max_entries),
+            page_cache_ttl_seconds=_env_float("BLOG_PAGE_CACHE_TTL_SECONDS", cls.page_cache_ttl_seconds),
+            page_cache_stale_seconds=_env_float("BLOG_PAGE_CACHE_STALE_SECONDS", cls.page_cache_stale_seconds),
+            feed_cache_ttl_seconds=_env_float("BLOG_FEED_CACHE_TTL_SECONDS", cls.feed_cache_ttl_seconds),
+            public_base_url=_env_str("BLOG_PUBLIC_BASE_URL", cls.public_base_url),
+            change_bus_poll_seconds=_env_float("BLOG_CHANGE_BUS_POLL_SECONDS", cls.change_bus_poll_seconds),
+            change_log_retention_seconds=_env_float("BLOG_CHANGE_LOG_RETENTION_SECONDS", cls.change_log_retention_seconds),
+            password_hash_pool=_env_str("BLOG_PASSWORD_HASH_POOL", cls.password_hash_pool),
+            password_hash_workers=_env_int("BLOG_PASSWORD_HASH_WORKERS", cls.password_hash_workers),
+            password_hash_queue_size=_env_int("BLOG_PASSWORD_HASH_QUEUE_SIZE", cls.password_hash_queue_size),
+            upload_max_bytes=_env_int("BLOG_UPLOAD_MAX_BYTES", cls.upload_max_bytes),
+            image_storage=_env_str("BLOG_IMAGE_STORAGE", cls.image_storage),
+            image_variants_enabled=_env_bool("BLOG_IMAGE_VARIANTS_ENABLED", cls.image_variants_enabled),
+            image_variant_widths=_env_int_tuple("BLOG_IMAGE_VARIANT_WIDTHS", cls.image_variant_widths),
+            image_variant_workers=_env_int("BLOG_IMAGE_VARIANT_WORKERS", cls.image_variant_workers),
+            export_max_per_user=_env_int("BLOG_EXPORT_MAX_PER_USER", cls.export_max_per_user),
+            session_cache_max_entries=_env_int("BLOG_SESSION_CACHE_MAX_ENTRIES", cls.session_cache_max_entries),
+            session_cache_ttl_seconds=_env_float("BLOG_SESSION_CACHE_TTL_SECONDS", cls.session_cache_ttl_seconds),
+            session_absolute_ttl_seconds=_env_float("BLOG_SESSION_ABSOLUTE_TTL_SECONDS", cls.session_absolute_ttl_seconds),
+            session_idle_ttl_seconds=_env_float("BLOG_SESSION_IDLE_TTL_SECONDS", cls.session_idle_ttl_seconds),
+            session_touch_interval_seconds=_env_float("BLOG_SESSION_TOUCH_INTERVAL_SECONDS", cls.session_touch_interval_seconds),
+            session_reap_interval_seconds=_env_float("BLOG_SESSION_REAP_INTERVAL_SECONDS", cls.session_reap_interval_seconds),
+            session_reap_batch_size=_env_int("BLOG_SESSION_REAP_BATCH_SIZE", cls.session_reap_batch_size),
+            session_store=_env_str("BLOG_SESSION_STORE", cls.session_store),
+            session_signing_keys=_env_str("BLOG_SESSION_SIGNING_KEYS", cls.session_signing_keys),
+            session_revocation_refresh_seconds=_env_float("BLOG_SESSION_REVOCATION_REFRESH_SECONDS", cls.session_revocation_refresh_seconds),
+            author_cache_max_entries=_env_int("BLOG_AUTHOR_CACHE_MAX_ENTRIES", cls.author_cache_max_entries),
+            template_cache_dir=_env_str("BLOG_TEMPLATE_CACHE_DIR", cls.template_cache_dir),
+            template_auto_reload=_env_bool("BLOG_TEMPLATE_AUTO_RELOAD", cls.template_auto_reload),
+            metrics_enabled=_env_bool("BLOG_METRICS_ENABLED", cls.metrics_enabled),
+            metrics_token=_env_str("BLOG_METRICS_TOKEN", cls.metrics_token),
+            slow_query_ms=_env_float("BLOG_SLOW_QUERY_MS", cls.slow_query_ms),
+            debug=_env_bool("BLOG_DEBUG", cls.debug),
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings.from_env()
@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from .entities import Post
+
+
+@dataclass(frozen=True)
+class PostCreated:
+    """A new post. Other workers only learn its id and time: `post`, the
+    whole post, is set in the worker that created it and None elsewhere."""
+
+    post_id: int
+    created_at: datetime
+    post: Optional[Post] = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def of(cls, post: Post) -> "PostCreated":
+        assert post.id is not None, "publish PostCreated once the post is stored"
+        return cls(post_id=post.id, created_at=post.created_at, post=post)
+
+
+@dataclass(frozen=True)
+class SessionRevoked:
+    session_id: str
+
+
+@dataclass(frozen=True)
+class ImageVariantsReady:
+    post_id: int
+    variants: Dict[int, str]
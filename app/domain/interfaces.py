@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, Optional, List, Sequence, Tuple
 
-from .entities import User, Post, Session
+from .entities import User, Post, PostPage, SearchPage, Session, StoredImage
 
 
 class UserRepository(ABC):
@@ -23,14 +24,47 @@ class PostRepository(ABC):
     def add(self, post: Post) -> Post:
         raise NotImplementedError
 
+    @abstractmethod
+    def bulk_add(self, posts: Sequence[Post]) -> int:
+        """Insert `posts` in one transaction; returns how many were added.
+
+        Unlike `add`, the posts' ids are not filled in.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def list_recent(self, limit: int = 20) -> List[Post]:
         raise NotImplementedError
 
+    @abstractmethod
+    def list_page(self, after_cursor: Optional[str] = None, limit: int = 20) -> PostPage:
+        """Return up to `limit` posts older than `after_cursor`, newest first."""
+        raise NotImplementedError
+
     @abstractmethod
     def get_by_id(self, post_id: int) -> Optional[Post]:
         raise NotImplementedError
 
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Post]:
+        """Every post, oldest first, read `batch_size` at a time so memory
+        stays flat however many there are.
+
+        The session's transaction is ended after each batch, so a long
+        iteration holds no snapshot between batches: posts added meanwhile
+        are included, posts deleted before their batch is read are not.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_image_variants(self, post_id: int, variants: Dict[int, str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        """Posts matching free-text `query`, most relevant first."""
+        raise NotImplementedError
+
 
 class SessionRepository(ABC):
     @abstractmethod
@@ -41,13 +75,162 @@ class SessionRepository(ABC):
     def get(self, session_id: str) -> Optional[Session]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_with_user(self, session_id: str) -> Optional[Tuple[Session, User]]:
+        """Return the session and the user owning it in a single lookup."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def touch(self, session_id: str, seen_at: datetime) -> None:
+        raise NotImplementedError
+
     @abstractmethod
     def delete(self, session_id: str) -> None:
         raise NotImplementedError
 
+    @abstractmethod
+    def delete_for_user(self, user_id: int) -> List[str]:
+        """Delete every session of `user_id`; returns the deleted ids."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        """Delete up to `limit` sessions created or last seen before the cutoffs."""
+        raise NotImplementedError
+
+
+class AsyncUserRepository(ABC):
+    @abstractmethod
+    async def get_by_username(self, username: str) -> Optional[User]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add(self, user: User) -> User:
+        raise NotImplementedError
+
+
+class AsyncPostRepository(ABC):
+    @abstractmethod
+    async def add(self, post: Post) -> Post:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bulk_add(self, posts: Sequence[Post]) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_recent(self, limit: int = 20) -> List[Post]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_page(self, after_cursor: Optional[str] = None, limit: int = 20) -> PostPage:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_by_id(self, post_id: int) -> Optional[Post]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> AsyncIterator[Post]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_image_variants(self, post_id: int, variants: Dict[int, str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        raise NotImplementedError
+
+
+class AsyncSessionRepository(ABC):
+    @abstractmethod
+    async def add(self, session: Session) -> Session:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_with_user(self, session_id: str) -> Optional[Tuple[Session, User]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def touch(self, session_id: str, seen_at: datetime) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_for_user(self, user_id: int) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        raise NotImplementedError
+
+
+class ImageTooLarge(Exception):
+    """Raised when an uploaded image exceeds the configured size limit."""
+
 
 class ImageStorageService(ABC):
     @abstractmethod
     def save_image(self, filename: str, data: bytes) -> str:
         """Save image and return relative path/URL."""
         raise NotImplementedError
+
+    @abstractmethod
+    async def save_image_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[StoredImage]:
+        """Save an image arriving in chunks; None if the stream was empty.
+
+        Raises ImageTooLarge as soon as the size limit is crossed.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_image(self, path: str) -> None:
+        """Give up a saved image that no post ended up using."""
+        raise NotImplementedError
+
+
+class EventPublisher(ABC):
+    @abstractmethod
+    def publish(self, event: object) -> None:
+        """Notify subscribers that something changed (e.g. `PostCreated`)."""
+        raise NotImplementedError
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when a PasswordHasher cannot accept more work right now."""
+
+
+class PasswordHasher(ABC):
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def verify(self, password: str, password_hash: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def hash_async(self, password: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        raise NotImplementedError
@@ -0,0 +1,66 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, post_id: int) -> str:
+    """Encode a post's sort key as an opaque, URL-safe cursor."""
+    raw = f"{created_at.isoformat()}|{post_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, post_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (binascii.Error, UnicodeError, ValueError) as ex:
+        raise ValueError("Invalid cursor") from ex
+
+
+def encode_rank_cursor(rank: float, post_id: int) -> str:
+    """Cursor for results ordered by a relevance score, then id."""
+    raw = f"{rank!r}|{post_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a cursor produced by `encode_rank_cursor`.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        rank, post_id = raw.rsplit("|", 1)
+        return float(rank), int(post_id)
+    except (binascii.Error, UnicodeError, ValueError) as ex:
+        raise ValueError("Invalid cursor") from ex
+
+
+def encode_id_cursor(post_id: int) -> str:
+    """Cursor for results ordered by id alone, newest first."""
+    raw = f"id|{post_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Decode a cursor produced by `encode_id_cursor`.
+
+    Raises ValueError if the cursor is malformed or of another kind.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        kind, post_id = raw.split("|", 1)
+        if kind != "id":
+            raise ValueError(kind)
+        return int(post_id)
+    except (binascii.Error, UnicodeError, ValueError) as ex:
+        raise ValueError("Invalid cursor") from ex
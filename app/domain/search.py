@@ -0,0 +1,33 @@
+import re
+from typing import List, Optional
+
+# Snippet highlight markers. Control characters practically never occur in
+# post text, and the web layer escapes everything else before turning these
+# into <mark> tags, so a stray one can at worst add a highlight.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# Words past this many are ignored: each term costs the index a lookup, and
+# the query is user input.
+MAX_TERMS = 8
+
+
+def match_terms(text: str) -> List[str]:
+    """The words of `text` as quoted FTS5 terms, at most MAX_TERMS of them."""
+    return [f'"{term}"' for term in _TERM.findall(text)[:MAX_TERMS]]
+
+
+def to_match_query(text: str) -> Optional[str]:
+    """Turn free text typed by a user into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted term, so operators and stray quotes in the
+    input are never interpreted, and all terms must match. The index stems
+    words ("running" finds "run"), which is why terms are not also matched
+    as prefixes. Returns None when the text contains no searchable words.
+    """
+    terms = match_terms(text)
+    if not terms:
+        return None
+    return " ".join(terms)
@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from .entities import Session
+
+
+@dataclass(frozen=True)
+class SessionPolicy:
+    """How long a session is honoured. A zero TTL disables that limit.
+
+    `absolute_ttl` counts from login; `idle_ttl` from the last request.
+    `last_seen_at` is only rewritten once it is `touch_interval` old, so an
+    active session costs one write per interval rather than one per request.
+    """
+
+    absolute_ttl: timedelta = timedelta(0)
+    idle_ttl: timedelta = timedelta(0)
+    touch_interval: timedelta = timedelta(minutes=5)
+
+    def is_expired(self, session: Session, now: datetime) -> bool:
+        created_before, seen_before = self.expiry_cutoffs(now)
+        if created_before is not None and session.created_at < created_before:
+            return True
+        return seen_before is not None and last_seen(session) < seen_before
+
+    def needs_touch(self, session: Session, now: datetime) -> bool:
+        return bool(self.idle_ttl) and now - last_seen(session) >= self.touch_interval
+
+    def expiry_cutoffs(self, now: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """`(created_before, seen_before)`: sessions older than either are expired."""
+        return (
+            now - self.absolute_ttl if self.absolute_ttl else None,
+            now - self.idle_ttl if self.idle_ttl else None,
+        )
+
+
+def last_seen(session: Session) -> datetime:
+    return session.last_seen_at or session.created_at
@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.domain.events import ImageVariantsReady, PostCreated, SessionRevoked
+from app.domain.interfaces import EventPublisher
+from .event_bus import Handler, InProcessEventBus
+from .models import ChangeLogModel
+
+
+logger = logging.getLogger(__name__)
+
+_change_log = ChangeLogModel.__table__
+
+# How often each worker deletes change_log rows past their retention.
+_PRUNE_INTERVAL_SECONDS = 60.0
+# Events waiting to be written while the database is unavailable.
+_MAX_QUEUED = 10_000
+
+Payload = Dict[str, Any]
+
+
+# Event kinds shared between workers: kind -> (event type, encode, decode).
+# Kinds are stored in change_log, so keep them stable; a worker skips kinds
+# it doesn't know, e.g. ones added by a newer build mid-deploy. Payloads
+# carry ids rather than content: change_log is kept for an hour and read by
+# every worker, and what's needed beyond an id can be read from its table.
+_CODECS: Dict[str, Tuple[Type[Any], Callable[[Any], Payload], Callable[[Payload], Any]]] = {
+    "post_created": (
+        PostCreated,
+        lambda event: {"post_id": event.post_id, "created_at": event.created_at.isoformat()},
+        lambda payload: PostCreated(
+            post_id=payload["post_id"],
+            created_at=datetime.fromisoformat(payload["created_at"]),
+        ),
+    ),
+    "session_revoked": (
+        SessionRevoked,
+        lambda event: {"session_id": event.session_id},
+        lambda payload: SessionRevoked(session_id=payload["session_id"]),
+    ),
+    "image_variants_ready": (
+        ImageVariantsReady,
+        lambda event: {
+            "post_id": event.post_id,
+            "variants": {str(width): path for width, path in event.variants.items()},
+        },
+        lambda payload: ImageVariantsReady(
+            post_id=payload["post_id"],
+            variants={int(width): path for width, path in payload["variants"].items()},
+        ),
+    ),
+}
+_KINDS = {event_type: kind for kind, (event_type, _, _) in _CODECS.items()}
+
+
+class SqliteChangeBus(EventPublisher):
+    """Events shared by the workers serving one SQLite database.
+
+    `publish` runs this worker's handlers at once, like InProcessEventBus,
+    and queues the event for the ``change_log`` table. Once started, a
+    background thread writes queued events and watches ``PRAGMA
+    data_version`` on a connection of its own. The value only moves when
+    another connection commits, so an idle database costs one pragma per
+    poll and no table read. When it moves, the rows after the last one seen
+    are read, and events published by other workers are handed to the
+    handlers subscribed with ``cross_worker=True``, on the bus thread.
+
+    Publishing never touches the database, so it is safe on the event
+    loop. Events published while the bus isn't running stay in this
+    worker. Rows are deleted after `retention_seconds`; caches fed by the
+    bus keep their TTLs as a backstop for anything missed.
+    """
+
+    def __init__(
+        self,
+        bind: Callable[[], Engine],
+        poll_seconds: float = 0.05,
+        retention_seconds: float = 3600.0,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self._bind = bind
+        self._poll_seconds = poll_seconds
+        self._retention = timedelta(seconds=retention_seconds)
+        self._clock = clock
+        self._local = InProcessEventBus()
+        self._remote = InProcessEventBus()
+        self._outbox: List[Tuple[str, Payload]] = []
+        self._outbox_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watch: Optional[Connection] = None
+        self._data_version: Optional[int] = None
+        self._last_id = 0
+        self.worker_id = ""
+
+    def subscribe(
+        self, event_type: Type[object], handler: Handler, cross_worker: bool = False
+    ) -> None:
+        """Call `handler` for events published here and, with
+        `cross_worker`, for those published by other workers too."""
+        self._local.subscribe(event_type, handler)
+        if cross_worker:
+            self._remote.subscribe(event_type, handler)
+
+    def publish(self, event: object) -> None:
+        self._local.publish(event)
+        kind = _KINDS.get(type(event))
+        if kind is None or self._thread is None:
+            return
+        payload = _CODECS[kind][1](event)
+        with self._outbox_lock:
+            if len(self._outbox) >= _MAX_QUEUED:
+                logger.warning("Change bus queue full; %r not shared with other workers", event)
+                return
+            self._outbox.append((kind, payload))
+        self._wake.set()
+
+    def start(self) -> None:
+        """Share events with the other workers until `stop`.
+
+        Only events published from now on are delivered; earlier rows are
+        history that this worker's fresh state already reflects.
+        """
+        if self._thread is not None:
+            return
+        # Chosen here rather than at import, so forked workers differ.
+        self.worker_id = uuid.uuid4().hex
+        self._stopping.clear()
+        self._watch = self._bind().connect()
+        # The version is read first: a commit after it is seen by the first poll.
+        self._changed()
+        with self._bind().connect() as conn:
+            self._last_id = conn.execute(select(func.max(_change_log.c.id))).scalar() or 0
+        self._thread = threading.Thread(target=self._run, name="change-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write the events still queued, then stop polling."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def poll(self) -> int:
+        """Write queued events, then deliver other workers' new ones.
+
+        Returns how many events were delivered. The bus thread calls this
+        every `poll_seconds`, and at once after a publish.
+        """
+        with self._poll_lock:
+            self._flush()
+            if not self._changed():
+                return 0
+            with self._bind().connect() as conn:
+                rows = conn.execute(
+                    select(
+                        _change_log.c.id,
+                        _change_log.c.kind,
+                        _change_log.c.payload,
+                        _change_log.c.origin,
+                    )
+                    .where(_change_log.c.id > self._last_id)
+                    .order_by(_change_log.c.id)
+                ).all()
+            delivered = 0
+            for row_id, kind, payload, origin in rows:
+                self._last_id = row_id
+                codec = _CODECS.get(kind)
+                if origin == self.worker_id or codec is None:
+                    continue
+                try:
+                    event = codec[2](payload)
+                except (KeyError, TypeError, ValueError):
+                    logger.warning("Skipping malformed change_log row %d (%s)", row_id, kind)
+                    continue
+                self._remote.publish(event)
+                delivered += 1
+            return delivered
+
+    def prune(self) -> int:
+        """Delete rows older than the retention period; returns how many."""
+        cutoff = self._clock() - self._retention
+        with self._bind().begin() as conn:
+            result = conn.execute(delete(_change_log).where(_change_log.c.created_at < cutoff))
+        return result.rowcount
+
+    def _run(self) -> None:
+        next_prune = time.monotonic()
+        try:
+            while True:
+                self._wake.wait(self._poll_seconds)
+                self._wake.clear()
+                stopping = self._stopping.is_set()
+                try:
+                    self.poll()
+                    if time.monotonic() >= next_prune:
+                        self.prune()
+                        next_prune = time.monotonic() + _PRUNE_INTERVAL_SECONDS
+                except Exception:
+                    logger.exception("Change bus poll failed")
+                if stopping:
+                    return
+        finally:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+
+    def _changed(self) -> bool:
+        assert self._watch is not None
+        version = self._watch.execute(text("PRAGMA data_version")).scalar()
+        # Ends the transaction SQLAlchemy began, so the next read is fresh.
+        self._watch.rollback()
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def _flush(self) -> None:
+        with self._outbox_lock:
+            batch, self._outbox = self._outbox, []
+        if not batch:
+            return
+        now, origin = self._clock(), self.worker_id
+        try:
+            with self._bind().begin() as conn:
+                conn.execute(
+                    insert(_change_log),
+                    [
+                        {"kind": kind, "payload": payload, "origin": origin, "created_at": now}
+                        for kind, payload in batch
+                    ],
+                )
+        except Exception:
+            # Kept for the next poll, ahead of anything published since.
+            with self._outbox_lock:
+                self._outbox[:0] = batch
+            raise
@@ -1,17 +1,218 @@
+import threading
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from app.config import Settings, get_settings
+from .sql_instrumentation import instrument_engine
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-DB_PATH = BASE_DIR / "app_data" / "blog.sqlite3"
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+DB_PATH = Path(get_settings().database_path or BASE_DIR / "app_data" / "blog.sqlite3")
 
 DATABASE_URL = f"sqlite:///{DB_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+
+_JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+_SYNCHRONOUS_LEVELS = ("off", "normal", "full", "extra")
+_TEMP_STORES = ("default", "file", "memory")
+
+
+def sqlite_pragmas(settings: Settings, read_only: bool = False) -> List[str]:
+    """PRAGMA statements run on every new connection.
+
+    WAL lets readers proceed while a write is in progress, and with
+    ``synchronous=NORMAL`` commits skip the fsync that WAL makes redundant
+    for durability against application crashes. ``busy_timeout`` makes a
+    second writer wait for the lock instead of failing with "database is
+    locked". Read-only connections leave the journal mode alone (it is a
+    property of the database file) and refuse writes via ``query_only``.
+    """
+    journal_mode = settings.db_journal_mode.lower()
+    synchronous = settings.db_synchronous.lower()
+    temp_store = settings.db_temp_store.lower()
+    if journal_mode not in _JOURNAL_MODES:
+        raise ValueError(f"Unknown SQLite journal mode {settings.db_journal_mode!r}")
+    if synchronous not in _SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unknown SQLite synchronous level {settings.db_synchronous!r}")
+    if temp_store not in _TEMP_STORES:
+        raise ValueError(f"Unknown SQLite temp_store {settings.db_temp_store!r}")
+
+    # busy_timeout first: switching a new database to WAL takes a lock that
+    # another worker's first connection may be holding.
+    pragmas = [f"PRAGMA busy_timeout = {int(settings.db_busy_timeout_ms)}"]
+    if not read_only:
+        pragmas.append(f"PRAGMA journal_mode = {journal_mode}")
+    pragmas += [
+        f"PRAGMA synchronous = {synchronous}",
+        f"PRAGMA mmap_size = {int(settings.db_mmap_size)}",
+        f"PRAGMA cache_size = {int(settings.db_cache_size)}",
+        f"PRAGMA temp_store = {temp_store}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def _apply_pragmas_on_connect(engine: Engine, pragmas: List[str]) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _pool_options(settings: Settings) -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
+
+
+def create_sqlite_engine(
+    url: str, settings: Settings, read_only: bool = False
+) -> Engine:
+    """Sync engine with the configured pool and per-connection PRAGMAs."""
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **_pool_options(settings),
+    )
+    _apply_pragmas_on_connect(engine, sqlite_pragmas(settings, read_only=read_only))
+    instrument_engine(engine, slow_query_ms=settings.slow_query_ms)
+    return engine
+
+
+def create_async_sqlite_engine(
+    url: str, settings: Settings, read_only: bool = False
+) -> AsyncEngine:
+    """aiosqlite counterpart of `create_sqlite_engine`."""
+    # The aiosqlite dialect defaults to NullPool, which would reconnect and
+    # rerun the PRAGMAs on every checkout.
+    engine = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, **_pool_options(settings)
+    )
+    _apply_pragmas_on_connect(
+        engine.sync_engine, sqlite_pragmas(settings, read_only=read_only)
+    )
+    instrument_engine(engine.sync_engine, slow_query_ms=settings.slow_query_ms)
+    return engine
+
+
+# Engines are created on first use rather than at import, so commands and
+# tests that never touch the database don't pay for one (or create its
+# directory).
+_engine: Optional[Engine] = None
+_read_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """The writer engine, created on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+            _engine = create_sqlite_engine(DATABASE_URL, get_settings())
+        return _engine
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_read_engine() -> Engine:
+    """The engine GET routes read through.
+
+    Without BLOG_DB_READ_ENGINE it is simply the writer; with it, reads get
+    their own pool and never wait on a checkout held by a slow write.
+    """
+    global _read_engine
+    if not get_settings().db_read_engine:
+        return get_engine()
+    get_engine()  # creates the database directory
+    with _engine_lock:
+        if _read_engine is None:
+            _read_engine = create_sqlite_engine(DATABASE_URL, get_settings(), read_only=True)
+        return _read_engine
+
+
+class LazySessionFactory:
+    """A `sessionmaker` whose engine is looked up when a session is opened."""
+
+    def __init__(self, get_bind: Callable[[], Engine]) -> None:
+        self._get_bind = get_bind
+        self._factory = sessionmaker(autocommit=False, autoflush=False)
+
+    def __call__(self) -> Session:
+        return self._factory(bind=self._get_bind())
+
+
+SessionLocal = LazySessionFactory(get_engine)
+ReadSessionLocal = LazySessionFactory(get_read_engine)
 
 Base = declarative_base()
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional["async_sessionmaker[AsyncSession]"] = None
+_async_read_engine: Optional[AsyncEngine] = None
+_async_read_session_factory: Optional["async_sessionmaker[AsyncSession]"] = None
+
+
+def get_async_session_factory() -> "async_sessionmaker[AsyncSession]":
+    """Session factory for the aiosqlite engine, created on first use."""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _async_engine = create_async_sqlite_engine(ASYNC_DATABASE_URL, get_settings())
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+def get_async_read_session_factory() -> "async_sessionmaker[AsyncSession]":
+    """Async counterpart of `ReadSessionLocal`."""
+    global _async_read_engine, _async_read_session_factory
+    if not get_settings().db_read_engine:
+        return get_async_session_factory()
+    if _async_read_session_factory is None:
+        _async_read_engine = create_async_sqlite_engine(
+            ASYNC_DATABASE_URL, get_settings(), read_only=True
+        )
+        _async_read_session_factory = async_sessionmaker(
+            _async_read_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_read_session_factory
+
+
+async def dispose_async_engine() -> None:
+    """Close pooled aiosqlite connections (they are bound to one event loop)."""
+    global _async_engine, _async_session_factory
+    global _async_read_engine, _async_read_session_factory
+    for async_engine in (_async_engine, _async_read_engine):
+        if async_engine is not None:
+            await async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+    _async_read_engine = None
+    _async_read_session_factory = None
+
+
+def engine_pools() -> Dict[str, Pool]:
+    """The connection pools in use, by engine role, for metrics."""
+    pools: Dict[str, Pool] = {}
+    if _engine is not None:
+        pools["writer"] = _engine.pool
+    if _read_engine is not None:
+        pools["reader"] = _read_engine.pool
+    if _async_engine is not None:
+        pools["async_writer"] = _async_engine.sync_engine.pool
+    if _async_read_engine is not None:
+        pools["async_reader"] = _async_read_engine.sync_engine.pool
+    return pools
+
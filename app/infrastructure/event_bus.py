@@ -0,0 +1,35 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Type
+
+from app.domain.interfaces import EventPublisher
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[object], None]
+
+
+class InProcessEventBus(EventPublisher):
+    """Synchronous publish/subscribe within a single process.
+
+    Handlers run on the publishing thread; a failing handler is logged and
+    does not prevent the others (or the publishing write) from completing.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[Type[object], List[Handler]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type: Type[object], handler: Handler) -> None:
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def publish(self, event: object) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(type(event), ()))
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Event handler %r failed for %r", handler, event)
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, List, Optional
+
+from app.domain.interfaces import PasswordHasher, PasswordHasherBusy
+
+
+@dataclass(frozen=True)
+class HashingPoolStats:
+    workers: int
+    max_pending: int
+    in_flight: int
+    queue_depth: int
+    completed: int
+    rejected: int
+    latency_count: int
+    latency_sum_seconds: float
+    latency_max_seconds: float
+    latency_p50_seconds: float
+    latency_p95_seconds: float
+
+
+class PooledPasswordHasher(PasswordHasher):
+    """Runs another hasher's bcrypt work on a bounded thread or process pool.
+
+    At most ``workers + queue_size`` operations may be pending at once;
+    beyond that `PasswordHasherBusy` is raised immediately so callers can
+    shed load (the routes answer 503) instead of piling up behind a login
+    storm. pyca/bcrypt releases the GIL while hashing, so a thread pool
+    already spreads work over cores; a process pool also isolates it from
+    the interpreter serving requests.
+    """
+
+    def __init__(
+        self,
+        inner: PasswordHasher,
+        workers: int = 2,
+        queue_size: int = 32,
+        kind: str = "thread",
+        latency_window: int = 1024,
+    ) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing pool kind {kind!r}")
+        self._inner = inner
+        self._workers = workers
+        self._max_pending = workers + queue_size
+        self._kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._recent: Deque[float] = deque(maxlen=latency_window)
+
+    def hash(self, password: str) -> str:
+        return self._submit(self._inner.hash, password).result()
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._submit(self._inner.verify, password, password_hash).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(self._inner.hash, password))
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit(self._inner.verify, password, password_hash)
+        )
+
+    def stats(self) -> HashingPoolStats:
+        with self._lock:
+            recent = sorted(self._recent)
+            return HashingPoolStats(
+                workers=self._workers,
+                max_pending=self._max_pending,
+                in_flight=self._pending,
+                queue_depth=max(0, self._pending - self._workers),
+                completed=self._completed,
+                rejected=self._rejected,
+                latency_count=self._latency_count,
+                latency_sum_seconds=self._latency_sum,
+                latency_max_seconds=self._latency_max,
+                latency_p50_seconds=_percentile(recent, 0.50),
+                latency_p95_seconds=_percentile(recent, 0.95),
+            )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                self._rejected += 1
+                raise PasswordHasherBusy("Password hashing pool is saturated")
+            self._pending += 1
+            if self._executor is None:
+                # Started by the first login or registration: a worker
+                # that never checks a password never spawns bcrypt workers.
+                self._executor = (
+                    ThreadPoolExecutor(self._workers, thread_name_prefix="bcrypt")
+                    if self._kind == "thread"
+                    else ProcessPoolExecutor(self._workers)
+                )
+            executor = self._executor
+        started = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(lambda _: self._record(time.perf_counter() - started))
+        return future
+
+    def _record(self, elapsed: float) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+            self._latency_count += 1
+            self._latency_sum += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+            self._recent.append(elapsed)
+
+
+class TimedPasswordHasher(PasswordHasher):
+    """Reports how long each hash or verify took, queueing included.
+
+    `observe(seconds, operation)` is called with "hash" or "verify" for
+    every call that produced a result; rejected calls are not timed.
+    """
+
+    def __init__(self, inner: PasswordHasher, observe: Callable[[float, str], None]) -> None:
+        self.inner = inner
+        self._observe = observe
+
+    def hash(self, password: str) -> str:
+        started = time.perf_counter()
+        result = self.inner.hash(password)
+        self._observe(time.perf_counter() - started, "hash")
+        return result
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        started = time.perf_counter()
+        result = self.inner.verify(password, password_hash)
+        self._observe(time.perf_counter() - started, "verify")
+        return result
+
+    async def hash_async(self, password: str) -> str:
+        started = time.perf_counter()
+        result = await self.inner.hash_async(password)
+        self._observe(time.perf_counter() - started, "hash")
+        return result
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        started = time.perf_counter()
+        result = await self.inner.verify_async(password, password_hash)
+        self._observe(time.perf_counter() - started, "verify")
+        return result
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,108 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Optional, Sequence
+
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+_VARIANT_NAME = re.compile(r"\.w\d+\.webp$")
+
+
+def variant_path(image_path: str, width: int) -> str:
+    """Where the `width`-pixel variant of `image_path` lives, next to it."""
+    original = PurePosixPath(image_path)
+    return str(original.with_name(f"{original.stem}.w{width}.webp"))
+
+
+def is_variant_path(path: str) -> bool:
+    return _VARIANT_NAME.search(path) is not None
+
+
+def render_variants(
+    base_dir: str, image_path: str, widths: Sequence[int], quality: int = 80
+) -> Dict[int, str]:
+    """Write WebP copies of an image bounded to each of `widths`.
+
+    Runs in a worker process. Widths beyond the original's are clamped to
+    it, so small images get a single re-encoded copy. Variants already on
+    disk (same source, same name) are reused, which makes retries cheap.
+    """
+    root = Path(base_dir)
+    with Image.open(root / image_path) as opened:
+        image = ImageOps.exif_transpose(opened)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        variants: Dict[int, str] = {}
+        for width in sorted({min(width, image.width) for width in widths}):
+            path = variant_path(image_path, width)
+            target = root / path
+            if not target.exists():
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                partial = target.with_name(f".{target.name}.part")
+                resized.save(partial, "WEBP", quality=quality)
+                os.replace(partial, target)
+            variants[width] = path
+    return variants
+
+
+class ImageVariantPipeline:
+    """Renders responsive variants of uploaded images on a process pool.
+
+    Decoding and resizing hold the GIL, so they run in worker processes
+    rather than on the request path. `on_ready(post_id, variants)` is
+    called from a pool thread once a post's variants are written; failures
+    (say, an upload that is not an image) are logged and the post keeps
+    showing its original.
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[int, Dict[int, str]], None],
+        widths: Sequence[int] = (320, 640, 1280),
+        workers: int = 2,
+        quality: int = 80,
+    ) -> None:
+        self._on_ready = on_ready
+        self._widths = tuple(widths)
+        self._workers = workers
+        self._quality = quality
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, base_dir: Path, post_id: int, image_path: str) -> Future:
+        with self._lock:
+            if self._executor is None:
+                # Started by the first post created with an image, so a
+                # process that only serves reads never spawns workers.
+                self._executor = ProcessPoolExecutor(self._workers)
+            executor = self._executor
+        future = executor.submit(
+            render_variants, str(base_dir), image_path, self._widths, self._quality
+        )
+        future.add_done_callback(lambda done: self._finish(post_id, image_path, done))
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _finish(self, post_id: int, image_path: str, future: Future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.warning("Could not render variants of %s: %s", image_path, error)
+            return
+        try:
+            self._on_ready(post_id, future.result())
+        except Exception:
+            logger.exception("Storing image variants failed for post %s", post_id)
@@ -0,0 +1,258 @@
+import math
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+# Seconds; covers a cached page hit up to a slow upload.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+# (suffix, labels, value) rows a collector contributes to one metric family.
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+    def _labels(self, values: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+
+_M = TypeVar("_M", bound=_Metric)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        return [("", self._labels(labels), value) for labels, value in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def add(self, amount: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        return [("", self._labels(labels), value) for labels, value in values]
+
+
+class Histogram(_Metric):
+    """Bucketed observations, stored per bucket and made cumulative on render."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self._bounds = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count above the last bound, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self._bounds) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        rows: List[Sample] = []
+        for labels, values in series:
+            base = self._labels(labels)
+            cumulative = 0.0
+            for bound, count in zip(self._bounds + (math.inf,), values):
+                cumulative += count
+                rows.append(("_bucket", dict(base, le=_format_value(bound)), cumulative))
+            rows.append(("_count", base, cumulative))
+            rows.append(("_sum", base, values[-1]))
+        return rows
+
+
+class CollectedMetric(_Metric):
+    """A metric whose samples are read from somewhere else at scrape time."""
+
+    def __init__(
+        self, name: str, help: str, kind: str, collect: Callable[[], Iterable[Sample]]
+    ) -> None:
+        super().__init__(name, help)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        return self._collect()
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Deliberately small instead of depending on ``prometheus_client``:
+    recording is a dict lookup and a few additions under an uncontended
+    lock, and everything else happens when ``/metrics`` is scraped. With
+    several workers each reports only its own numbers, and a scrape through
+    a load balancer reaches one of them at random.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collected(
+        self, name: str, help: str, kind: str, collect: Callable[[], Iterable[Sample]]
+    ) -> CollectedMetric:
+        return self._register(CollectedMetric(name, help, kind, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _M) -> _M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class PoolMetrics:
+    """Connection pool gauges and checkout counts for named engines' pools.
+
+    `pools` is asked for the current pools at every scrape, so pools
+    created lazily (the aiosqlite engines) appear once they exist; their
+    checkouts are counted from the moment they are first seen.
+    """
+
+    def __init__(self, registry: MetricsRegistry, pools: Callable[[], Dict[str, Pool]]) -> None:
+        self._pools = pools
+        self._watched: "weakref.WeakSet[Pool]" = weakref.WeakSet()
+        self._checkouts = registry.counter(
+            "blog_db_pool_checkouts_total", "Connections checked out of the pool.", ["engine"]
+        )
+        for name, help, read in (
+            ("blog_db_pool_size", "Connections the pool keeps open.", _pool_size),
+            ("blog_db_pool_checked_out", "Connections currently checked out.", _pool_checked_out),
+            ("blog_db_pool_overflow", "Connections open beyond the pool size.", _pool_overflow),
+        ):
+            registry.collected(name, help, "gauge", self._gauge(read))
+        self.watch()
+
+    def watch(self) -> None:
+        """Start counting checkouts on pools not seen before."""
+        for name, pool in self._pools().items():
+            if pool in self._watched:
+                continue
+            self._watched.add(pool)
+            event.listen(pool, "checkout", self._counter_for(name))
+
+    def _counter_for(self, engine: str) -> Callable[..., None]:
+        def on_checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+            self._checkouts.inc(engine)
+
+        return on_checkout
+
+    def _gauge(self, read: Callable[[Pool], float]) -> Callable[[], List[Sample]]:
+        def collect() -> List[Sample]:
+            self.watch()
+            return [("", {"engine": name}, read(pool)) for name, pool in self._pools().items()]
+
+        return collect
+
+
+def _pool_size(pool: Pool) -> float:
+    return float(getattr(pool, "size", lambda: 0)())
+
+
+def _pool_checked_out(pool: Pool) -> float:
+    return float(getattr(pool, "checkedout", lambda: 0)())
+
+
+def _pool_overflow(pool: Pool) -> float:
+    # QueuePool reports -pool_size before the first connection is made.
+    return float(max(0, getattr(pool, "overflow", lambda: 0)()))
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 
 from .db import Base
@@ -19,6 +19,10 @@ class UserModel(Base):
 
 class PostModel(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Serves the feed's ORDER BY created_at DESC, id DESC and keyset seeks.
+        Index("ix_posts_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -26,13 +30,78 @@ class PostModel(Base):
     content = Column(Text, nullable=False)
     image_path = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # {"<width>": "<path>"} of resized copies, filled in after the post is saved.
+    image_variants = Column(JSON, nullable=True)
 
     author = relationship("UserModel", back_populates="posts")
 
 
 class SessionModel(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Revoking or listing one user's sessions.
+        Index("ix_sessions_user_id_created_at", "user_id", "created_at"),
+        # The expiry reaper's range scans for absolute and idle TTLs.
+        Index("ix_sessions_created_at", "created_at"),
+        Index("ix_sessions_last_seen_at", "last_seen_at"),
+    )
 
     id = Column(String(128), primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Nullable so existing databases can gain the column; NULL reads as created_at.
+    last_seen_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+
+
+class SessionRevocationModel(Base):
+    """A signed session token, or all of a user's tokens, revoked before expiry.
+
+    Rows are append-only so workers can poll for new ones by id, and are
+    deleted once every token they cover has expired anyway.
+    """
+
+    __tablename__ = "session_revocations"
+    # AUTOINCREMENT: ids are never reused, so "id > last seen" misses nothing.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    # Set for a logout: the token's session id.
+    session_id = Column(String(64), nullable=True)
+    # Set for "sign out everywhere": the user's tokens issued before not_before.
+    user_id = Column(Integer, nullable=True)
+    not_before = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class ImageBlobModel(Base):
+    """One stored image in the content-addressed upload store."""
+
+    __tablename__ = "image_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(255), unique=True, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    # Saves that referenced this blob, reconciled against posts.image_path by
+    # garbage collection.
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Bumped on every save so GC spares blobs whose post is still being created.
+    last_referenced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ChangeLogModel(Base):
+    """An event published by one worker for the others sharing the database.
+
+    Append-only, read by id like session_revocations, and deleted after a
+    retention period (see infrastructure/change_bus.py).
+    """
+
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    # The publishing worker, which has already handled the event itself.
+    origin = Column(String(32), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
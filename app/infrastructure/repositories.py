@@ -1,14 +1,49 @@
-from typing import Optional, List
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, List, Sequence, Set, Tuple
 
+from sqlalchemy import (
+    Delete,
+    Row,
+    Select,
+    Update,
+    and_,
+    delete,
+    func,
+    insert,
+    literal,
+    null,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.domain.entities import User, Post, Session as DomainSession
+from app.domain.entities import User, Post, PostPage, SearchHit, SearchPage, Session as DomainSession
+from app.domain.pagination import (
+    encode_cursor,
+    decode_cursor,
+    encode_id_cursor,
+    decode_id_cursor,
+    encode_rank_cursor,
+    decode_rank_cursor,
+)
+from app.domain.search import HIGHLIGHT_START, HIGHLIGHT_END, match_terms, to_match_query
 from app.domain.interfaces import (
     UserRepository,
     PostRepository,
     SessionRepository,
+    AsyncUserRepository,
+    AsyncPostRepository,
+    AsyncSessionRepository,
 )
 from .models import UserModel, PostModel, SessionModel
+from .search import RANK_FUNCTION, RANKED_TERM_POSTS_MAX, posts_fts
+from .ttl_cache import TTLCache
+
+# Author id -> username, shared by every post repository in the process.
+AuthorNameCache = TTLCache[int, str]
 
 
 class SqlAlchemyUserRepository(UserRepository):
@@ -16,30 +51,16 @@ class SqlAlchemyUserRepository(UserRepository):
         self._db = db
 
     def get_by_username(self, username: str) -> Optional[User]:
-        row = (
-            self._db.query(UserModel)
-            .filter(UserModel.username == username)
-            .one_or_none()
-        )
+        row = self._db.connection().execute(_user_by_username(username)).one_or_none()
         if row is None:
             return None
-        return User(
-            id=row.id,
-            username=row.username,
-            password_hash=row.password_hash,
-            created_at=row.created_at,
-        )
+        return _user_from_row(row)
 
     def get_by_id(self, user_id: int) -> Optional[User]:
-        row = self._db.get(UserModel, user_id)
+        row = self._db.connection().execute(_user_by_id(user_id)).one_or_none()
         if row is None:
             return None
-        return User(
-            id=row.id,
-            username=row.username,
-            password_hash=row.password_hash,
-            created_at=row.created_at,
-        )
+        return _user_from_row(row)
 
     def add(self, user: User) -> User:
         row = UserModel(
@@ -54,53 +75,79 @@ class SqlAlchemyUserRepository(UserRepository):
 
 
 class SqlAlchemyPostRepository(PostRepository):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, author_names: Optional[AuthorNameCache] = None):
         self._db = db
+        self._author_names = author_names
 
     def add(self, post: Post) -> Post:
-        row = PostModel(
-            author_id=post.author_id,
-            title=post.title,
-            content=post.content,
-            image_path=post.image_path,
-        )
+        row = _post_to_row(post)
         self._db.add(row)
         self._db.commit()
         self._db.refresh(row)
         post.id = row.id
         return post
 
+    def bulk_add(self, posts: Sequence[Post]) -> int:
+        if not posts:
+            return 0
+        self._db.connection().execute(insert(PostModel.__table__), _post_values(posts))
+        self._db.commit()
+        return len(posts)
+
     def list_recent(self, limit: int = 20) -> List[Post]:
-        rows = (
-            self._db.query(PostModel)
-            .order_by(PostModel.created_at.desc())
-            .limit(limit)
-            .all()
-        )
-        return [
-            Post(
-                id=row.id,
-                author_id=row.author_id,
-                title=row.title,
-                content=row.content,
-                image_path=row.image_path,
-                created_at=row.created_at,
-            )
-            for row in rows
-        ]
+        rows = self._db.connection().execute(_newest_posts(limit)).all()
+        return self._with_authors([_post_from_row(row) for row in rows])
+
+    def list_page(self, after_cursor: Optional[str] = None, limit: int = 20) -> PostPage:
+        rows = self._db.connection().execute(_page_of_posts(after_cursor, limit)).all()
+        page = _build_page(rows, limit)
+        self._with_authors(page.items)
+        return page
 
     def get_by_id(self, post_id: int) -> Optional[Post]:
-        row = self._db.get(PostModel, post_id)
+        row = self._db.connection().execute(_post_by_id(post_id)).one_or_none()
         if row is None:
             return None
-        return Post(
-            id=row.id,
-            author_id=row.author_id,
-            title=row.title,
-            content=row.content,
-            image_path=row.image_path,
-            created_at=row.created_at,
-        )
+        return self._with_authors([_post_from_row(row)])[0]
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Post]:
+        after_id = 0
+        while True:
+            rows = self._db.connection().execute(_posts_after(after_id, batch_size)).all()
+            posts = self._with_authors([_post_from_row(row) for row in rows])
+            # Each batch reads in its own transaction: one held across a long
+            # download would pin its WAL snapshot, and no checkpoint could
+            # reset the log until the download finished.
+            self._db.rollback()
+            yield from posts
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1].id
+
+    def set_image_variants(self, post_id: int, variants: Dict[int, str]) -> None:
+        self._db.execute(_set_image_variants(post_id, variants))
+        self._db.commit()
+
+    def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        match = to_match_query(query)
+        if match is None:
+            return SearchPage(hits=[])
+        connection = self._db.connection()
+        if cursor is None:
+            ranked = connection.execute(_has_common_term(query)).first() is None
+        else:
+            ranked = _is_rank_cursor(cursor)
+        rows = connection.execute(_search_posts(match, cursor, limit, ranked)).all()
+        page = _build_search_page(rows, limit, ranked)
+        self._with_authors([hit.post for hit in page.hits])
+        return page
+
+    def _with_authors(self, posts: List[Post]) -> List[Post]:
+        missing = _cached_authors(posts, self._author_names)
+        if missing:
+            names = dict(self._db.execute(_usernames_by_id(missing)).tuples().all())
+            _fill_authors(posts, names, self._author_names)
+        return posts
 
 
 class SqlAlchemySessionRepository(SessionRepository):
@@ -114,13 +161,471 @@ class SqlAlchemySessionRepository(SessionRepository):
         return session
 
     def get(self, session_id: str) -> Optional[DomainSession]:
-        row = self._db.get(SessionModel, session_id)
+        row = self._db.connection().execute(_session_by_id(session_id)).one_or_none()
         if row is None:
             return None
-        return DomainSession(id=row.id, user_id=row.user_id, created_at=row.created_at)
+        return _session_from_row(row)
+
+    def get_with_user(self, session_id: str) -> Optional[Tuple[DomainSession, User]]:
+        row = self._db.connection().execute(_session_with_user(session_id)).one_or_none()
+        if row is None:
+            return None
+        return _split_session_with_user(row)
+
+    def touch(self, session_id: str, seen_at: datetime) -> None:
+        self._db.execute(_touch_session(session_id, seen_at))
+        self._db.commit()
 
     def delete(self, session_id: str) -> None:
         row = self._db.get(SessionModel, session_id)
         if row is not None:
             self._db.delete(row)
             self._db.commit()
+
+    def delete_for_user(self, user_id: int) -> List[str]:
+        session_ids = list(self._db.scalars(_delete_sessions_of_user(user_id)))
+        self._db.commit()
+        return session_ids
+
+    def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        result = self._db.execute(_expired_sessions(created_before, seen_before, limit))
+        self._db.commit()
+        return result.rowcount
+
+
+class AsyncSqlAlchemyUserRepository(AsyncUserRepository):
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        connection = await self._db.connection()
+        row = (await connection.execute(_user_by_username(username))).one_or_none()
+        if row is None:
+            return None
+        return _user_from_row(row)
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        connection = await self._db.connection()
+        row = (await connection.execute(_user_by_id(user_id))).one_or_none()
+        if row is None:
+            return None
+        return _user_from_row(row)
+
+    async def add(self, user: User) -> User:
+        row = UserModel(
+            username=user.username,
+            password_hash=user.password_hash,
+        )
+        self._db.add(row)
+        await self._db.commit()
+        await self._db.refresh(row)
+        user.id = row.id
+        return user
+
+
+class AsyncSqlAlchemyPostRepository(AsyncPostRepository):
+    def __init__(self, db: AsyncSession, author_names: Optional[AuthorNameCache] = None):
+        self._db = db
+        self._author_names = author_names
+
+    async def add(self, post: Post) -> Post:
+        row = _post_to_row(post)
+        self._db.add(row)
+        await self._db.commit()
+        await self._db.refresh(row)
+        post.id = row.id
+        return post
+
+    async def bulk_add(self, posts: Sequence[Post]) -> int:
+        if not posts:
+            return 0
+        connection = await self._db.connection()
+        await connection.execute(insert(PostModel.__table__), _post_values(posts))
+        await self._db.commit()
+        return len(posts)
+
+    async def list_recent(self, limit: int = 20) -> List[Post]:
+        connection = await self._db.connection()
+        rows = (await connection.execute(_newest_posts(limit))).all()
+        return await self._with_authors([_post_from_row(row) for row in rows])
+
+    async def list_page(self, after_cursor: Optional[str] = None, limit: int = 20) -> PostPage:
+        connection = await self._db.connection()
+        rows = (await connection.execute(_page_of_posts(after_cursor, limit))).all()
+        page = _build_page(rows, limit)
+        await self._with_authors(page.items)
+        return page
+
+    async def get_by_id(self, post_id: int) -> Optional[Post]:
+        connection = await self._db.connection()
+        row = (await connection.execute(_post_by_id(post_id))).one_or_none()
+        if row is None:
+            return None
+        return (await self._with_authors([_post_from_row(row)]))[0]
+
+    async def iter_all(self, batch_size: int = 1000) -> AsyncIterator[Post]:
+        after_id = 0
+        while True:
+            connection = await self._db.connection()
+            rows = (await connection.execute(_posts_after(after_id, batch_size))).all()
+            posts = await self._with_authors([_post_from_row(row) for row in rows])
+            await self._db.rollback()
+            for post in posts:
+                yield post
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1].id
+
+    async def set_image_variants(self, post_id: int, variants: Dict[int, str]) -> None:
+        await self._db.execute(_set_image_variants(post_id, variants))
+        await self._db.commit()
+
+    async def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        match = to_match_query(query)
+        if match is None:
+            return SearchPage(hits=[])
+        connection = await self._db.connection()
+        if cursor is None:
+            ranked = (await connection.execute(_has_common_term(query))).first() is None
+        else:
+            ranked = _is_rank_cursor(cursor)
+        rows = (await connection.execute(_search_posts(match, cursor, limit, ranked))).all()
+        page = _build_search_page(rows, limit, ranked)
+        await self._with_authors([hit.post for hit in page.hits])
+        return page
+
+    async def _with_authors(self, posts: List[Post]) -> List[Post]:
+        missing = _cached_authors(posts, self._author_names)
+        if missing:
+            names = dict((await self._db.execute(_usernames_by_id(missing))).tuples().all())
+            _fill_authors(posts, names, self._author_names)
+        return posts
+
+
+class AsyncSqlAlchemySessionRepository(AsyncSessionRepository):
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def add(self, session: DomainSession) -> DomainSession:
+        row = SessionModel(id=session.id, user_id=session.user_id)
+        self._db.add(row)
+        await self._db.commit()
+        return session
+
+    async def get(self, session_id: str) -> Optional[DomainSession]:
+        connection = await self._db.connection()
+        row = (await connection.execute(_session_by_id(session_id))).one_or_none()
+        if row is None:
+            return None
+        return _session_from_row(row)
+
+    async def get_with_user(self, session_id: str) -> Optional[Tuple[DomainSession, User]]:
+        connection = await self._db.connection()
+        row = (await connection.execute(_session_with_user(session_id))).one_or_none()
+        if row is None:
+            return None
+        return _split_session_with_user(row)
+
+    async def touch(self, session_id: str, seen_at: datetime) -> None:
+        await self._db.execute(_touch_session(session_id, seen_at))
+        await self._db.commit()
+
+    async def delete(self, session_id: str) -> None:
+        row = await self._db.get(SessionModel, session_id)
+        if row is not None:
+            await self._db.delete(row)
+            await self._db.commit()
+
+    async def delete_for_user(self, user_id: int) -> List[str]:
+        session_ids = list(await self._db.scalars(_delete_sessions_of_user(user_id)))
+        await self._db.commit()
+        return session_ids
+
+    async def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        result = await self._db.execute(_expired_sessions(created_before, seen_before, limit))
+        await self._db.commit()
+        return result.rowcount
+
+
+# Statements and row mapping shared by the sync and async repositories.
+#
+# Reads select these columns and run on the session's connection, so results
+# are plain rows mapped straight into entities: no ORM instances, identity
+# map or autoflush in between. Each column list is in the order its
+# _*_from_row function unpacks.
+
+_USER_COLUMNS = (UserModel.id, UserModel.username, UserModel.password_hash, UserModel.created_at)
+_POST_COLUMNS = (
+    PostModel.id,
+    PostModel.author_id,
+    PostModel.title,
+    PostModel.content,
+    PostModel.image_path,
+    PostModel.created_at,
+    PostModel.image_variants,
+)
+_SESSION_COLUMNS = (
+    SessionModel.id,
+    SessionModel.user_id,
+    SessionModel.created_at,
+    SessionModel.last_seen_at,
+)
+
+
+def _user_by_username(username: str) -> Select:
+    return select(*_USER_COLUMNS).where(UserModel.username == username)
+
+
+def _user_by_id(user_id: int) -> Select:
+    return select(*_USER_COLUMNS).where(UserModel.id == user_id)
+
+
+def _session_by_id(session_id: str) -> Select:
+    return select(*_SESSION_COLUMNS).where(SessionModel.id == session_id)
+
+
+def _session_with_user(session_id: str) -> Select:
+    return (
+        select(*_SESSION_COLUMNS, *_USER_COLUMNS)
+        .join_from(SessionModel, UserModel, SessionModel.user_id == UserModel.id)
+        .where(SessionModel.id == session_id)
+    )
+
+
+def _split_session_with_user(row: Row) -> Tuple[DomainSession, User]:
+    width = len(_SESSION_COLUMNS)
+    return _session_from_row(row[:width]), _user_from_row(row[width:])
+
+
+def _touch_session(session_id: str, seen_at: datetime) -> Update:
+    return update(SessionModel).where(SessionModel.id == session_id).values(last_seen_at=seen_at)
+
+
+def _delete_sessions_of_user(user_id: int) -> Delete:
+    # One statement, so a session created meanwhile can't escape between
+    # reading the ids (needed for SessionRevoked) and deleting the rows.
+    return (
+        delete(SessionModel).where(SessionModel.user_id == user_id).returning(SessionModel.id)
+    )
+
+
+def _expired_sessions(
+    created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+) -> Delete:
+    """DELETE of at most `limit` expired sessions, so one batch is one short
+    write transaction however many rows have piled up."""
+    expired = []
+    if created_before is not None:
+        expired.append(SessionModel.created_at < created_before)
+    if seen_before is not None:
+        expired.append(SessionModel.last_seen_at < seen_before)
+        expired.append(
+            and_(SessionModel.last_seen_at.is_(None), SessionModel.created_at < seen_before)
+        )
+    if not expired:
+        # No TTL configured: nothing is ever expired.
+        expired.append(SessionModel.id.is_(None))
+    batch = select(SessionModel.id).where(or_(*expired)).limit(limit).scalar_subquery()
+    return (
+        delete(SessionModel)
+        .where(SessionModel.id.in_(batch))
+        # Nothing in the session needs to learn which rows went.
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _usernames_by_id(user_ids: Iterable[int]) -> Select:
+    return select(UserModel.id, UserModel.username).where(UserModel.id.in_(sorted(user_ids)))
+
+
+def _cached_authors(posts: List[Post], cache: Optional[AuthorNameCache]) -> Set[int]:
+    """Fill in cached author names; returns the author ids still unknown.
+
+    Usernames never change, so a cached name is never stale.
+    """
+    known: Dict[int, Optional[str]] = {}
+    for post in posts:
+        if post.author_id not in known:
+            known[post.author_id] = cache.get(post.author_id) if cache is not None else None
+        post.author_username = known[post.author_id]
+    return {author_id for author_id, name in known.items() if name is None}
+
+
+def _fill_authors(
+    posts: List[Post], names: Dict[int, str], cache: Optional[AuthorNameCache]
+) -> None:
+    for post in posts:
+        if post.author_username is None:
+            post.author_username = names.get(post.author_id)
+    if cache is not None:
+        for author_id, name in names.items():
+            cache.set(author_id, name)
+
+
+def _post_by_id(post_id: int) -> Select:
+    return select(*_POST_COLUMNS).where(PostModel.id == post_id)
+
+
+def _newest_posts(limit: int) -> Select:
+    return (
+        select(*_POST_COLUMNS)
+        .order_by(PostModel.created_at.desc(), PostModel.id.desc())
+        .limit(limit)
+    )
+
+
+def _posts_after(after_id: int, limit: int) -> Select:
+    # Keyset batches on the primary key: each is a short seek, and no cursor
+    # stays open while the caller works through the previous batch.
+    return select(*_POST_COLUMNS).where(PostModel.id > after_id).order_by(PostModel.id).limit(limit)
+
+
+def _page_of_posts(after_cursor: Optional[str], limit: int) -> Select:
+    # One extra row tells _build_page whether another page follows.
+    stmt = _newest_posts(limit + 1)
+    if after_cursor is not None:
+        created_at, post_id = decode_cursor(after_cursor)
+        # Row-value comparison lets SQLite seek straight into
+        # ix_posts_created_at_id instead of skipping over earlier pages.
+        stmt = stmt.where(
+            tuple_(PostModel.created_at, PostModel.id) < (created_at, post_id)
+        )
+    return stmt
+
+
+def _has_common_term(query: str) -> Select:
+    # Each probe stops after RANKED_TERM_POSTS_MAX + 1 postings.
+    probes = [
+        select(posts_fts.c.rowid)
+        .where(posts_fts.c.posts_fts.op("MATCH")(term))
+        .limit(1)
+        .offset(RANKED_TERM_POSTS_MAX)
+        .exists()
+        for term in match_terms(query)
+    ]
+    return select(literal(1)).where(or_(*probes))
+
+
+def _is_rank_cursor(cursor: str) -> bool:
+    # Later pages keep the order the first one was listed in.
+    try:
+        decode_id_cursor(cursor)
+    except ValueError:
+        return True
+    return False
+
+
+def _search_posts(match: str, cursor: Optional[str], limit: int, ranked: bool) -> Select:
+    rank = posts_fts.c.rank
+    stmt = (
+        select(
+            *_POST_COLUMNS,
+            func.snippet(posts_fts.c.posts_fts, 1, HIGHLIGHT_START, HIGHLIGHT_END, "…", 24),
+            # Reading `rank` is what runs bm25, so unranked queries skip it.
+            rank if ranked else null(),
+        )
+        .join_from(posts_fts, PostModel, PostModel.id == posts_fts.c.rowid)
+        .where(posts_fts.c.posts_fts.op("MATCH")(match))
+        .limit(limit + 1)
+    )
+    if not ranked:
+        # FTS5 walks its postings in rowid order, so this reads one page.
+        stmt = stmt.order_by(posts_fts.c.rowid.desc())
+        if cursor is not None:
+            stmt = stmt.where(posts_fts.c.rowid < decode_id_cursor(cursor))
+        return stmt
+    # Makes `rank` the weighted bm25 (lower is better) for this query.
+    stmt = stmt.where(rank.op("MATCH")(RANK_FUNCTION)).order_by(rank, PostModel.id)
+    if cursor is not None:
+        after_rank, after_id = decode_rank_cursor(cursor)
+        stmt = stmt.where(tuple_(rank, PostModel.id) > (after_rank, after_id))
+    return stmt
+
+
+def _build_search_page(rows: Sequence[Row], limit: int, ranked: bool) -> SearchPage:
+    # Each row is the post's columns, then the snippet and the rank.
+    hits = [SearchHit(post=_post_from_row(row[:-2]), snippet=row[-2]) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_rank_cursor(last[-1], last.id) if ranked else encode_id_cursor(last.id)
+    return SearchPage(hits=hits, next_cursor=next_cursor)
+
+
+def _set_image_variants(post_id: int, variants: Dict[int, str]) -> Update:
+    # JSON object keys are strings; _post_from_row turns them back into ints.
+    return (
+        update(PostModel)
+        .where(PostModel.id == post_id)
+        .values(image_variants={str(width): path for width, path in variants.items()})
+    )
+
+
+def _build_page(rows: Sequence[Row], limit: int) -> PostPage:
+    items = [_post_from_row(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return PostPage(items=items, next_cursor=next_cursor)
+
+
+def _user_from_row(row: Sequence[Any]) -> User:
+    user_id, username, password_hash, created_at = row
+    return User(
+        id=user_id,
+        username=username,
+        password_hash=password_hash,
+        created_at=created_at,
+    )
+
+
+def _post_to_row(post: Post) -> PostModel:
+    return PostModel(
+        author_id=post.author_id,
+        title=post.title,
+        content=post.content,
+        image_path=post.image_path,
+    )
+
+
+def _post_values(posts: Sequence[Post]) -> List[Dict[str, Any]]:
+    # A list of parameter sets makes the insert one executemany() with no
+    # RETURNING, rather than a round trip per row to learn its id.
+    return [
+        {
+            "author_id": post.author_id,
+            "title": post.title,
+            "content": post.content,
+            "image_path": post.image_path,
+            "created_at": post.created_at,
+        }
+        for post in posts
+    ]
+
+
+def _post_from_row(row: Sequence[Any]) -> Post:
+    post_id, author_id, title, content, image_path, created_at, variants = row
+    return Post(
+        id=post_id,
+        author_id=author_id,
+        title=title,
+        content=content,
+        image_path=image_path,
+        created_at=created_at,
+        image_variants={int(width): path for width, path in variants.items()} if variants else {},
+    )
+
+
+def _session_from_row(row: Sequence[Any]) -> DomainSession:
+    session_id, user_id, created_at, last_seen_at = row
+    return DomainSession(
+        id=session_id,
+        user_id=user_id,
+        created_at=created_at,
+        last_seen_at=last_seen_at,
+    )
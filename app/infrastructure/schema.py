@@ -0,0 +1,126 @@
+import hashlib
+from typing import Callable, List, Tuple
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import models  # noqa: F401  (declares the tables on Base.metadata)
+from .db import Base
+from .search import create_search_index
+
+# The schema this code expects, recorded in the database as
+# `PRAGMA user_version`. Bump it whenever a model (or the search index)
+# changes, and update the fingerprint pinned in tests/test_schema.py.
+SCHEMA_VERSION = 2
+
+# Changes the additive upgrade can't make by itself, such as backfilling a
+# new column, as (version, step) pairs in version order. Each step runs once,
+# after the tables, columns and indexes of the models exist.
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = []
+
+
+def schema_version(bind: Engine) -> int:
+    """The version recorded in the database; 0 for new and unversioned ones."""
+    with bind.connect() as conn:
+        return _user_version(conn)
+
+
+def _user_version(conn: Connection) -> int:
+    return int(conn.execute(text("PRAGMA user_version")).scalar() or 0)
+
+
+def ensure_schema(bind: Engine) -> bool:
+    """Upgrade the database to SCHEMA_VERSION if it is behind.
+
+    A current database costs one PRAGMA read instead of reflecting every
+    table. One that is ahead was upgraded by a newer build during a rolling
+    deploy; upgrades only add, so it is used as is. Returns whether an
+    upgrade ran.
+
+    The upgrade runs in one transaction under SQLite's write lock, so it
+    is all-or-nothing, and workers starting together on a new database
+    take turns: those that waited find the version current and move on.
+    """
+    if schema_version(bind) >= SCHEMA_VERSION:
+        return False
+    # The driver's own transaction handling would commit before each DDL
+    # statement, so the transaction is managed here instead.
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            version = _user_version(conn)
+            if version < SCHEMA_VERSION:
+                upgrade_schema(conn, from_version=version)
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+    return version < SCHEMA_VERSION
+
+
+def upgrade_schema(conn: Connection, from_version: int = 0) -> None:
+    """Bring the database up to the models, then record SCHEMA_VERSION.
+
+    Every step is idempotent, so it is safe on a database that is already
+    partly (or wholly) upgraded.
+    """
+    Base.metadata.create_all(bind=conn)
+    ensure_columns(conn)
+    ensure_indexes(conn)
+    create_search_index(conn)
+    for version, step in MIGRATIONS:
+        if from_version < version <= SCHEMA_VERSION:
+            step(conn)
+    # PRAGMA arguments can't be bound parameters.
+    conn.execute(text(f"PRAGMA user_version = {int(SCHEMA_VERSION)}"))
+
+
+def ensure_indexes(conn: Connection) -> None:
+    """Create indexes added to models after their tables already existed.
+
+    `create_all` only emits CREATE INDEX together with CREATE TABLE, so
+    databases created before an index was declared would never get it.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def ensure_columns(conn: Connection) -> None:
+    """Add nullable columns declared on models after their tables existed.
+
+    Like indexes, `create_all` never alters an existing table.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(
+                text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            )
+
+
+def schema_fingerprint(metadata: MetaData = Base.metadata) -> str:
+    """Digest of the tables, columns and indexes `metadata` declares.
+
+    Pinned per SCHEMA_VERSION by a test, so changing a model without
+    bumping the version fails there rather than leaving databases behind.
+    """
+    lines = []
+    for table in metadata.sorted_tables:
+        lines.append(f"table {table.name}")
+        for column in table.columns:
+            targets = sorted(key.target_fullname for key in column.foreign_keys)
+            lines.append(
+                f"column {column.name} {column.type} nullable={column.nullable} "
+                f"pk={column.primary_key} fk={targets}"
+            )
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            columns = [column.name for column in index.columns]
+            lines.append(f"index {index.name} {columns} unique={index.unique}")
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()[:16]
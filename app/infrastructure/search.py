@@ -0,0 +1,78 @@
+from sqlalchemy import column, table, text
+from sqlalchemy.engine import Connection, Engine
+
+# External-content FTS5 index over posts: it stores only the inverted index
+# and reads title/content back from `posts` by rowid. Triggers keep it in
+# step with every insert, update and delete on `posts`.
+posts_fts = table("posts_fts", column("rowid"), column("rank"), column("posts_fts"))
+
+# Title matches weigh ten times as much as content matches in BM25. Queries
+# pass it as `rank MATCH ...` rather than storing it in the index config:
+# rewriting that config under connections that already opened the index
+# makes their next ORDER BY rank fail.
+RANK_FUNCTION = "bm25(10.0, 1.0)"
+
+# BM25 weighs each term by reading its whole posting list, so ranking costs
+# grow with the most common term's post count however few posts match. A
+# query is ranked only while every term is in at most this many posts;
+# otherwise its matches are listed newest first, which stops once the page
+# is full. A word in that many posts says little about relevance.
+RANKED_TERM_POSTS_MAX = 1000
+
+_CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, content,
+    content='posts', content_rowid='id',
+    tokenize='porter unicode61'
+)
+"""
+
+_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_after_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_after_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_after_update AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+)
+
+
+def ensure_search_index(bind: Engine) -> None:
+    """Create the posts_fts index and its triggers if they are missing.
+
+    A freshly created index is filled from the existing posts, so upgrading
+    a populated database needs no separate step.
+    """
+    with bind.begin() as conn:
+        create_search_index(conn)
+
+
+def create_search_index(conn: Connection) -> None:
+    """`ensure_search_index` within the caller's transaction."""
+    existed = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+    ).first() is not None
+    conn.execute(text(_CREATE_INDEX))
+    for trigger in _TRIGGERS:
+        conn.execute(text(trigger))
+    if not existed:
+        conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(bind: Engine) -> None:
+    """Re-index every post from scratch, then merge the index into one segment."""
+    with bind.begin() as conn:
+        conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+        conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('optimize')"))
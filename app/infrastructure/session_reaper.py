@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app.domain.interfaces import SessionRepository
+from app.domain.sessions import SessionPolicy
+from .repositories import SqlAlchemySessionRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionReaper:
+    """Deletes expired sessions in the background.
+
+    Each batch of at most `batch_size` rows is its own short transaction,
+    with a pause between batches, so a backlog of millions of rows never
+    holds SQLite's write lock long enough to stall logins or posts.
+    Like the image store, it uses the sync session factory in both DB
+    modes and runs on a worker thread. `repository` picks the session
+    store; the token store prunes its revocation list instead.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        policy: SessionPolicy,
+        batch_size: int = 500,
+        interval_seconds: float = 600.0,
+        pause_seconds: float = 0.05,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        repository: Callable[[Session], SessionRepository] = SqlAlchemySessionRepository,
+    ) -> None:
+        self._session_factory = session_factory
+        self._policy = policy
+        self._batch_size = batch_size
+        self._interval = interval_seconds
+        self._pause = pause_seconds
+        self._clock = clock
+        self._repository = repository
+
+    def reap(self) -> int:
+        """Delete every session expired as of now; returns how many."""
+        created_before, seen_before = self._policy.expiry_cutoffs(self._clock())
+        if created_before is None and seen_before is None:
+            return 0
+        removed = 0
+        while True:
+            with self._session_factory() as db:
+                deleted = self._repository(db).delete_expired(
+                    created_before, seen_before, self._batch_size
+                )
+            removed += deleted
+            if deleted < self._batch_size:
+                return removed
+            time.sleep(self._pause)
+
+    async def run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                removed = await asyncio.to_thread(self.reap)
+            except Exception:
+                logger.exception("Reaping expired sessions failed")
+                continue
+            if removed:
+                logger.info("Reaped %d expired sessions", removed)
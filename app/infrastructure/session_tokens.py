@@ -0,0 +1,384 @@
+import asyncio
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.domain.entities import Session as DomainSession, User
+from app.domain.interfaces import AsyncSessionRepository, SessionRepository
+from .models import SessionRevocationModel
+
+_KEY_ID = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+_MIN_SECRET_BYTES = 32
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    session_id: str
+    user_id: int
+    username: str
+    issued_at: datetime
+    expires_at: datetime
+
+
+def parse_signing_keys(raw: str) -> List[Tuple[str, bytes]]:
+    """Parse ``"<key id>:<secret>,..."``; the first key signs, all verify.
+
+    To rotate, put the new key first and keep the old one listed until the
+    tokens it signed have expired.
+    """
+    keys: List[Tuple[str, bytes]] = []
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        key_id, sep, secret = item.strip().partition(":")
+        if not sep or not _KEY_ID.match(key_id):
+            raise ValueError(f"Signing keys must look like '<id>:<secret>'; got key id {key_id!r}")
+        if len(secret.encode()) < _MIN_SECRET_BYTES:
+            raise ValueError(f"Signing key {key_id!r} must be at least {_MIN_SECRET_BYTES} bytes")
+        if any(existing == key_id for existing, _ in keys):
+            raise ValueError(f"Signing key id {key_id!r} is listed twice")
+        keys.append((key_id, secret.encode()))
+    if not keys:
+        raise ValueError("Token sessions need at least one signing key (BLOG_SESSION_SIGNING_KEYS)")
+    return keys
+
+
+class SessionTokenCodec:
+    """Issues and verifies ``<key id>.<claims>.<HMAC-SHA256>`` session tokens.
+
+    The claims are compact JSON in unpadded base64url, so the token is a
+    valid cookie value as is. The key id names the key that signed it,
+    which lets older keys keep verifying while a new one signs.
+    """
+
+    def __init__(self, keys: Sequence[Tuple[str, bytes]]) -> None:
+        if not keys:
+            raise ValueError("SessionTokenCodec needs at least one key")
+        self._signing_key_id, self._signing_key = keys[0]
+        self._keys: Dict[str, bytes] = dict(keys)
+
+    def issue(self, claims: TokenClaims) -> str:
+        payload = _b64encode(
+            json.dumps(
+                {
+                    "sid": claims.session_id,
+                    "uid": claims.user_id,
+                    "usr": claims.username,
+                    "iat": _epoch(claims.issued_at),
+                    "exp": _epoch(claims.expires_at),
+                },
+                separators=(",", ":"),
+            ).encode()
+        )
+        signed = f"{self._signing_key_id}.{payload}"
+        return f"{signed}.{_sign(self._signing_key, signed)}"
+
+    def verify(self, token: str) -> Optional[TokenClaims]:
+        """The claims of a token signed by a known key; expiry is not checked."""
+        parts = token.split(".")
+        if len(parts) != 3:
+            return None
+        key_id, payload, signature = parts
+        key = self._keys.get(key_id)
+        if key is None or not hmac.compare_digest(_sign(key, f"{key_id}.{payload}"), signature):
+            return None
+        try:
+            data = json.loads(_b64decode(payload))
+            return TokenClaims(
+                session_id=str(data["sid"]),
+                user_id=int(data["uid"]),
+                username=str(data["usr"]),
+                issued_at=datetime.utcfromtimestamp(int(data["iat"])),
+                expires_at=datetime.utcfromtimestamp(int(data["exp"])),
+            )
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            return None
+
+
+class TokenRevocationList:
+    """Signed tokens revoked before they expire, held in memory.
+
+    Revocations are written to ``session_revocations`` and every worker
+    polls that table for rows newer than the last one it saw, at most once
+    per `refresh_seconds`; a logout on one worker therefore reaches the
+    others within that delay, at the cost of one indexed read per interval
+    instead of one per request. Entries are forgotten once the tokens they
+    cover have expired. Uses the sync session factory in both DB modes.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        refresh_seconds: float = 5.0,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._session_factory = session_factory
+        self._refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._monotonic = monotonic
+        self._sessions: Dict[str, datetime] = {}
+        # user id -> (tokens issued before this are revoked, entry expiry)
+        self._users: Dict[int, Tuple[datetime, datetime]] = {}
+        self._last_id = 0
+        self._next_refresh = float("-inf")
+        self._refresh_lock = threading.Lock()
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        if claims.session_id in self._sessions:
+            return True
+        user = self._users.get(claims.user_id)
+        return user is not None and claims.issued_at < user[0]
+
+    def needs_refresh(self) -> bool:
+        return self._monotonic() >= self._next_refresh
+
+    def refresh(self) -> None:
+        """Load revocations written since the last refresh, by any worker."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # Another thread is already at it.
+        try:
+            with self._session_factory() as db:
+                rows = db.execute(
+                    select(SessionRevocationModel)
+                    .where(SessionRevocationModel.id > self._last_id)
+                    .order_by(SessionRevocationModel.id)
+                ).scalars().all()
+            for row in rows:
+                self._remember(row)
+                self._last_id = row.id
+            self._forget_expired(self._clock())
+            self._next_refresh = self._monotonic() + self._refresh_seconds
+        finally:
+            self._refresh_lock.release()
+
+    def revoke_session(self, session_id: str, expires_at: datetime) -> None:
+        self._append(session_id=session_id, expires_at=expires_at)
+
+    def revoke_user(self, user_id: int, not_before: datetime, expires_at: datetime) -> None:
+        self._append(user_id=user_id, not_before=not_before, expires_at=expires_at)
+
+    def prune(self, now: datetime, limit: int) -> int:
+        """Delete at most `limit` revocations whose tokens have all expired."""
+        batch = (
+            select(SessionRevocationModel.id)
+            .where(SessionRevocationModel.expires_at <= now)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        with self._session_factory() as db:
+            result = db.execute(
+                delete(SessionRevocationModel)
+                .where(SessionRevocationModel.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        self._forget_expired(now)
+        return result.rowcount
+
+    def _append(self, **values: object) -> None:
+        with self._session_factory() as db:
+            db.execute(insert(SessionRevocationModel).values(**values))
+            db.commit()
+        # Honoured here at once; other workers pick the row up on refresh.
+        self._remember(SessionRevocationModel(**values))
+
+    def _remember(self, row: SessionRevocationModel) -> None:
+        if row.session_id is not None:
+            self._sessions[row.session_id] = row.expires_at
+        elif row.user_id is not None and row.not_before is not None:
+            current = self._users.get(row.user_id)
+            if current is None or current[0] < row.not_before:
+                self._users[row.user_id] = (row.not_before, row.expires_at)
+
+    def _forget_expired(self, now: datetime) -> None:
+        for session_id, expires_at in list(self._sessions.items()):
+            if expires_at <= now:
+                self._sessions.pop(session_id, None)
+        for user_id, (_, expires_at) in list(self._users.items()):
+            if expires_at <= now:
+                self._users.pop(user_id, None)
+
+
+class SignedTokenSessionRepository(SessionRepository):
+    """Sessions as HMAC-signed tokens, verified without touching the database.
+
+    The session id handed out at login *is* the token: it carries the user
+    id, username, login time and expiry, so `get` and `get_with_user` are a
+    signature check plus a lookup in the in-memory revocation list. Tokens
+    record no activity, so `touch` does nothing and only the absolute TTL
+    applies. `delete_for_user` revokes every token the user holds but cannot
+    name them, so it returns no ids.
+    """
+
+    def __init__(
+        self,
+        codec: SessionTokenCodec,
+        revocations: TokenRevocationList,
+        ttl: timedelta,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self._codec = codec
+        self._revocations = revocations
+        self._ttl = ttl
+        self._clock = clock
+
+    def add(self, session: DomainSession) -> DomainSession:
+        return _issue(self._codec, session, self._ttl)
+
+    def get(self, session_id: str) -> Optional[DomainSession]:
+        found = self.get_with_user(session_id)
+        return None if found is None else found[0]
+
+    def get_with_user(self, session_id: str) -> Optional[Tuple[DomainSession, User]]:
+        claims = self._codec.verify(session_id)
+        if claims is None or claims.expires_at <= self._clock():
+            return None
+        if self._revocations.needs_refresh():
+            self._revocations.refresh()
+        if self._revocations.is_revoked(claims):
+            return None
+        return _session_and_user(session_id, claims)
+
+    def touch(self, session_id: str, seen_at: datetime) -> None:
+        pass
+
+    def delete(self, session_id: str) -> None:
+        claims = self._codec.verify(session_id)
+        if claims is not None:
+            self._revocations.revoke_session(claims.session_id, claims.expires_at)
+
+    def delete_for_user(self, user_id: int) -> List[str]:
+        now = self._clock()
+        self._revocations.revoke_user(
+            user_id, not_before=_revoke_before(now), expires_at=now + self._ttl
+        )
+        return []
+
+    def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        # Tokens expire on their own; what is left is revocations of expired tokens.
+        return self._revocations.prune(self._clock(), limit)
+
+
+class AsyncSignedTokenSessionRepository(AsyncSessionRepository):
+    """SignedTokenSessionRepository for the async DB mode.
+
+    Verification stays on the event loop; the occasional revocation-list
+    read or write runs on a worker thread.
+    """
+
+    def __init__(
+        self,
+        codec: SessionTokenCodec,
+        revocations: TokenRevocationList,
+        ttl: timedelta,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self._codec = codec
+        self._revocations = revocations
+        self._ttl = ttl
+        self._clock = clock
+
+    async def add(self, session: DomainSession) -> DomainSession:
+        return _issue(self._codec, session, self._ttl)
+
+    async def get(self, session_id: str) -> Optional[DomainSession]:
+        found = await self.get_with_user(session_id)
+        return None if found is None else found[0]
+
+    async def get_with_user(self, session_id: str) -> Optional[Tuple[DomainSession, User]]:
+        claims = self._codec.verify(session_id)
+        if claims is None or claims.expires_at <= self._clock():
+            return None
+        if self._revocations.needs_refresh():
+            await asyncio.to_thread(self._revocations.refresh)
+        if self._revocations.is_revoked(claims):
+            return None
+        return _session_and_user(session_id, claims)
+
+    async def touch(self, session_id: str, seen_at: datetime) -> None:
+        pass
+
+    async def delete(self, session_id: str) -> None:
+        claims = self._codec.verify(session_id)
+        if claims is not None:
+            await asyncio.to_thread(
+                self._revocations.revoke_session, claims.session_id, claims.expires_at
+            )
+
+    async def delete_for_user(self, user_id: int) -> List[str]:
+        now = self._clock()
+        await asyncio.to_thread(
+            self._revocations.revoke_user, user_id, _revoke_before(now), now + self._ttl
+        )
+        return []
+
+    async def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        return await asyncio.to_thread(self._revocations.prune, self._clock(), limit)
+
+
+def _revoke_before(now: datetime) -> datetime:
+    """Cut-off for revoking a user's tokens at `now`, in whole seconds like
+    their issue times: a login later in the same second must stay valid."""
+    return now.replace(microsecond=0)
+
+
+def _issue(codec: SessionTokenCodec, session: DomainSession, ttl: timedelta) -> DomainSession:
+    if session.username is None:
+        raise ValueError("Token sessions need the username at login")
+    # Tokens carry whole seconds; truncate so the returned session matches.
+    issued_at = session.created_at.replace(microsecond=0)
+    token = codec.issue(
+        TokenClaims(
+            session_id=secrets.token_urlsafe(16),
+            user_id=session.user_id,
+            username=session.username,
+            issued_at=issued_at,
+            expires_at=issued_at + ttl,
+        )
+    )
+    return DomainSession(
+        id=token, user_id=session.user_id, created_at=issued_at, username=session.username
+    )
+
+
+def _session_and_user(token: str, claims: TokenClaims) -> Tuple[DomainSession, User]:
+    session = DomainSession(
+        id=token, user_id=claims.user_id, created_at=claims.issued_at, username=claims.username
+    )
+    # The token is all we know about the user; the password hash stays in the DB.
+    user = User(id=claims.user_id, username=claims.username, password_hash="")
+    return session, user
+
+
+def _sign(key: bytes, message: str) -> str:
+    return _b64encode(hmac.new(key, message.encode(), hashlib.sha256).digest())
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _epoch(moment: datetime) -> int:
+    return calendar.timegm(moment.utctimetuple())
@@ -0,0 +1,140 @@
+import logging
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # Only the async engine needs greenlet.
+    getcurrent = None
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    """Statements executed while this collector was active, and their time."""
+
+    def __init__(self, keep_statements: bool = False) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None:
+            self.statements.append(statement)
+
+
+# Every active collector gets every statement, so a test capturing around a
+# request sees the same queries as the request's own collector.
+_collectors: ContextVar[Tuple[QueryStats, ...]] = ContextVar("sql_collectors", default=())
+
+
+@contextmanager
+def collect_queries(keep_statements: bool = False) -> Iterator[QueryStats]:
+    """Count the statements run in this context (and tasks and threads it starts)."""
+    stats = QueryStats(keep_statements)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Fail with the offending SQL if the block runs more than `max_queries`.
+
+    For tests: ``with query_budget(3): await client.get("/")``.
+    """
+    with collect_queries(keep_statements=True) as stats:
+        yield stats
+    if stats.count > max_queries:
+        listing = "\n".join(f"  {normalize_sql(sql)}" for sql in stats.statements or ())
+        raise AssertionError(
+            f"{stats.count} queries run, budget is {max_queries}:\n{listing}"
+        )
+
+
+def instrument_engine(engine: Engine, slow_query_ms: float = 0.0) -> None:
+    """Time every statement on `engine` for the active collectors, and log
+    those slower than `slow_query_ms` (0 disables the log) with the
+    repository method that issued them."""
+    slow_seconds = slow_query_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        if context is not None:
+            context._blog_query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        started = getattr(context, "_blog_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        for stats in _collectors.get():
+            stats.record(statement, elapsed)
+        # An executemany() is a whole batch of rows; its total time says
+        # nothing about any one statement being slow.
+        if slow_seconds and elapsed >= slow_seconds and not executemany:
+            logger.warning(
+                "Slow query (%.1f ms) from %s: %s",
+                elapsed * 1000,
+                calling_method() or "unknown caller",
+                normalize_sql(statement),
+            )
+
+
+def normalize_sql(statement: str) -> str:
+    """`statement` on one line with literals and IN-lists folded, so the
+    same query logged with different values reads (and groups) the same."""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def calling_method() -> Optional[str]:
+    """``module.Class.method`` of the nearest app code outside this module.
+
+    Under the async engine, statements run in a greenlet whose stack stops
+    at SQLAlchemy's bridge; the awaiting repository coroutine is on the
+    parent greenlet's stack, which is searched next.
+    """
+    found = _app_frame(sys._getframe(1))
+    if found is None and getcurrent is not None:
+        parent = getcurrent().parent
+        if parent is not None:
+            found = _app_frame(parent.gr_frame)
+    return found
+
+
+def _app_frame(frame: Optional[FrameType]) -> Optional[str]:
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module != __name__:
+            owner = frame.f_locals.get("self")
+            method = frame.f_code.co_name
+            if owner is not None:
+                method = f"{type(owner).__name__}.{method}"
+            return f"{module.rsplit('.', 1)[-1]}.{method}"
+        frame = frame.f_back
+    return None
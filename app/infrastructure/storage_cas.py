@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.domain.entities import StoredImage
+from app.domain.interfaces import ImageStorageService, ImageTooLarge
+from .image_variants import is_variant_path
+from .models import ImageBlobModel, PostModel
+from .storage_local import spool_stream
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageGcReport:
+    blobs_checked: int
+    blobs_removed: int
+    bytes_freed: int
+
+
+@dataclass(frozen=True)
+class ImageMigrationReport:
+    files_seen: int
+    blobs_created: int
+    duplicates_removed: int
+    bytes_freed: int
+
+
+class ContentAddressedImageStorage(ImageStorageService):
+    """Stores each distinct image once, at ``ab/cd/<sha256><ext>``.
+
+    Saving bytes that are already stored only bumps the blob's reference
+    count in ``image_blobs``; the upload is renamed over the identical copy,
+    so disk use doesn't grow. The two levels of hash-prefix directories
+    keep any one directory small. The first upload of a blob decides its
+    extension, so identical bytes uploaded as .PNG and .png share one file
+    and one URL.
+
+    The blob index runs on worker threads next to the file I/O, so it uses
+    the sync session factory in both DB modes.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        session_factory: Callable[[], Session],
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self._base_dir = base_dir
+        self._base_dir.mkdir(parents=True, exist_ok=True)
+        self._session_factory = session_factory
+        self._max_bytes = max_bytes
+
+    def save_image(self, filename: str, data: bytes) -> str:
+        if self._max_bytes is not None and len(data) > self._max_bytes:
+            raise ImageTooLarge(f"Image exceeds {self._max_bytes} bytes")
+        fd, temp_name = tempfile.mkstemp(dir=self._base_dir, prefix=".upload-", suffix=".part")
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.chmod(temp_name, 0o644)
+        sha256 = hashlib.sha256(data).hexdigest()
+        return self._store(Path(temp_name), filename, len(data), sha256).path
+
+    async def save_image_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[StoredImage]:
+        spooled = await spool_stream(self._base_dir, chunks, self._max_bytes)
+        if spooled is None:
+            return None
+        return await asyncio.to_thread(
+            self._store, spooled.temp_path, filename, spooled.size_bytes, spooled.sha256
+        )
+
+    def delete_image(self, path: str) -> None:
+        """Drop the reference a save added.
+
+        The file stays: another post may share it. collect_garbage removes
+        it once nothing refers to it.
+        """
+        with self._session_factory() as db:
+            db.execute(
+                update(ImageBlobModel)
+                .where(ImageBlobModel.path == path, ImageBlobModel.ref_count > 0)
+                .values(ref_count=ImageBlobModel.ref_count - 1)
+            )
+            db.commit()
+
+    def collect_garbage(
+        self, grace_seconds: float = 3600.0, now: Optional[datetime] = None
+    ) -> ImageGcReport:
+        """Delete blobs no post points at.
+
+        Reference counts are first reconciled with ``posts.image_path``. A
+        blob referenced within the last `grace_seconds` is kept even when
+        no post uses it yet, because its post may still be in flight.
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=grace_seconds)
+        removed = 0
+        freed = 0
+        with self._session_factory() as db:
+            in_use = dict(
+                db.execute(
+                    select(PostModel.image_path, func.count())
+                    .where(PostModel.image_path.is_not(None))
+                    .group_by(PostModel.image_path)
+                ).all()
+            )
+            blobs = db.execute(
+                select(ImageBlobModel.sha256, ImageBlobModel.path, ImageBlobModel.size_bytes)
+            ).all()
+            for sha256, path, size_bytes in blobs:
+                refs = in_use.get(path, 0)
+                if refs:
+                    db.execute(
+                        update(ImageBlobModel)
+                        .where(ImageBlobModel.sha256 == sha256)
+                        .values(ref_count=refs)
+                    )
+                    continue
+                # Re-checked in the DELETE so a save racing with GC wins.
+                result = db.execute(
+                    delete(ImageBlobModel).where(
+                        ImageBlobModel.sha256 == sha256,
+                        ImageBlobModel.last_referenced_at < cutoff,
+                    )
+                )
+                if result.rowcount:
+                    # Unlinked before the commit, while the DELETE holds the
+                    # write lock: a save of the same bytes waits for the
+                    # commit, then re-creates the row and puts its file back.
+                    self._unlink_blob(path)
+                    db.commit()
+                    removed += 1
+                    freed += size_bytes
+            db.commit()
+        return ImageGcReport(blobs_checked=len(blobs), blobs_removed=removed, bytes_freed=freed)
+
+    def migrate_flat_uploads(self) -> ImageMigrationReport:
+        """Move legacy ``<uuid><ext>`` uploads into the content-addressed layout.
+
+        Each file is linked into place, posts pointing at the old name are
+        repointed, and only then is the old file removed, so the upload
+        directory stays consistent if the run is interrupted; rerunning
+        picks up where it stopped.
+        """
+        files_seen = blobs_created = duplicates = freed = 0
+        for legacy in sorted(self._base_dir.iterdir()):
+            # Variants stay where they are; posts still reference them by name.
+            if not legacy.is_file() or legacy.name.startswith(".") or is_variant_path(legacy.name):
+                continue
+            files_seen += 1
+            sha256 = _hash_file(legacy)
+            size = legacy.stat().st_size
+            with self._session_factory() as db:
+                repointed = db.execute(
+                    select(func.count())
+                    .select_from(PostModel)
+                    .where(PostModel.image_path == legacy.name)
+                ).scalar_one()
+                path, created = _add_reference(db, sha256, legacy.name, size, repointed)
+                target = self._base_dir / path
+                if target.exists():
+                    duplicates += 1
+                    freed += size
+                else:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    _link_or_copy(legacy, target)
+                db.execute(
+                    update(PostModel)
+                    .where(PostModel.image_path == legacy.name)
+                    .values(image_path=path)
+                )
+                db.commit()
+            blobs_created += int(created)
+            legacy.unlink()
+        return ImageMigrationReport(
+            files_seen=files_seen,
+            blobs_created=blobs_created,
+            duplicates_removed=duplicates,
+            bytes_freed=freed,
+        )
+
+    def _store(self, temp_path: Path, filename: str, size: int, sha256: str) -> StoredImage:
+        try:
+            with self._session_factory() as db:
+                path, _ = _add_reference(db, sha256, filename, size, 1)
+                db.commit()
+            # Replaced even when the blob exists: the bytes are identical, and
+            # the copy on disk may belong to a GC that has not committed yet.
+            _place(temp_path, self._base_dir / path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return StoredImage(path=path, size_bytes=size, sha256=sha256)
+
+    def _unlink_blob(self, path: str) -> None:
+        target = self._base_dir / path
+        target.unlink(missing_ok=True)
+        for variant in target.parent.glob(f"{target.stem}.w*.webp"):
+            variant.unlink(missing_ok=True)
+        for shard in (target.parent, target.parent.parent):
+            if shard == self._base_dir:
+                break
+            try:
+                shard.rmdir()
+            except OSError:
+                break
+
+
+def _place(temp_path: Path, target: Path, attempts: int = 3) -> None:
+    """os.replace `temp_path` to `target`, creating its shard directories.
+
+    GC removes shard directories once they are empty, which can happen
+    between the mkdir and the rename; they are then created again.
+    """
+    for attempt in range(attempts):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(temp_path, target)
+            return
+        except FileNotFoundError:
+            if attempt == attempts - 1 or not temp_path.exists():
+                raise
+
+
+def blob_path(sha256: str, filename: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{Path(filename).suffix.lower()}"
+
+
+def _add_reference(
+    db: Session, sha256: str, filename: str, size: int, references: int
+) -> Tuple[str, bool]:
+    """Upsert the blob row; returns its stored path and whether it is new."""
+    now = datetime.utcnow()
+    existed = db.execute(
+        select(ImageBlobModel.sha256).where(ImageBlobModel.sha256 == sha256)
+    ).first() is not None
+    stmt = sqlite_insert(ImageBlobModel).values(
+        sha256=sha256,
+        path=blob_path(sha256, filename),
+        size_bytes=size,
+        ref_count=references,
+        created_at=now,
+        last_referenced_at=now,
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ImageBlobModel.sha256],
+            set_={
+                "ref_count": ImageBlobModel.ref_count + references,
+                "last_referenced_at": now,
+            },
+        )
+    )
+    path = db.execute(
+        select(ImageBlobModel.path).where(ImageBlobModel.sha256 == sha256)
+    ).scalar_one()
+    return path, not existed
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as source:
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
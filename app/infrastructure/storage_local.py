@@ -1,17 +1,88 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
 import uuid
 
-from app.domain.interfaces import ImageStorageService
+from app.domain.entities import StoredImage
+from app.domain.interfaces import ImageStorageService, ImageTooLarge
 
 
 class LocalImageStorage(ImageStorageService):
-    def __init__(self, base_dir: Path) -> None:
+    def __init__(self, base_dir: Path, max_bytes: Optional[int] = None) -> None:
         self._base_dir = base_dir
         self._base_dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
 
     def save_image(self, filename: str, data: bytes) -> str:
+        _check_size(len(data), self._max_bytes)
         ext = Path(filename).suffix
         unique_name = f"{uuid.uuid4().hex}{ext}"
         target_path = self._base_dir / unique_name
         target_path.write_bytes(data)
         return unique_name
+
+    async def save_image_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[StoredImage]:
+        spooled = await spool_stream(self._base_dir, chunks, self._max_bytes)
+        if spooled is None:
+            return None
+        unique_name = f"{uuid.uuid4().hex}{Path(filename).suffix}"
+        os.replace(spooled.temp_path, self._base_dir / unique_name)
+        return StoredImage(path=unique_name, size_bytes=spooled.size_bytes, sha256=spooled.sha256)
+
+    def delete_image(self, path: str) -> None:
+        (self._base_dir / path).unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class SpooledStream:
+    temp_path: Path
+    size_bytes: int
+    sha256: str
+
+
+async def spool_stream(
+    directory: Path, chunks: AsyncIterator[bytes], max_bytes: Optional[int]
+) -> Optional[SpooledStream]:
+    """Write a chunked upload to a hidden temp file in `directory`.
+
+    Only one chunk is held in memory at a time, the SHA-256 is computed on
+    the way through, and the temp file is on the same filesystem as the
+    final location so callers can os.replace it into place atomically. The
+    temp file is removed if the stream is empty or anything fails,
+    including ImageTooLarge once the running size passes `max_bytes`.
+    """
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    temp_path = Path(temp_name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                _check_size(size, max_bytes)
+                await asyncio.to_thread(_write_chunk, out, digest, chunk)
+        if size == 0:
+            temp_path.unlink()
+            return None
+        # mkstemp creates 0600; uploads are served as static files.
+        os.chmod(temp_path, 0o644)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return SpooledStream(temp_path=temp_path, size_bytes=size, sha256=digest.hexdigest())
+
+
+def _check_size(size: int, max_bytes: Optional[int]) -> None:
+    if max_bytes is not None and size > max_bytes:
+        raise ImageTooLarge(f"Image exceeds {max_bytes} bytes")
+
+
+def _write_chunk(out: BinaryIO, digest: "hashlib._Hash", chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
@@ -1,23 +1,102 @@
-from pathlib import Path
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 
-from app.infrastructure.db import Base, engine
+from app.config import get_settings
+from app.infrastructure.db import get_engine
+from app.infrastructure.schema import ensure_schema
+from app.infrastructure.session_tokens import parse_signing_keys
+from app.api.dependencies import (
+	STATIC_DIR,
+	async_db_overrides,
+	event_bus,
+	http_metrics,
+	session_reaper,
+	static_assets,
+)
+from app.api.body_limit import FORM_ALLOWANCE_BYTES, RequestSizeLimitMiddleware
 from app.api.routers_auth import router as auth_router
-from app.api.routers_posts import router as posts_router
+from app.api.routers_metrics import router as metrics_router
+from app.api.routers_posts import router as posts_router, templates
+from app.api.request_metrics import RequestMetricsMiddleware
+from app.api.server_timing import ServerTimingMiddleware
+from app.api.static_assets import FingerprintedStaticFiles
+from app.api.templating import precompile_templates
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+	settings = get_settings()
+	reaper = None
+	if settings.session_reap_interval_seconds > 0:
+		reaper = asyncio.get_running_loop().create_task(session_reaper.run_forever())
+	if settings.change_bus_poll_seconds > 0:
+		# In lifespan rather than create_app, so each forked worker starts
+		# its own bus thread.
+		await asyncio.to_thread(event_bus.start)
+	try:
+		yield
+	finally:
+		await asyncio.to_thread(event_bus.stop)
+		if reaper is not None:
+			reaper.cancel()
+			with suppress(asyncio.CancelledError):
+				await reaper
 
 
 def create_app() -> FastAPI:
-	Base.metadata.create_all(bind=engine)
+	# One PRAGMA read when the database is already current.
+	ensure_schema(get_engine())
+
+	settings = get_settings()
+	if settings.db_mode not in ("sync", "async"):
+		raise ValueError(f"Unknown BLOG_DB_MODE {settings.db_mode!r}; expected 'sync' or 'async'")
+	if settings.image_storage not in ("local", "content"):
+		raise ValueError(
+			f"Unknown BLOG_IMAGE_STORAGE {settings.image_storage!r}; expected 'local' or 'content'"
+		)
+
+	if settings.session_store not in ("database", "token"):
+		raise ValueError(
+			f"Unknown BLOG_SESSION_STORE {settings.session_store!r}; expected 'database' or 'token'"
+		)
+	if settings.session_store == "token":
+		# Fail at startup, not on the first login.
+		parse_signing_keys(settings.session_signing_keys)
+		if settings.session_absolute_ttl_seconds <= 0:
+			raise ValueError("Token sessions need a positive BLOG_SESSION_ABSOLUTE_TTL_SECONDS")
+
+	# Compile (or load from the bytecode cache) every template before the
+	# first request, rather than on it.
+	precompile_templates(templates.env)
 
-	app = FastAPI(title="Blog App")
+	app = FastAPI(title="Blog App", lifespan=lifespan)
+	if settings.db_mode == "async":
+		app.dependency_overrides.update(async_db_overrides())
 
-	static_dir = Path(__file__).resolve().parent / "web" / "static"
-	app.mount("/static", StaticFiles(directory=static_dir), name="static")
+	app.mount(
+		"/static",
+		FingerprintedStaticFiles(
+			directory=STATIC_DIR, assets=static_assets, immutable_prefixes=("uploads/",)
+		),
+		name="static",
+	)
 
 	app.include_router(posts_router)
 	app.include_router(auth_router)
+	# Refused before the form parser spools it; storage enforces the image's
+	# own limit on what gets through.
+	app.add_middleware(
+		RequestSizeLimitMiddleware,
+		max_bytes=settings.upload_max_bytes + FORM_ALLOWANCE_BYTES,
+	)
+	if settings.metrics_enabled:
+		app.include_router(metrics_router)
+		app.add_middleware(RequestMetricsMiddleware, metrics=http_metrics)
+	if settings.debug:
+		app.add_middleware(ServerTimingMiddleware)
 
 	return app
 
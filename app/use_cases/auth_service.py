@@ -1,11 +1,22 @@
+import asyncio
 import hashlib
 import secrets
-from typing import Optional
+from datetime import datetime
+from typing import Callable, Optional
 
 import bcrypt
 
 from app.domain.entities import User, Session
-from app.domain.interfaces import UserRepository, SessionRepository
+from app.domain.events import SessionRevoked
+from app.domain.sessions import SessionPolicy
+from app.domain.interfaces import (
+    UserRepository,
+    SessionRepository,
+    AsyncUserRepository,
+    AsyncSessionRepository,
+    EventPublisher,
+    PasswordHasher,
+)
 
 
 MAX_PWD_LEN = 72
@@ -24,23 +35,68 @@ def _prepare_password(password: str) -> str:
     return hashlib.sha256(raw).hexdigest()
 
 
+def _hash_password(password: str) -> str:
+    password = _prepare_password(password)
+    password_bytes = password.encode('utf-8')
+    salt = bcrypt.gensalt()
+    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+
+
+def _check_password(password: str, password_hash: str) -> bool:
+    password = _prepare_password(password)
+    password_bytes = password.encode('utf-8')
+    password_hash_bytes = password_hash.encode('utf-8')
+    return bcrypt.checkpw(password_bytes, password_hash_bytes)
+
+
+class BcryptPasswordHasher(PasswordHasher):
+    """bcrypt on the calling thread; the async variants use a worker thread."""
+
+    def hash(self, password: str) -> str:
+        return _hash_password(password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return _check_password(password, password_hash)
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.to_thread(_hash_password, password)
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        return await asyncio.to_thread(_check_password, password, password_hash)
+
+
 class AuthService:
+    """Accounts and sessions.
+
+    Sessions are looked up in `session_repo`. Ending an expired session and
+    refreshing an idle one's last-seen time go to `session_writer` when one
+    is given, so the lookups can run on the read engine and the writer is
+    only used when something has to be written.
+    """
+
     def __init__(
         self,
         user_repo: UserRepository,
         session_repo: SessionRepository,
+        hasher: Optional[PasswordHasher] = None,
+        events: Optional[EventPublisher] = None,
+        session_policy: Optional[SessionPolicy] = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        session_writer: Optional[SessionRepository] = None,
     ) -> None:
         self._user_repo = user_repo
         self._session_repo = session_repo
+        self._session_writer = session_writer or session_repo
+        self._hasher = hasher or BcryptPasswordHasher()
+        self._events = events
+        self._session_policy = session_policy or SessionPolicy()
+        self._clock = clock
 
     def register(self, username: str, password: str) -> User:
         existing = self._user_repo.get_by_username(username)
         if existing is not None:
             raise ValueError("Username already taken")
-        password = _prepare_password(password)
-        password_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
-        password_hash = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+        password_hash = self._hasher.hash(password)
         user = User(id=None, username=username, password_hash=password_hash)
         return self._user_repo.add(user)
 
@@ -48,16 +104,125 @@ class AuthService:
         user = self._user_repo.get_by_username(username)
         if user is None:
             return None
-        password = _prepare_password(password)
-        password_bytes = password.encode('utf-8')
-        password_hash_bytes = user.password_hash.encode('utf-8')
-        if not bcrypt.checkpw(password_bytes, password_hash_bytes):
+        if not self._hasher.verify(password, user.password_hash):
             return None
-        session = Session(id=secrets.token_urlsafe(32), user_id=user.id)  # type: ignore[arg-type]
+        session = Session(
+            id=secrets.token_urlsafe(32), user_id=user.id, username=user.username  # type: ignore[arg-type]
+        )
         return self._session_repo.add(session)
 
     def get_session(self, session_id: str) -> Optional[Session]:
-        return self._session_repo.get(session_id)
+        """The session if it is still within its TTLs; expired ones are deleted."""
+        session = self._session_repo.get(session_id)
+        if session is None or not self._keep_alive(session):
+            return None
+        return session
+
+    def get_session_user(self, session_id: str) -> Optional[User]:
+        """Like get_session, but returns the owner, in the same single lookup."""
+        found = self._session_repo.get_with_user(session_id)
+        if found is None or not self._keep_alive(found[0]):
+            return None
+        return found[1]
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        return self._user_repo.get_by_id(user_id)
 
     def logout(self, session_id: str) -> None:
-        self._session_repo.delete(session_id)
+        self._session_writer.delete(session_id)
+        if self._events is not None:
+            self._events.publish(SessionRevoked(session_id=session_id))
+
+    def revoke_all_sessions(self, user_id: int) -> int:
+        """Sign `user_id` out everywhere; returns how many sessions ended."""
+        session_ids = self._session_writer.delete_for_user(user_id)
+        if self._events is not None:
+            for session_id in session_ids:
+                self._events.publish(SessionRevoked(session_id=session_id))
+        return len(session_ids)
+
+    def _keep_alive(self, session: Session) -> bool:
+        now = self._clock()
+        if self._session_policy.is_expired(session, now):
+            self.logout(session.id)
+            return False
+        if self._session_policy.needs_touch(session, now):
+            self._session_writer.touch(session.id, now)
+        return True
+
+
+class AsyncAuthService:
+    """AuthService over async repositories, for the async DB mode."""
+
+    def __init__(
+        self,
+        user_repo: AsyncUserRepository,
+        session_repo: AsyncSessionRepository,
+        hasher: Optional[PasswordHasher] = None,
+        events: Optional[EventPublisher] = None,
+        session_policy: Optional[SessionPolicy] = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        session_writer: Optional[AsyncSessionRepository] = None,
+    ) -> None:
+        self._user_repo = user_repo
+        self._session_repo = session_repo
+        self._session_writer = session_writer or session_repo
+        self._hasher = hasher or BcryptPasswordHasher()
+        self._events = events
+        self._session_policy = session_policy or SessionPolicy()
+        self._clock = clock
+
+    async def register(self, username: str, password: str) -> User:
+        existing = await self._user_repo.get_by_username(username)
+        if existing is not None:
+            raise ValueError("Username already taken")
+        password_hash = await self._hasher.hash_async(password)
+        user = User(id=None, username=username, password_hash=password_hash)
+        return await self._user_repo.add(user)
+
+    async def authenticate(self, username: str, password: str) -> Optional[Session]:
+        user = await self._user_repo.get_by_username(username)
+        if user is None:
+            return None
+        if not await self._hasher.verify_async(password, user.password_hash):
+            return None
+        session = Session(
+            id=secrets.token_urlsafe(32), user_id=user.id, username=user.username  # type: ignore[arg-type]
+        )
+        return await self._session_repo.add(session)
+
+    async def get_session(self, session_id: str) -> Optional[Session]:
+        session = await self._session_repo.get(session_id)
+        if session is None or not await self._keep_alive(session):
+            return None
+        return session
+
+    async def get_session_user(self, session_id: str) -> Optional[User]:
+        found = await self._session_repo.get_with_user(session_id)
+        if found is None or not await self._keep_alive(found[0]):
+            return None
+        return found[1]
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        return await self._user_repo.get_by_id(user_id)
+
+    async def logout(self, session_id: str) -> None:
+        await self._session_writer.delete(session_id)
+        if self._events is not None:
+            self._events.publish(SessionRevoked(session_id=session_id))
+
+    async def revoke_all_sessions(self, user_id: int) -> int:
+        session_ids = await self._session_writer.delete_for_user(user_id)
+        if self._events is not None:
+            for session_id in session_ids:
+                self._events.publish(SessionRevoked(session_id=session_id))
+        return len(session_ids)
+
+    async def _keep_alive(self, session: Session) -> bool:
+        now = self._clock()
+        if self._session_policy.is_expired(session, now):
+            await self.logout(session.id)
+            return False
+        if self._session_policy.needs_touch(session, now):
+            await self._session_writer.touch(session.id, now)
+        return True
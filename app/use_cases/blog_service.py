@@ -1,7 +1,15 @@
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterator, Iterator, List, Optional
 
-from app.domain.entities import Post
-from app.domain.interfaces import PostRepository, ImageStorageService
+from app.domain.entities import Post, PostPage, SearchPage, StoredImage
+from app.domain.events import PostCreated
+from app.domain.interfaces import (
+    PostRepository,
+    AsyncPostRepository,
+    ImageStorageService,
+    EventPublisher,
+)
+from app.use_cases.post_export import export_posts, export_posts_async
 
 
 class BlogService:
@@ -9,9 +17,11 @@ class BlogService:
         self,
         post_repo: PostRepository,
         image_storage: ImageStorageService,
+        events: Optional[EventPublisher] = None,
     ) -> None:
         self._post_repo = post_repo
         self._image_storage = image_storage
+        self._events = events
 
     def create_post(
         self,
@@ -20,8 +30,8 @@ class BlogService:
         content: str,
         image_filename: Optional[str] = None,
         image_bytes: Optional[bytes] = None,
+        image_path: Optional[str] = None,
     ) -> Post:
-        image_path: Optional[str] = None
         if image_filename and image_bytes:
             image_path = self._image_storage.save_image(image_filename, image_bytes)
         post = Post(
@@ -31,10 +41,101 @@ class BlogService:
             content=content,
             image_path=image_path,
         )
-        return self._post_repo.add(post)
+        post = self._post_repo.add(post)
+        if self._events is not None:
+            self._events.publish(PostCreated.of(post))
+        return post
+
+    async def save_image_upload(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[StoredImage]:
+        """Stream an upload into storage; pass its path to create_post."""
+        return await self._image_storage.save_image_stream(filename, chunks)
+
+    async def discard_image_upload(self, path: str) -> None:
+        """Undo save_image_upload when the post it was for wasn't created."""
+        await asyncio.to_thread(self._image_storage.delete_image, path)
 
     def list_recent_posts(self, limit: int = 20) -> List[Post]:
         return self._post_repo.list_recent(limit=limit)
 
+    def list_posts_page(
+        self, after_cursor: Optional[str] = None, limit: int = 20
+    ) -> PostPage:
+        return self._post_repo.list_page(after_cursor=after_cursor, limit=limit)
+
     def get_post(self, post_id: int) -> Optional[Post]:
         return self._post_repo.get_by_id(post_id)
+
+    def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        return self._post_repo.search(query, limit=limit, cursor=cursor)
+
+    def export_posts(self, file_format: str, compress: bool = False) -> Iterator[bytes]:
+        """Every post as JSONL or CSV, streamed in chunks; see `post_export`."""
+        return export_posts(self._post_repo.iter_all(), file_format, compress)
+
+
+class AsyncBlogService:
+    """BlogService over an async post repository, for the async DB mode."""
+
+    def __init__(
+        self,
+        post_repo: AsyncPostRepository,
+        image_storage: ImageStorageService,
+        events: Optional[EventPublisher] = None,
+    ) -> None:
+        self._post_repo = post_repo
+        self._image_storage = image_storage
+        self._events = events
+
+    async def create_post(
+        self,
+        author_id: int,
+        title: str,
+        content: str,
+        image_filename: Optional[str] = None,
+        image_bytes: Optional[bytes] = None,
+        image_path: Optional[str] = None,
+    ) -> Post:
+        if image_filename and image_bytes:
+            image_path = await asyncio.to_thread(
+                self._image_storage.save_image, image_filename, image_bytes
+            )
+        post = Post(
+            id=None,
+            author_id=author_id,
+            title=title,
+            content=content,
+            image_path=image_path,
+        )
+        post = await self._post_repo.add(post)
+        if self._events is not None:
+            self._events.publish(PostCreated.of(post))
+        return post
+
+    async def save_image_upload(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[StoredImage]:
+        """Stream an upload into storage; pass its path to create_post."""
+        return await self._image_storage.save_image_stream(filename, chunks)
+
+    async def discard_image_upload(self, path: str) -> None:
+        """Undo save_image_upload when the post it was for wasn't created."""
+        await asyncio.to_thread(self._image_storage.delete_image, path)
+
+    async def list_recent_posts(self, limit: int = 20) -> List[Post]:
+        return await self._post_repo.list_recent(limit=limit)
+
+    async def list_posts_page(
+        self, after_cursor: Optional[str] = None, limit: int = 20
+    ) -> PostPage:
+        return await self._post_repo.list_page(after_cursor=after_cursor, limit=limit)
+
+    async def get_post(self, post_id: int) -> Optional[Post]:
+        return await self._post_repo.get_by_id(post_id)
+
+    async def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        return await self._post_repo.search(query, limit=limit, cursor=cursor)
+
+    def export_posts(self, file_format: str, compress: bool = False) -> AsyncIterator[bytes]:
+        return export_posts_async(self._post_repo.iter_all(), file_format, compress)
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+from app.domain.entities import Post
+from app.use_cases.post_import import FORMATS
+
+# The fields `read_post_records` takes, so an export can be imported as is.
+FIELDS = ("id", "author", "author_id", "title", "content", "created_at", "image")
+
+# Encoded posts are handed out in chunks of about this many characters.
+_CHUNK_CHARS = 64 * 1024
+
+
+class _ExportWriter:
+    """Encodes posts one at a time, compressing on the fly if asked to."""
+
+    def __init__(self, file_format: str, compress: bool) -> None:
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown export format {file_format!r}; expected one of {FORMATS}")
+        self._text = io.StringIO()
+        self._csv = csv.writer(self._text) if file_format == "csv" else None
+        # wbits=31 wraps the deflate stream in a gzip header and trailer.
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        if self._csv is not None:
+            self._csv.writerow(FIELDS)
+
+    def add(self, post: Post) -> Optional[bytes]:
+        """Encode `post`; returns a chunk once enough output has built up."""
+        values = _values(post)
+        if self._csv is not None:
+            self._csv.writerow(values)
+        else:
+            self._text.write(json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False))
+            self._text.write("\n")
+        if self._text.tell() < _CHUNK_CHARS:
+            return None
+        return self._take()
+
+    def finish(self) -> bytes:
+        chunk = self._take()
+        if self._compressor is not None:
+            chunk += self._compressor.flush()
+        return chunk
+
+    def _take(self) -> bytes:
+        data = self._text.getvalue().encode("utf-8")
+        self._text.seek(0)
+        self._text.truncate()
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        return data
+
+
+def export_posts(posts: Iterable[Post], file_format: str, compress: bool = False) -> Iterator[bytes]:
+    """`posts` as JSONL or CSV (gzipped if `compress`), in chunks.
+
+    Only one chunk is held at a time, so memory use doesn't grow with the
+    number of posts as long as `posts` is itself streamed.
+    """
+    writer = _ExportWriter(file_format, compress)
+    for post in posts:
+        chunk = writer.add(post)
+        # The compressor may keep a whole chunk to itself.
+        if chunk:
+            yield chunk
+    chunk = writer.finish()
+    if chunk:
+        yield chunk
+
+
+async def export_posts_async(
+    posts: AsyncIterable[Post], file_format: str, compress: bool = False
+) -> AsyncIterator[bytes]:
+    """`export_posts` over an async stream of posts."""
+    writer = _ExportWriter(file_format, compress)
+    async for post in posts:
+        chunk = writer.add(post)
+        if chunk:
+            yield chunk
+    chunk = writer.finish()
+    if chunk:
+        yield chunk
+
+
+def _values(post: Post) -> List[Any]:
+    return [
+        post.id,
+        post.author_username,
+        post.author_id,
+        post.title,
+        post.content,
+        # Stored timestamps are naive UTC.
+        f"{post.created_at.isoformat()}Z",
+        post.image_path,
+    ]
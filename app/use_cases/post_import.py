@@ -0,0 +1,285 @@
+import asyncio
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+from app.domain.entities import Post
+from app.domain.interfaces import (
+    ImageStorageService,
+    ImageTooLarge,
+    PostRepository,
+    UserRepository,
+)
+
+FORMATS = ("jsonl", "csv")
+
+_IMAGE_CHUNK_BYTES = 256 * 1024
+
+Record = Dict[str, Any]
+
+
+class PostImportError(Exception):
+    """A record that can't be imported, by its 1-based number in the input."""
+
+    def __init__(self, record: int, message: str) -> None:
+        super().__init__(f"Record {record}: {message}")
+        self.record = record
+
+
+@dataclass(frozen=True)
+class PostImportReport:
+    posts_added: int
+    images_copied: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.posts_added / self.seconds if self.seconds > 0 else 0.0
+
+
+def read_post_records(source: TextIO, file_format: str, skip: int = 0) -> Iterator[Record]:
+    """Parse `source` one record at a time, leaving out the first `skip`.
+
+    ``jsonl`` has one JSON object per line (blank lines are ignored);
+    ``csv`` names the fields in its header row. Fields: ``title``,
+    ``content``, ``author`` (a username) or ``author_id``, and optionally
+    ``created_at`` (ISO 8601) and ``image`` (a path under the image
+    directory given to the importer).
+    """
+    if file_format == "jsonl":
+        lines = (line for line in source if line.strip())
+        # Skipped lines are only counted, never parsed.
+        for number, line in enumerate(itertools.islice(lines, skip, None), start=skip + 1):
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise PostImportError(number, f"invalid JSON: {exc}") from None
+            if not isinstance(record, dict):
+                raise PostImportError(number, "is not a JSON object")
+            yield record
+    elif file_format == "csv":
+        yield from itertools.islice(csv.DictReader(source), skip, None)
+    else:
+        raise ValueError(f"Unknown import format {file_format!r}; expected one of {FORMATS}")
+
+
+class ImportCheckpoint:
+    """How many records of one input are already imported, in a JSON file.
+
+    Saved after every committed batch. A crash between a batch's commit and
+    the save replays that one batch when the import is resumed.
+    """
+
+    def __init__(self, path: Path, source: str) -> None:
+        self.path = path
+        self._source = source
+
+    def load(self) -> int:
+        try:
+            state = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return 0
+        if state.get("source") != self._source:
+            raise ValueError(
+                f"{self.path} is the checkpoint of {state.get('source')!r}, not {self._source!r}"
+            )
+        return int(state["records"])
+
+    def save(self, records: int) -> None:
+        temp = self.path.with_name(f".{self.path.name}.tmp")
+        temp.write_text(json.dumps({"source": self._source, "records": records}))
+        os.replace(temp, self.path)
+
+
+class PostImportService:
+    """Adds posts from another system in batches of `batch_size`.
+
+    Each batch is validated, its images are copied into storage on
+    `image_workers` threads, and its posts are inserted in one transaction
+    with `PostRepository.bulk_add`. If a batch fails, the images it stored
+    are deleted again, so resuming it leaves no orphans. Imported posts
+    publish no events.
+    """
+
+    def __init__(
+        self,
+        post_repo: PostRepository,
+        user_repo: UserRepository,
+        image_storage: ImageStorageService,
+        image_dir: Optional[Path] = None,
+        batch_size: int = 5000,
+        image_workers: int = 8,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self._post_repo = post_repo
+        self._user_repo = user_repo
+        self._image_storage = image_storage
+        self._image_dir = image_dir
+        self._batch_size = batch_size
+        self._image_workers = image_workers
+        self._clock = clock
+        self._author_ids: Dict[str, int] = {}
+        self._known_user_ids: Set[int] = set()
+
+    def run(
+        self,
+        records: Iterable[Record],
+        first_record: int = 1,
+        on_batch: Optional[Callable[[int, PostImportReport], None]] = None,
+    ) -> PostImportReport:
+        """Import `records`, numbered from `first_record` in error messages.
+
+        After each committed batch `on_batch` gets the number of the last
+        record it held and the running totals. Raises PostImportError at the
+        first bad record; the batches before it stay committed.
+        """
+        started = time.perf_counter()
+        added = copied = 0
+        numbered = enumerate(records, start=first_record)
+        with ThreadPoolExecutor(max_workers=self._image_workers) as pool:
+            while True:
+                batch = list(itertools.islice(numbered, self._batch_size))
+                if not batch:
+                    break
+                posts = [self._to_post(number, record) for number, record in batch]
+                copied += self._copy_images(pool, batch, posts)
+                try:
+                    added += self._post_repo.bulk_add(posts)
+                except BaseException:
+                    self._discard_images(posts)
+                    raise
+                if on_batch is not None:
+                    report = PostImportReport(added, copied, time.perf_counter() - started)
+                    on_batch(batch[-1][0], report)
+        return PostImportReport(added, copied, time.perf_counter() - started)
+
+    def _to_post(self, number: int, record: Record) -> Post:
+        title = record.get("title")
+        content = record.get("content")
+        if not isinstance(title, str) or not title.strip():
+            raise PostImportError(number, "missing title")
+        if not isinstance(content, str) or not content.strip():
+            raise PostImportError(number, "missing content")
+        return Post(
+            id=None,
+            author_id=self._author_id(number, record),
+            title=title,
+            content=content,
+            created_at=self._created_at(number, record.get("created_at")),
+        )
+
+    def _author_id(self, number: int, record: Record) -> int:
+        username = record.get("author")
+        if username:
+            author_id = self._author_ids.get(username)
+            if author_id is None:
+                user = self._user_repo.get_by_username(username)
+                if user is None or user.id is None:
+                    raise PostImportError(number, f"no user named {username!r}")
+                author_id = self._author_ids[username] = user.id
+            return author_id
+        raw_id = record.get("author_id")
+        try:
+            author_id = int(raw_id)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            raise PostImportError(number, "needs an author or a numeric author_id") from None
+        if author_id not in self._known_user_ids:
+            if self._user_repo.get_by_id(author_id) is None:
+                raise PostImportError(number, f"no user with id {author_id}")
+            self._known_user_ids.add(author_id)
+        return author_id
+
+    def _created_at(self, number: int, value: Any) -> datetime:
+        if not value:
+            return self._clock()
+        try:
+            # fromisoformat() only accepts a trailing "Z" from Python 3.11.
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            raise PostImportError(number, f"bad created_at {value!r}") from None
+        if parsed.tzinfo is not None:
+            # Stored timestamps are naive UTC.
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    def _copy_images(
+        self, pool: ThreadPoolExecutor, batch: List[Tuple[int, Record]], posts: List[Post]
+    ) -> int:
+        wanted = [
+            (post, number, str(record["image"]))
+            for (number, record), post in zip(batch, posts)
+            if record.get("image")
+        ]
+        if not wanted:
+            return 0
+        if self._image_dir is None:
+            raise PostImportError(wanted[0][1], "has an image but no image directory was given")
+        futures = [pool.submit(self._copy_image, number, image) for _, number, image in wanted]
+        # Every copy finishes before an error is raised, so none is left
+        # stored behind the posts that are never inserted.
+        wait(futures)
+        for (post, _, _), future in zip(wanted, futures):
+            if future.exception() is None:
+                post.image_path = future.result()
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                self._discard_images(posts)
+                raise error
+        return len(wanted)
+
+    def _copy_image(self, number: int, relative: str) -> str:
+        assert self._image_dir is not None
+        image_dir = self._image_dir.resolve()
+        # An absolute path would replace image_dir, and ".." leave it.
+        source = (image_dir / relative).resolve()
+        if not source.is_relative_to(image_dir):
+            raise PostImportError(number, f"image {relative!r} is outside the image directory")
+        try:
+            stored = asyncio.run(
+                self._image_storage.save_image_stream(source.name, _read_file(source))
+            )
+        except OSError as exc:
+            raise PostImportError(number, f"can't read image {relative!r}: {exc}") from None
+        except ImageTooLarge as exc:
+            raise PostImportError(number, str(exc)) from None
+        if stored is None:
+            raise PostImportError(number, f"image {relative!r} is empty")
+        return stored.path
+
+    def _discard_images(self, posts: List[Post]) -> None:
+        for post in posts:
+            if post.image_path is not None:
+                self._image_storage.delete_image(post.image_path)
+                post.image_path = None
+
+
+async def _read_file(path: Path) -> AsyncIterator[bytes]:
+    """`path` in chunks, for the streaming save: images are never read whole."""
+    with path.open("rb") as source:
+        while True:
+            chunk = source.read(_IMAGE_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,143 @@
+"""Delivery latency of the cross-worker change bus, idle and under write load.
+
+Starts ``--workers`` subscriber processes on a throwaway database, each
+with its own ``SqliteChangeBus`` as a uvicorn worker would have. This
+process publishes ``--rate`` events per second for ``--duration`` seconds.
+Each event carries its send time, and subscribers record how long it took
+to reach their handler. The run is repeated with ``--writers`` extra
+processes inserting posts as fast as they can. Those writers contend for
+the write lock and move ``PRAGMA data_version`` on every commit.
+
+Reports delivered/expected events and p50/p95/p99/max latency.
+
+Usage:
+    python -m benchmarks.bench_change_bus --workers 4 --rate 200 --writers 2
+"""
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List
+
+from sqlalchemy import insert
+
+from app.config import Settings
+from app.domain.events import SessionRevoked
+from app.infrastructure.change_bus import SqliteChangeBus
+from app.infrastructure.db import create_sqlite_engine
+from app.infrastructure.models import PostModel, UserModel
+from app.infrastructure.schema import ensure_schema
+
+
+def _subscriber(url: str, poll_seconds: float, ready: Any, stop: Any, results: Any) -> None:
+    engine = create_sqlite_engine(url, Settings())
+    bus = SqliteChangeBus(lambda: engine, poll_seconds=poll_seconds)
+    latencies: List[float] = []
+    # The benchmark's events carry their send time as the session id.
+    bus.subscribe(
+        SessionRevoked,
+        lambda event: latencies.append(time.time() - float(event.session_id)),
+        cross_worker=True,
+    )
+    bus.start()
+    ready.release()
+    stop.wait()
+    bus.stop()
+    results.put(latencies)
+
+
+def _writer(url: str, stop: Any, commits: Any) -> None:
+    engine = create_sqlite_engine(url, Settings())
+    done = 0
+    while not stop.is_set():
+        with engine.begin() as conn:
+            conn.execute(
+                insert(PostModel),
+                [{"author_id": 1, "title": "Load", "content": "x" * 500, "created_at": datetime.utcnow()}],
+            )
+        done += 1
+    commits.put(done)
+
+
+def _run(url: str, args: argparse.Namespace, writers: int) -> None:
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    stop = context.Event()
+    results = context.Queue()
+    commits = context.Queue()
+    processes = [
+        context.Process(target=_subscriber, args=(url, args.poll_seconds, ready, stop, results))
+        for _ in range(args.workers)
+    ] + [context.Process(target=_writer, args=(url, stop, commits)) for _ in range(writers)]
+    for process in processes:
+        process.start()
+    for _ in range(args.workers):
+        ready.acquire()
+
+    engine = create_sqlite_engine(url, Settings())
+    publisher = SqliteChangeBus(lambda: engine, poll_seconds=args.poll_seconds)
+    publisher.start()
+    expected = int(args.rate * args.duration)
+    started = time.perf_counter()
+    for sent in range(expected):
+        delay = started + sent / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        publisher.publish(SessionRevoked(session_id=repr(time.time())))
+    publisher.stop()
+    time.sleep(max(0.5, args.poll_seconds * 4))  # let the last events arrive
+    stop.set()
+
+    latencies: List[float] = []
+    for _ in range(args.workers):
+        latencies.extend(results.get())
+    write_commits = sum(commits.get() for _ in range(writers))
+    for process in processes:
+        process.join()
+    engine.dispose()
+
+    ms = sorted(latency * 1000 for latency in latencies)
+    label = f"{writers} writers" if writers else "idle"
+    if not ms:
+        print(f"{label:>10}  nothing delivered")
+        return
+    cuts = statistics.quantiles(ms, n=100)
+    load = f"  ({write_commits / args.duration:,.0f} write commits/s)" if writers else ""
+    print(
+        f"{label:>10}  {len(ms):>6}/{expected * args.workers:<6}"
+        f"  {cuts[49]:>7.2f}  {cuts[94]:>7.2f}  {cuts[98]:>7.2f}  {ms[-1]:>7.2f}{load}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=200.0, help="events published per second")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--poll-seconds", type=float, default=Settings.change_bus_poll_seconds)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{Path(workdir) / 'blog.sqlite3'}"
+        engine = create_sqlite_engine(url, Settings())
+        ensure_schema(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(UserModel), [{"id": 1, "username": "bench", "password_hash": "x"}])
+        engine.dispose()
+
+        print(
+            f"{args.workers} subscribers, {args.rate:g} events/s for {args.duration:g}s, "
+            f"polling every {args.poll_seconds * 1000:g} ms; latency in ms"
+        )
+        print(f"{'':>10}  {'delivered':>13}  {'p50':>7}  {'p95':>7}  {'p99':>7}  {'max':>7}")
+        _run(url, args, writers=0)
+        if args.writers:
+            _run(url, args, writers=args.writers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Concurrency benchmark: sync vs async DB mode.
+
+Starts a uvicorn server per BLOG_DB_MODE against a throwaway database,
+seeds it over HTTP, then drives uncached feed and post pages from many
+concurrent clients for a fixed duration and reports throughput, latency
+percentiles of successful requests, and errors (non-200s and client
+timeouts).
+
+Usage:
+    python -m benchmarks.bench_db_modes --concurrency 128 --duration 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.http_harness import running_server, summarize
+
+
+async def _seed(base_url: str, posts: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        credentials = {"username": "bench", "password": "bench-password"}
+        await client.post("/auth/register", data=credentials)
+        await client.post("/auth/login", data=credentials)
+        for i in range(posts):
+            await client.post(
+                "/posts", data={"title": f"Post {i}", "content": "Benchmark body " * 50}
+            )
+
+
+async def _drive(base_url: str, concurrency: int, duration: float, posts: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                path = "/" if random.random() < 0.5 else f"/posts/{random.randint(1, posts)}"
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, follow_redirects=False)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed)
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    # Measure the database path, not the feed cache.
+    with running_server({"BLOG_DB_MODE": mode, "BLOG_PAGE_CACHE_ENABLED": "0"}) as base_url:
+        asyncio.run(_seed(base_url, args.posts))
+        return asyncio.run(_drive(base_url, args.concurrency, args.duration, args.posts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per mode")
+    parser.add_argument("--posts", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6}  {'req/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for mode in args.modes:
+        result = run_mode(mode, args)
+        print(
+            f"{mode:>6}  {result['rps']:>9.1f}  {result['p50_ms']:>8.2f}  "
+            f"{result['p95_ms']:>8.2f}  {result['p99_ms']:>8.2f}  {result['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Feed query latency versus table size.
+
+Seeds throwaway SQLite databases with N posts and times the first feed page,
+a keyset page ~90% of the way down the table, and the equivalent OFFSET
+query for comparison. Keyset timings should stay flat as N grows.
+
+Usage:
+    python -m benchmarks.bench_feed_pagination --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.pagination import encode_cursor
+from app.infrastructure.db import Base
+from app.infrastructure.models import PostModel, UserModel
+from app.infrastructure.repositories import SqlAlchemyPostRepository
+
+PAGE_SIZE = 20
+SEED_BATCH = 50_000
+
+
+def _seed(session_factory: sessionmaker, count: int) -> None:
+    start = datetime(2020, 1, 1)
+    with session_factory() as db:
+        db.execute(insert(UserModel), [{"id": 1, "username": "bench", "password_hash": "x"}])
+        for offset in range(0, count, SEED_BATCH):
+            batch = [
+                {
+                    "author_id": 1,
+                    "title": f"Post {i}",
+                    "content": "Lorem ipsum dolor sit amet. " * 20,
+                    # Every tenth post shares a timestamp to exercise the id tiebreak.
+                    "created_at": start + timedelta(seconds=i - i % 10),
+                }
+                for i in range(offset, min(offset + SEED_BATCH, count))
+            ]
+            db.execute(insert(PostModel), batch)
+        db.commit()
+
+
+def _time(fn: Callable[[], object], repeats: int) -> float:
+    samples: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def run(size: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.sqlite3'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        _seed(session_factory, size)
+
+        with session_factory() as db:
+            repo = SqlAlchemyPostRepository(db)
+            depth = int(size * 0.9)
+            anchor = (
+                db.query(PostModel)
+                .order_by(PostModel.created_at.desc(), PostModel.id.desc())
+                .offset(depth)
+                .first()
+            )
+            deep_cursor = encode_cursor(anchor.created_at, anchor.id)
+
+            def offset_page() -> object:
+                return (
+                    db.query(PostModel)
+                    .order_by(PostModel.created_at.desc(), PostModel.id.desc())
+                    .offset(depth)
+                    .limit(PAGE_SIZE)
+                    .all()
+                )
+
+            first_ms = _time(lambda: repo.list_page(limit=PAGE_SIZE), repeats)
+            deep_ms = _time(
+                lambda: repo.list_page(after_cursor=deep_cursor, limit=PAGE_SIZE),
+                repeats,
+            )
+            offset_ms = _time(offset_page, repeats)
+        engine.dispose()
+
+    print(
+        f"{size:>10,}  {first_ms:>12.3f}  {deep_ms:>12.3f}  {offset_ms:>12.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'first ms':>12}  {'keyset@90%':>12}  {'offset@90%':>12}")
+    for size in args.sizes:
+        run(size, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
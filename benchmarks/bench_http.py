@@ -0,0 +1,243 @@
+"""HTTP benchmark suite for the core routes, with baseline comparison.
+
+Starts the real app (``app.main:app``, i.e. ``create_app()``) under uvicorn
+against a throwaway database, seeds users and posts over HTTP, then drives
+each scenario at a fixed concurrency for a fixed duration:
+
+    feed         GET /
+    post_detail  GET /posts/{id}
+    login        POST /auth/login
+    create_post  POST /posts (each client logged in as its own user)
+
+Throughput and p50/p95/p99 latency of successful requests are written to a
+JSON results file. With ``--baseline`` the run is compared against an
+earlier results file and the command exits 1 if any scenario lost more than
+``--tolerance`` of its throughput, grew its p95 by more than that, or
+started failing requests.
+
+Usage:
+    python -m benchmarks.bench_http --output bench-results.json
+    python -m benchmarks.bench_http --baseline bench-baseline.json
+    python -m benchmarks.bench_http compare bench-results.json bench-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.http_harness import running_server, summarize
+
+SCENARIOS = ("feed", "post_detail", "login", "create_post")
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _password(user: int) -> str:
+    return f"bench-password-{user}"
+
+
+async def _login(client: httpx.AsyncClient, user: int) -> httpx.Response:
+    return await client.post(
+        "/auth/login",
+        data={"username": f"bench{user}", "password": _password(user)},
+        follow_redirects=False,
+    )
+
+
+async def _seed(base_url: str, users: int, posts: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for user in range(users):
+            await client.post(
+                "/auth/register",
+                data={"username": f"bench{user}", "password": _password(user)},
+            )
+        await _login(client, 0)
+        for i in range(posts):
+            await client.post(
+                "/posts", data={"title": f"Post {i}", "content": "Benchmark body " * 50}
+            )
+
+
+def _scenario(name: str, users: int, posts: int) -> Request:
+    if name == "feed":
+        return lambda client, _: client.get("/")
+    if name == "post_detail":
+        return lambda client, _: client.get(f"/posts/{random.randint(1, posts)}")
+    if name == "login":
+        return lambda client, _: _login(client, random.randrange(users))
+    if name == "create_post":
+        return lambda client, worker: client.post(
+            "/posts",
+            data={"title": f"Bench post by worker {worker}", "content": "Benchmark body " * 50},
+            follow_redirects=False,
+        )
+    raise ValueError(f"Unknown scenario {name!r}")
+
+
+def _expected_status(name: str) -> int:
+    return 302 if name in ("login", "create_post") else 200
+
+
+async def _drive(
+    base_url: str, name: str, concurrency: int, duration: float, users: int, posts: int
+) -> Dict[str, float]:
+    request = _scenario(name, users, posts)
+    expected = _expected_status(name)
+    latencies: List[float] = []
+    errors = 0
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=10) for _ in range(concurrency)]
+    try:
+        if name == "create_post":
+            # Log every client in before the clock starts.
+            await asyncio.gather(*(_login(c, i % users) for i, c in enumerate(clients)))
+
+        async def worker(index: int, client: httpx.AsyncClient) -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await request(client, index)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code != expected:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(worker(i, c) for i, c in enumerate(clients)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await asyncio.gather(*(c.aclose() for c in clients))
+    return summarize(latencies, errors, elapsed)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    env = {"BLOG_DB_MODE": args.db_mode}
+    if args.no_page_cache:
+        env["BLOG_PAGE_CACHE_ENABLED"] = "0"
+    results: Dict[str, Dict[str, float]] = {}
+    with running_server(env) as base_url:
+        asyncio.run(_seed(base_url, args.users, args.posts))
+        for name in args.scenarios:
+            results[name] = asyncio.run(
+                _drive(base_url, name, args.concurrency, args.duration, args.users, args.posts)
+            )
+            _print_row(name, results[name])
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "db_mode": args.db_mode,
+            "page_cache": not args.no_page_cache,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "users": args.users,
+            "posts": args.posts,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Human-readable regressions of `current` against `baseline`."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['rps']:.1f} req/s vs baseline {base['rps']:.1f}"
+            )
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f}"
+            )
+        if result["errors"] > 0 and base["errors"] == 0:
+            regressions.append(f"{name}: {result['errors']} errors vs none in baseline")
+    return regressions
+
+
+def _print_header() -> None:
+    print(f"{'scenario':>12}  {'req/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+
+
+def _print_row(name: str, result: Dict[str, float]) -> None:
+    print(
+        f"{name:>12}  {result['rps']:>9.1f}  {result['p50_ms']:>8.2f}  "
+        f"{result['p95_ms']:>8.2f}  {result['p99_ms']:>8.2f}  {result['errors']:>6}"
+    )
+
+
+def _report(current: Dict[str, Any], baseline_path: Path, tolerance: float) -> int:
+    baseline = json.loads(baseline_path.read_text())
+    regressions = compare(current, baseline, tolerance)
+    if not regressions:
+        print(f"No regressions against {baseline_path} (tolerance {tolerance:.0%}).")
+        return 0
+    print(f"Regressions against {baseline_path} (tolerance {tolerance:.0%}):")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="bench_http compare")
+        parser.add_argument("current", type=Path)
+        parser.add_argument("baseline", type=Path)
+        parser.add_argument("--tolerance", type=float, default=0.10)
+        args = parser.parse_args(argv[1:])
+        return _report(json.loads(args.current.read_text()), args.baseline, args.tolerance)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per scenario")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--no-page-cache", action="store_true", help="render every feed request")
+    parser.add_argument("--output", type=Path, default=Path("bench-results.json"))
+    parser.add_argument("--baseline", type=Path, help="results file to flag regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown (default 0.10)")
+    args = parser.parse_args(argv)
+
+    _print_header()
+    current = run_suite(args)
+    args.output.write_text(json.dumps(current, indent=2) + "\n")
+    print(f"Results written to {args.output}")
+    if args.baseline is not None:
+        return _report(current, args.baseline, args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
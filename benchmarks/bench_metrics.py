@@ -0,0 +1,106 @@
+"""Per-request cost of the request metrics middleware, and of a scrape.
+
+Drives a minimal FastAPI app (one ``/items/{item_id}`` route returning a
+short text body) directly through its ASGI interface, with and without
+``RequestMetricsMiddleware``, so the difference is the middleware alone
+rather than network or server noise. Then times rendering ``/metrics``
+with as many route series as the real app has.
+
+Usage:
+    python -m benchmarks.bench_metrics --requests 50000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.api.request_metrics import HttpMetrics, RequestMetricsMiddleware
+from app.infrastructure.metrics import MetricsRegistry
+
+
+def _app(registry: Optional[MetricsRegistry] = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    if registry is not None:
+        app.add_middleware(RequestMetricsMiddleware, metrics=HttpMetrics(registry))
+    return app
+
+
+async def _drive(app: FastAPI, requests: int) -> float:
+    """Mean seconds per request over `requests` sequential calls."""
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    def scope(i: int) -> Dict[str, Any]:
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/items/{i}",
+            "raw_path": f"/items/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+
+    for i in range(200):  # warm up routing and the middleware stack
+        await app(scope(i), receive, send)
+    started = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def _render_ms(routes: int, repeats: int) -> float:
+    registry = MetricsRegistry()
+    metrics = HttpMetrics(registry)
+    for route in range(routes):
+        for status in ("200", "302", "404"):
+            metrics.requests.inc("GET", f"/route/{route}", status)
+        metrics.duration.observe(0.01, "GET", f"/route/{route}")
+    samples: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        registry.render()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=5, help="alternating runs of each variant")
+    parser.add_argument("--routes", type=int, default=20, help="route series for the render timing")
+    args = parser.parse_args()
+
+    plain, instrumented = [], []
+    for _ in range(args.rounds):
+        plain.append(asyncio.run(_drive(_app(), args.requests)))
+        instrumented.append(asyncio.run(_drive(_app(MetricsRegistry()), args.requests)))
+    base_us = statistics.median(plain) * 1e6
+    with_us = statistics.median(instrumented) * 1e6
+    print(f"{'variant':>16}  {'us/request':>10}")
+    print(f"{'no metrics':>16}  {base_us:>10.2f}")
+    print(f"{'with metrics':>16}  {with_us:>10.2f}")
+    print(f"overhead: {with_us - base_us:.2f} us/request ({(with_us / base_us - 1):.1%})")
+    print(f"render /metrics with {args.routes} routes: {_render_ms(args.routes, 200):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
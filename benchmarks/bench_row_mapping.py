@@ -0,0 +1,145 @@
+"""Cost of turning post rows into entities: ORM instances versus plain rows.
+
+Seeds an in-memory SQLite database and reads the newest N posts two ways,
+each in a fresh session as a request would:
+
+* ``orm``: what the repositories used to do. ``select(PostModel)`` builds
+  ORM instances (with identity-map bookkeeping), then every field is
+  copied into a ``Post`` dataclass with a per-instance ``__dict__``.
+* ``rows``: what they do now. The explicit post columns are selected on
+  the session's connection and each row is unpacked into a slotted
+  ``Post``.
+
+Reports time, peak allocation while reading, and memory still held by the
+resulting entities, all scaled to 1,000 rows.
+
+Usage:
+    python -m benchmarks.bench_row_mapping --rows 1000 --repeats 50
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities import Post
+from app.infrastructure.db import Base
+from app.infrastructure.models import PostModel, UserModel
+from app.infrastructure.repositories import _newest_posts, _post_from_row
+
+
+@dataclass
+class _DictPost:
+    """``Post`` as it was before it had slots."""
+
+    id: Optional[int]
+    author_id: int
+    title: str
+    content: str
+    image_path: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    image_variants: Dict[int, str] = field(default_factory=dict)
+    author_username: Optional[str] = None
+
+
+def _seed(session_factory: sessionmaker, count: int) -> None:
+    start = datetime(2020, 1, 1)
+    with session_factory() as db:
+        db.execute(insert(UserModel), [{"id": 1, "username": "bench", "password_hash": "x"}])
+        db.execute(
+            insert(PostModel),
+            [
+                {
+                    "author_id": 1,
+                    "title": f"Post {i}",
+                    "content": "Benchmark body " * 50,
+                    "image_path": f"uploads/{i}.jpg" if i % 2 else None,
+                    "image_variants": {"320": f"uploads/{i}-320.webp"} if i % 2 else None,
+                    "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(count)
+            ],
+        )
+        db.commit()
+
+
+def _read_orm(session_factory: sessionmaker, count: int) -> List[_DictPost]:
+    stmt = select(PostModel).order_by(PostModel.created_at.desc(), PostModel.id.desc()).limit(count)
+    with session_factory() as db:
+        return [
+            _DictPost(
+                id=row.id,
+                author_id=row.author_id,
+                title=row.title,
+                content=row.content,
+                image_path=row.image_path,
+                created_at=row.created_at,
+                image_variants={
+                    int(width): path for width, path in (row.image_variants or {}).items()
+                },
+            )
+            for row in db.scalars(stmt).all()
+        ]
+
+
+def _read_rows(session_factory: sessionmaker, count: int) -> List[Post]:
+    with session_factory() as db:
+        return [_post_from_row(row) for row in db.connection().execute(_newest_posts(count)).all()]
+
+
+def _measure(read: Callable[[], list], repeats: int) -> Tuple[float, int, int]:
+    """(median seconds, peak bytes allocated, bytes retained by the result)."""
+    read()  # warm the statement cache and the connection pool
+    samples: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        read()
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = read()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return statistics.median(samples), peak - before, retained - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    _seed(session_factory, args.rows)
+
+    scale = 1000 / args.rows
+    print(f"per 1,000 rows ({args.rows} read, median of {args.repeats})")
+    print(f"{'path':>6}  {'ms':>8}  {'peak KiB':>9}  {'held KiB':>9}")
+    results = {}
+    for name, read in (
+        ("orm", lambda: _read_orm(session_factory, args.rows)),
+        ("rows", lambda: _read_rows(session_factory, args.rows)),
+    ):
+        seconds, peak, retained = _measure(read, args.repeats)
+        results[name] = seconds
+        print(
+            f"{name:>6}  {seconds * 1000 * scale:>8.2f}"
+            f"  {peak / 1024 * scale:>9.0f}  {retained / 1024 * scale:>9.0f}"
+        )
+    print(f"speedup: {results['orm'] / results['rows']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
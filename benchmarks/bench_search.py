@@ -0,0 +1,121 @@
+"""Full-text search latency versus table size.
+
+Seeds throwaway SQLite databases with N posts, builds the FTS5 index, and
+times the first page of results for a rare, an uncommon, a medium and a
+common term, plus a LIKE scan of the content for comparison. The common
+term is in every post. Terms in more than RANKED_TERM_POSTS_MAX posts are
+listed newest first instead of by BM25, so each row should stay in the
+low milliseconds at any N. At 1M posts the uncommon term is in exactly
+that many, the most a ranked query has to score.
+
+Usage:
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.infrastructure.db import Base
+from app.infrastructure.models import PostModel, UserModel
+from app.infrastructure.repositories import SqlAlchemyPostRepository
+from app.infrastructure.search import ensure_search_index
+
+PAGE_SIZE = 20
+SEED_BATCH = 50_000
+
+
+def _content(i: int) -> str:
+    words = ["Lorem ipsum dolor sit amet, common words everywhere."] * 10
+    if i % 100 == 0:
+        words.append("A medium frequency mention.")
+    if i % 1000 == 0:
+        words.append("An uncommon remark.")
+    if i % 10_000 == 0:
+        words.append("Something genuinely rare.")
+    return " ".join(words)
+
+
+def _seed(session_factory: sessionmaker, count: int) -> None:
+    start = datetime(2020, 1, 1)
+    with session_factory() as db:
+        db.execute(insert(UserModel), [{"id": 1, "username": "bench", "password_hash": "x"}])
+        for offset in range(0, count, SEED_BATCH):
+            batch = [
+                {
+                    "author_id": 1,
+                    "title": f"Post {i}",
+                    "content": _content(i),
+                    "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + SEED_BATCH, count))
+            ]
+            db.execute(insert(PostModel), batch)
+        db.commit()
+
+
+def _time(fn: Callable[[], object], repeats: int) -> float:
+    samples: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def run(size: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.sqlite3'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        _seed(session_factory, size)
+        started = time.perf_counter()
+        # Seeded before the index exists, so this builds it in one pass.
+        ensure_search_index(engine)
+        build_s = time.perf_counter() - started
+
+        with session_factory() as db:
+            repo = SqlAlchemyPostRepository(db)
+            timings = [
+                _time(lambda term=term: repo.search(term, limit=PAGE_SIZE), repeats)
+                for term in ("rare", "uncommon", "medium", "common")
+            ]
+            like_ms = _time(
+                lambda: db.execute(
+                    select(PostModel.id)
+                    .where(PostModel.content.like("%rare%"))
+                    .limit(PAGE_SIZE)
+                ).all(),
+                max(1, repeats // 10),
+            )
+        engine.dispose()
+
+    print(
+        f"{size:>10,}  {build_s:>9.1f}  "
+        + "  ".join(f"{ms:>9.3f}" for ms in timings)
+        + f"  {like_ms:>9.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>10}  {'build s':>9}  {'rare ms':>9}  {'uncommon':>9}  "
+        f"{'medium ms':>9}  {'common ms':>9}  {'LIKE ms':>9}"
+    )
+    for size in args.sizes:
+        run(size, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Cold start: importing the app and getting it ready to serve.
+
+Two measurements against a throwaway database that is already current:
+
+* ``process``: a fresh interpreter runs ``import app.main`` (which calls
+  ``create_app()``), timed from inside the child so interpreter startup
+  itself is left out. This is what a scale-to-zero instance pays before
+  its first request.
+* ``schema``: the schema step alone, each repeat on a new engine as in a
+  new process. ``reconcile`` is what every boot used to run
+  (``create_all``, column and index reflection, the search index DDL);
+  ``versioned`` is the ``PRAGMA user_version`` check that replaced it.
+
+Usage:
+    python -m benchmarks.bench_startup --repeats 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from sqlalchemy.engine import Engine
+
+from app.config import Settings
+from app.infrastructure.db import create_sqlite_engine
+from app.infrastructure.schema import ensure_schema, upgrade_schema
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD = """
+import time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+"""
+
+
+def _process_start(env: Dict[str, str], repeats: int) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-c", _CHILD],
+            cwd=_PROJECT_ROOT,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def _reconcile(engine: Engine) -> None:
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+
+
+def _schema_step(url: str, step: Callable[[Engine], object], repeats: int) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        engine = create_sqlite_engine(url, Settings())
+        try:
+            started = time.perf_counter()
+            step(engine)
+            samples.append(time.perf_counter() - started)
+        finally:
+            engine.dispose()
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = Path(workdir) / "blog.sqlite3"
+        url = f"sqlite:///{database}"
+        env = dict(
+            os.environ,
+            BLOG_DATABASE_PATH=str(database),
+            BLOG_TEMPLATE_CACHE_DIR=str(Path(workdir) / "template_cache"),
+            BLOG_SESSION_REAP_INTERVAL_SECONDS="0",
+        )
+        # The first start creates the schema and fills the template cache.
+        _process_start(env, 1)
+
+        process = _process_start(env, args.repeats)
+        reconcile = _schema_step(url, _reconcile, args.repeats)
+        versioned = _schema_step(url, ensure_schema, args.repeats)
+
+    print(f"median of {args.repeats}, database already current")
+    print(f"{'process':>10}  {statistics.median(process) * 1000:>8.1f} ms  import app.main")
+    print(f"{'reconcile':>10}  {statistics.median(reconcile) * 1000:>8.2f} ms  schema step, before")
+    print(f"{'versioned':>10}  {statistics.median(versioned) * 1000:>8.2f} ms  schema step, now")
+    print(f"schema step speedup: {statistics.median(reconcile) / statistics.median(versioned):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
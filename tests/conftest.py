@@ -1,6 +1,20 @@
+import os
+import shutil
 import sys
+import tempfile
+from functools import partial
 from pathlib import Path
 
+import pytest
+
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Keep compiled templates out of the project's app_data. Set here, not
+    # in a fixture: app.main builds the app as soon as a test imports it.
+    cache_dir = tempfile.mkdtemp(prefix="blog-template-cache-")
+    config.add_cleanup(partial(shutil.rmtree, cache_dir, ignore_errors=True))
+    os.environ["BLOG_TEMPLATE_CACHE_DIR"] = cache_dir
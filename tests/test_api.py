@@ -1,18 +1,44 @@
 """API integration tests for the blog application"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import re
+import uuid
+
 import pytest
+from PIL import Image
 from httpx import AsyncClient, ASGITransport
-from typing import AsyncGenerator
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import AsyncGenerator, Any, List
 
+from app.api import dependencies, routers_posts
+from app.config import get_settings
+from app.domain.interfaces import PasswordHasherBusy
+from app.infrastructure.db import dispose_async_engine
+from app.infrastructure.sql_instrumentation import query_budget
 from app.main import create_app
+from app.use_cases.auth_service import BcryptPasswordHasher
+from app.use_cases.blog_service import AsyncBlogService, BlogService
 
 
-@pytest.fixture
-async def client() -> AsyncGenerator[AsyncClient, None]:
-    """Create a test client for the FastAPI application"""
+@pytest.fixture(params=["sync", "async"])
+async def client(
+    request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[AsyncClient, None]:
+    """Create a test client for the FastAPI application in each DB mode"""
+    monkeypatch.setenv("BLOG_DB_MODE", request.param)
+    get_settings.cache_clear()
     app = create_app()
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
+    await dispose_async_engine()
+    monkeypatch.undo()
+    get_settings.cache_clear()
 
 
 @pytest.mark.asyncio
@@ -33,6 +59,14 @@ class TestHomepage:
         assert response.status_code == 200
         assert b"Login" in response.content or b"login" in response.content
 
+    async def test_homepage_invalid_cursor_redirects(
+        self, client: AsyncClient
+    ) -> None:
+        """Test that a malformed pagination cursor falls back to page one"""
+        response = await client.get("/?cursor=garbage", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["location"] == "/"
+
 
 @pytest.mark.asyncio
 class TestAuthentication:
@@ -103,6 +137,32 @@ class TestAuthentication:
         # Should return 400 or 401
         assert response.status_code in [400, 401, 302]
 
+    async def test_login_returns_503_when_hashing_pool_is_saturated(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a saturated password hashing pool sheds load with a 503"""
+        await client.post(
+            "/auth/register",
+            data={"username": "busyuser", "password": "busypass"},
+        )
+
+        class SaturatedHasher(BcryptPasswordHasher):
+            def verify(self, password: str, password_hash: str) -> bool:
+                raise PasswordHasherBusy()
+
+            async def verify_async(self, password: str, password_hash: str) -> bool:
+                raise PasswordHasherBusy()
+
+        monkeypatch.setattr(dependencies, "password_hasher", SaturatedHasher())
+        response = await client.post(
+            "/auth/login",
+            data={"username": "busyuser", "password": "busypass"},
+            follow_redirects=False,
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
     async def test_logout(self, client: AsyncClient) -> None:
         """Test logging out"""
         # Register and login
@@ -120,6 +180,94 @@ class TestAuthentication:
         assert response.status_code == 302
 
 
+    async def test_repeat_requests_resolve_session_from_cache(
+        self, client: AsyncClient
+    ) -> None:
+        """Test that an already-resolved session cookie costs no further queries"""
+        await client.post(
+            "/auth/register",
+            data={"username": "cacheduser", "password": "password"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "cacheduser", "password": "password"},
+        )
+        await client.get("/new")
+
+        statements: List[str] = []
+
+        def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            response = await client.get("/new")
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert statements == []
+
+    async def test_logout_revokes_cached_session(self, client: AsyncClient) -> None:
+        """Test that a logged-out cookie stops authenticating immediately"""
+        await client.post(
+            "/auth/register",
+            data={"username": "revoked", "password": "password"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "revoked", "password": "password"},
+        )
+        session_id = client.cookies["session_id"]
+        assert (await client.get("/new", follow_redirects=False)).status_code == 200
+
+        await client.post("/auth/logout")
+        client.cookies.set("session_id", session_id)
+
+        response = await client.get("/new", follow_redirects=False)
+        assert response.status_code == 302
+
+    async def test_token_sessions_work_without_session_rows(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that BLOG_SESSION_STORE=token logs in and out with signed cookies"""
+        monkeypatch.setenv("BLOG_SESSION_STORE", "token")
+        monkeypatch.setenv("BLOG_SESSION_SIGNING_KEYS", f"k1:{'s' * 32}")
+        get_settings.cache_clear()
+        await client.post(
+            "/auth/register",
+            data={"username": "tokenuser", "password": "password"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "tokenuser", "password": "password"},
+        )
+        session_id = client.cookies["session_id"]
+        assert session_id.startswith("k1.") and session_id.count(".") == 2
+
+        dependencies.session_user_cache.clear()
+        statements: List[str] = []
+
+        def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+            statements.append(statement)
+
+        await client.get("/new")  # loads the revocation list
+        dependencies.session_user_cache.clear()
+        monkeypatch.setattr(dependencies.session_revocations, "needs_refresh", lambda: False)
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            response = await client.get("/new", follow_redirects=False)
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert statements == []
+
+        await client.post("/auth/logout")
+        client.cookies.set("session_id", session_id)
+        response = await client.get("/new", follow_redirects=False)
+        assert response.status_code == 302
+
+
 @pytest.mark.asyncio
 class TestBlogPosts:
     """Test cases for blog post endpoints"""
@@ -189,6 +337,224 @@ class TestBlogPosts:
         # Should redirect to homepage after creating post
         assert response.headers["location"] == "/"
 
+    async def test_new_post_invalidates_cached_feed(self, client: AsyncClient) -> None:
+        """Test that the cached homepage picks up a newly created post"""
+        await client.post(
+            "/auth/register",
+            data={"username": "cacheauthor", "password": "cachepass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "cacheauthor", "password": "cachepass"},
+        )
+        await client.get("/")
+        cached = await client.get("/")
+        assert cached.headers["x-cache"] == "HIT"
+
+        await client.post(
+            "/posts",
+            data={"title": "Fresh off the press", "content": "New content"},
+        )
+
+        response = await client.get("/")
+        assert response.headers["x-cache"] == "MISS"
+        assert b"Fresh off the press" in response.content
+        assert b"By cacheauthor on" in response.content
+
+    async def test_create_post_streams_image_upload(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that an uploaded image lands in the upload directory intact"""
+        monkeypatch.setattr(dependencies, "UPLOAD_DIR", tmp_path)
+        await client.post(
+            "/auth/register",
+            data={"username": "uploader", "password": "uploadpass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "uploader", "password": "uploadpass"},
+        )
+        image = bytes(range(256)) * 2048
+
+        response = await client.post(
+            "/posts",
+            data={"title": "With picture", "content": "See below"},
+            files={"image": ("pic.png", image, "image/png")},
+            follow_redirects=False,
+        )
+
+        assert response.status_code == 302
+        stored = list(tmp_path.iterdir())
+        assert len(stored) == 1
+        assert stored[0].suffix == ".png"
+        assert stored[0].read_bytes() == image
+        # Not a decodable image, so no variants: the feed keeps the original.
+        page = (await client.get("/")).text
+        assert f'src="/static/uploads/{stored[0].name}" loading="lazy"' in page
+
+    async def test_feed_switches_to_responsive_variants_once_rendered(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that the feed shows the original, then a lazy srcset of variants"""
+        monkeypatch.setattr(dependencies, "UPLOAD_DIR", tmp_path)
+        await client.post(
+            "/auth/register",
+            data={"username": "photographer", "password": "photopass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "photographer", "password": "photopass"},
+        )
+        png = io.BytesIO()
+        Image.new("RGB", (900, 600), (10, 120, 200)).save(png, "PNG")
+
+        await client.post(
+            "/posts",
+            data={"title": "Landscape", "content": "Wide"},
+            files={"image": ("wide.png", png.getvalue(), "image/png")},
+        )
+
+        (original,) = tmp_path.glob("*.png")
+
+        etag = (await client.get("/")).headers["etag"]
+        for _ in range(100):
+            response = await client.get("/")
+            page = response.text
+            if f"{original.stem}.w320.webp 320w" in page:
+                break
+            etag = response.headers["etag"]
+            await asyncio.sleep(0.1)
+        assert f"{original.stem}.w320.webp 320w" in page
+        # Browsers holding the page without srcset get the new markup.
+        revalidated = await client.get("/", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 200
+        assert f"{original.stem}.w900.webp 900w" in page
+        assert len(list(tmp_path.glob("*.webp"))) == 3
+
+    async def test_content_addressed_storage_dedupes_uploads(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that the same image posted twice is stored once"""
+        monkeypatch.setattr(dependencies, "UPLOAD_DIR", tmp_path)
+        monkeypatch.setenv("BLOG_IMAGE_STORAGE", "content")
+        get_settings.cache_clear()
+        await client.post(
+            "/auth/register",
+            data={"username": "reposter", "password": "uploadpass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "reposter", "password": "uploadpass"},
+        )
+        image = b"same banner" * 1000
+
+        for title in ("First banner", "Second banner"):
+            response = await client.post(
+                "/posts",
+                data={"title": title, "content": "Banner"},
+                files={"image": ("banner.png", image, "image/png")},
+                follow_redirects=False,
+            )
+            assert response.status_code == 302
+
+        stored = [p for p in tmp_path.rglob("*") if p.is_file()]
+        assert len(stored) == 1
+        assert stored[0].read_bytes() == image
+
+    async def test_create_post_rejects_oversized_image(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that an image over BLOG_UPLOAD_MAX_BYTES gets a 413 and no post"""
+        monkeypatch.setattr(dependencies, "UPLOAD_DIR", tmp_path)
+        monkeypatch.setenv("BLOG_UPLOAD_MAX_BYTES", "1024")
+        get_settings.cache_clear()
+        await client.post(
+            "/auth/register",
+            data={"username": "bigupload", "password": "uploadpass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "bigupload", "password": "uploadpass"},
+        )
+
+        response = await client.post(
+            "/posts",
+            data={"title": "Too big", "content": "Huge"},
+            files={"image": ("huge.png", b"x" * 4096, "image/png")},
+            follow_redirects=False,
+        )
+
+        assert response.status_code == 413
+        assert list(tmp_path.iterdir()) == []
+        assert b"Too big" not in (await client.get("/")).content
+
+    async def test_oversized_request_is_refused_before_it_is_read(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that bodies past the cap get a 413 before the form is parsed"""
+        monkeypatch.setenv("BLOG_UPLOAD_MAX_BYTES", "1024")
+        get_settings.cache_clear()
+        app = create_app()
+        sent: List[int] = []
+
+        async def chunked_body() -> AsyncGenerator[bytes, None]:
+            yield (
+                b'--b\r\nContent-Disposition: form-data; name="image"; filename="huge.png"'
+                b"\r\nContent-Type: image/png\r\n\r\n"
+            )
+            for _ in range(64):
+                sent.append(1)
+                yield b"x" * 64 * 1024
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            declared = await ac.post(
+                "/posts",
+                data={"title": "Too big", "content": "Huge"},
+                files={"image": ("huge.png", b"x" * 2 * 1024 * 1024, "image/png")},
+            )
+            assert declared.status_code == 413
+
+            streamed = await ac.post(
+                "/posts",
+                content=chunked_body(),
+                headers={"Content-Type": "multipart/form-data; boundary=b"},
+            )
+        assert streamed.status_code == 413
+        # Cut off just past 1 KiB + FORM_ALLOWANCE_BYTES, not after all 4 MiB.
+        assert len(sent) < 64
+
+    async def test_failed_post_removes_its_uploaded_image(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that an image saved for a post that wasn't created is deleted"""
+        monkeypatch.setattr(dependencies, "UPLOAD_DIR", tmp_path)
+        await client.post(
+            "/auth/register",
+            data={"username": "unlucky", "password": "uploadpass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "unlucky", "password": "uploadpass"},
+        )
+
+        def fail(*args: Any, **kwargs: Any) -> None:
+            raise RuntimeError("database is locked")
+
+        async def fail_async(*args: Any, **kwargs: Any) -> None:
+            fail()
+
+        monkeypatch.setattr(BlogService, "create_post", fail)
+        monkeypatch.setattr(AsyncBlogService, "create_post", fail_async)
+
+        with pytest.raises(RuntimeError):
+            await client.post(
+                "/posts",
+                data={"title": "Lost", "content": "Never saved"},
+                files={"image": ("pic.png", b"image bytes", "image/png")},
+            )
+
+        assert list(tmp_path.iterdir()) == []
+
     async def test_new_post_form_requires_authentication(
         self, client: AsyncClient
     ) -> None:
@@ -215,6 +581,322 @@ class TestBlogPosts:
         assert b"Create New Post" in response.content or b"New Post" in response.content
 
 
+@pytest.mark.asyncio
+class TestConditionalGet:
+    """Test cases for ETag / Last-Modified revalidation"""
+
+    async def _login(self, client: AsyncClient, username: str) -> None:
+        await client.post(
+            "/auth/register", data={"username": username, "password": "condpass"}
+        )
+        await client.post(
+            "/auth/login", data={"username": username, "password": "condpass"}
+        )
+
+    async def test_feed_etag_revalidates_until_new_post(
+        self, client: AsyncClient
+    ) -> None:
+        """Test that the feed answers 304 until a post is added"""
+        await self._login(client, "etagauthor")
+        first = await client.get("/")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        cached = await client.get("/", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+        await client.post("/posts", data={"title": "Newer", "content": "c"})
+        changed = await client.get("/", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    async def test_uncached_feed_revalidates_without_rendering(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a conditional request missing the page cache gets a 304 unrendered"""
+        await self._login(client, "unrenderedauthor")
+        etag = (await client.get("/")).headers["etag"]
+        routers_posts.feed_page_cache.clear()
+
+        def no_render(name: str) -> Any:
+            raise AssertionError(f"{name} was rendered")
+
+        monkeypatch.setattr(routers_posts.templates, "get_template", no_render)
+        cached = await client.get("/", headers={"If-None-Match": etag})
+
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+
+    async def test_stale_feed_page_keeps_its_own_etag(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a stale page is never sent as, or revalidated by, a fresher one"""
+        cache: Any = dependencies.PageCache(stale_seconds=60)
+        monkeypatch.setattr(dependencies, "feed_page_cache", cache)
+        monkeypatch.setattr(routers_posts, "feed_page_cache", cache)
+        await self._login(client, "staleauthor")
+        title = f"Fresher {uuid.uuid4().hex}"
+        old_etag = (await client.get("/")).headers["etag"]
+        await client.post("/posts", data={"title": title, "content": "c"})
+        # What a worker without this stale copy serves for the new feed.
+        monkeypatch.setenv("BLOG_PAGE_CACHE_ENABLED", "0")
+        get_settings.cache_clear()
+        fresh = await client.get("/")
+        assert title in fresh.text
+        monkeypatch.setenv("BLOG_PAGE_CACHE_ENABLED", "1")
+        get_settings.cache_clear()
+
+        stale = await client.get("/", headers={"If-None-Match": fresh.headers["etag"]})
+
+        assert stale.status_code == 200
+        assert stale.headers["x-cache"] == "STALE"
+        assert stale.headers["etag"] == old_etag
+        assert title not in stale.text
+        for _ in range(100):
+            refreshed = await client.get("/", headers={"If-None-Match": old_etag})
+            if refreshed.headers["x-cache"] == "HIT":
+                break
+            await asyncio.sleep(0.01)
+        assert refreshed.status_code == 200
+        assert title in refreshed.text
+
+    async def test_feed_etag_depends_on_viewer(self, client: AsyncClient) -> None:
+        """Test that logging in invalidates an anonymous copy of the feed"""
+        anonymous = await client.get("/")
+        await self._login(client, "etagviewer")
+        response = await client.get(
+            "/", headers={"If-None-Match": anonymous.headers["etag"]}
+        )
+        assert response.status_code == 200
+
+    async def test_post_if_modified_since(self, client: AsyncClient) -> None:
+        """Test that anonymous readers can revalidate a post by date"""
+        await self._login(client, "imsauthor")
+        await client.post("/posts", data={"title": "Dated", "content": "c"})
+        post_id = (await client.get("/")).text.split('href="/posts/')[1].split('"')[0]
+        await client.post("/auth/logout")
+        client.cookies.clear()
+
+        first = await client.get(f"/posts/{post_id}")
+        last_modified = first.headers["last-modified"]
+
+        fresh = await client.get(
+            f"/posts/{post_id}", headers={"If-Modified-Since": last_modified}
+        )
+        assert fresh.status_code == 304
+        stale = await client.get(
+            f"/posts/{post_id}",
+            headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+        )
+        assert stale.status_code == 200
+        mismatched = await client.get(
+            f"/posts/{post_id}",
+            headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+        )
+        assert mismatched.status_code == 200
+
+
+@pytest.mark.asyncio
+class TestSearch:
+    """Test cases for full-text search"""
+
+    async def test_search_highlights_and_escapes_matches(
+        self, client: AsyncClient
+    ) -> None:
+        """Test that a search hit is listed with its match marked up safely"""
+        word = f"zq{uuid.uuid4().hex[:10]}"
+        await client.post(
+            "/auth/register",
+            data={"username": "searcher", "password": "searchpass"},
+        )
+        await client.post(
+            "/auth/login",
+            data={"username": "searcher", "password": "searchpass"},
+        )
+        await client.post(
+            "/posts",
+            data={"title": "Findable", "content": f"<b>bold</b> {word} text"},
+        )
+
+        response = await client.get("/search", params={"q": word})
+
+        assert response.status_code == 200
+        assert b"Findable" in response.content
+        assert f"<mark>{word}</mark>".encode() in response.content
+        assert b"&lt;b&gt;bold&lt;/b&gt;" in response.content
+
+    async def test_search_without_matches(self, client: AsyncClient) -> None:
+        """Test that an unmatched query renders an empty result list"""
+        response = await client.get("/search", params={"q": "nothingmatchesthis"})
+        assert response.status_code == 200
+        assert b"No posts match" in response.content
+
+    async def test_search_invalid_cursor_redirects(self, client: AsyncClient) -> None:
+        """Test that a malformed cursor falls back to the first page"""
+        response = await client.get(
+            "/search", params={"q": "hello", "cursor": "garbage"}, follow_redirects=False
+        )
+        assert response.status_code == 302
+        assert response.headers["location"] == "/search?q=hello"
+
+
+@pytest.mark.asyncio
+class TestFeed:
+    """Test cases for the cached Atom/RSS feed"""
+
+    @pytest.fixture
+    def public_base_url(self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> str:
+        monkeypatch.setenv("BLOG_PUBLIC_BASE_URL", "https://blog.example.com")
+        get_settings.cache_clear()
+        dependencies.feed_xml_cache.clear()
+        return "https://blog.example.com/"
+
+    async def test_feed_is_cached_until_the_next_post(self, client: AsyncClient) -> None:
+        """Test that by default a cached feed runs no SQL and a new post replaces it"""
+        await client.post("/auth/register", data={"username": "feeder", "password": "feedpass"})
+        await client.post("/auth/login", data={"username": "feeder", "password": "feedpass"})
+        first = f"Feed {uuid.uuid4().hex[:10]}"
+        await client.post("/posts", data={"title": first, "content": "c"})
+
+        response = await client.get("/feed.xml")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/atom+xml")
+        assert response.headers["x-cache"] == "MISS"
+        assert first in response.text
+
+        with query_budget(0):
+            cached = await client.get("/feed.xml")
+            not_modified = await client.get(
+                "/feed.xml", headers={"If-None-Match": response.headers["etag"]}
+            )
+        assert cached.headers["x-cache"] == "HIT"
+        assert cached.content == response.content
+        assert not_modified.status_code == 304
+
+        second = f"Feed {uuid.uuid4().hex[:10]}"
+        await client.post("/posts", data={"title": second, "content": "c"})
+        refreshed = await client.get(
+            "/feed.xml", headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert refreshed.status_code == 200
+        assert second in refreshed.text
+
+    async def test_feed_links_ignore_the_host_header(
+        self, client: AsyncClient, public_base_url: str
+    ) -> None:
+        """Test that clients can't pick the feed's links or its cache keys"""
+        responses = [
+            await client.get("/feed.xml", headers={"Host": f"attacker{i}.example"})
+            for i in range(5)
+        ]
+
+        assert [r.headers["x-cache"] for r in responses] == ["MISS"] + ["HIT"] * 4
+        assert dependencies.feed_xml_cache.stats().size == 1
+        assert f'href="{public_base_url}feed.xml"' in responses[0].text
+        assert "attacker" not in responses[0].text
+
+    async def test_feed_links_follow_each_host_from_one_cached_page(
+        self, client: AsyncClient
+    ) -> None:
+        """Test that without a public base URL hosts share one cache entry, not its links"""
+        dependencies.feed_xml_cache.clear()
+
+        first = await client.get("/feed.xml", headers={"Host": "one.example"})
+        second = await client.get("/feed.xml", headers={"Host": "two.example"})
+
+        assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+        assert dependencies.feed_xml_cache.stats().size == 1
+        assert 'href="http://one.example/feed.xml"' in first.text
+        assert 'href="http://two.example/feed.xml"' in second.text
+        assert "one.example" not in second.text
+        assert first.headers["etag"] != second.headers["etag"]
+
+    async def test_rss_format_and_bad_cursor(self, client: AsyncClient) -> None:
+        """Test that RSS is served and a malformed cursor restarts the feed"""
+        response = await client.get("/feed.xml", params={"format": "rss"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/rss+xml")
+        assert response.text.startswith("<?xml")
+
+        response = await client.get(
+            "/feed.xml",
+            params={"format": "rss", "cursor": "garbage"},
+            follow_redirects=False,
+        )
+        assert response.status_code == 302
+        assert response.headers["location"] == "/feed.xml?format=rss"
+
+
+@pytest.mark.asyncio
+class TestExport:
+    """Test cases for the streamed post export"""
+
+    async def test_export_requires_sign_in(self, client: AsyncClient) -> None:
+        """Test that anonymous visitors can't download the export"""
+        response = await client.get("/export")
+        assert response.status_code == 401
+
+    async def test_export_streams_jsonl_and_gzipped_csv(self, client: AsyncClient) -> None:
+        """Test that every post is exported in both formats"""
+        title = f"Export {uuid.uuid4().hex[:10]}"
+        await client.post(
+            "/auth/register", data={"username": "exporter", "password": "exportpass"}
+        )
+        await client.post(
+            "/auth/login", data={"username": "exporter", "password": "exportpass"}
+        )
+        await client.post("/posts", data={"title": title, "content": "line one\nline two"})
+
+        response = await client.get("/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "attachment" in response.headers["content-disposition"]
+        records = [json.loads(line) for line in response.text.splitlines()]
+        exported = next(r for r in records if r["title"] == title)
+        assert exported["author"] == "exporter"
+        assert exported["content"] == "line one\nline two"
+
+        response = await client.get("/export", params={"format": "csv", "gzip": "true"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+        assert title in {row["title"] for row in rows}
+
+    async def test_one_export_per_user_at_a_time(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a second export gets a 429 until the first one ends"""
+        username = f"hoarder{uuid.uuid4().hex[:8]}"
+        await client.post("/auth/register", data={"username": username, "password": "exportpass"})
+        await client.post("/auth/login", data={"username": username, "password": "exportpass"})
+        started = asyncio.Event()
+        finish = asyncio.Event()
+        iterate_service = routers_posts.iterate_service
+
+        async def held_open(items: Any) -> AsyncGenerator[bytes, None]:
+            started.set()
+            await finish.wait()
+            async for item in iterate_service(items):
+                yield item
+
+        monkeypatch.setattr(routers_posts, "iterate_service", held_open)
+
+        first = asyncio.ensure_future(client.get("/export"))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        second = await client.get("/export")
+        finish.set()
+
+        assert second.status_code == 429
+        assert second.headers["retry-after"] == "10"
+        assert (await first).status_code == 200
+        assert (await client.get("/export")).status_code == 200
+        assert routers_posts._exports_running == {}
+
+
 @pytest.mark.asyncio
 class TestStaticFiles:
     """Test cases for static file serving"""
@@ -224,3 +906,146 @@ class TestStaticFiles:
         response = await client.get("/static/style.css")
         assert response.status_code == 200
         assert "text/css" in response.headers.get("content-type", "")
+
+    async def test_pages_link_fingerprinted_css(self, client: AsyncClient) -> None:
+        """Test that the stylesheet is served gzipped with immutable caching"""
+        page = (await client.get("/")).text
+        href = page.split('rel="stylesheet" href="')[1].split('"')[0]
+        assert href.startswith("/static/style.") and href != "/static/style.css"
+
+        response = await client.get(href, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["content-encoding"] == "gzip"
+        assert "text/css" in response.headers["content-type"]
+        # httpx decodes the body, so it matches the file on disk.
+        assert response.content == (dependencies.STATIC_DIR / "style.css").read_bytes()
+
+        revalidated = await client.get(
+            href,
+            headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+        )
+        assert revalidated.status_code == 304
+
+
+@pytest.mark.asyncio
+class TestMetrics:
+    """Test cases for the Prometheus metrics endpoint"""
+
+    @pytest.fixture
+    async def metrics_client(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> AsyncGenerator[AsyncClient, None]:
+        monkeypatch.setenv("BLOG_METRICS_ENABLED", "true")
+        get_settings.cache_clear()
+        app = create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            yield ac
+
+    async def test_metrics_are_off_by_default(self, client: AsyncClient) -> None:
+        """Test that /metrics is not served unless enabled"""
+        response = await client.get("/metrics")
+        assert response.status_code == 404
+
+    async def test_metrics_token_is_required_when_set(
+        self, metrics_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that scrapes without the configured bearer token are refused"""
+        monkeypatch.setenv("BLOG_METRICS_TOKEN", "scrape-secret")
+        get_settings.cache_clear()
+
+        missing = await metrics_client.get("/metrics")
+        wrong = await metrics_client.get(
+            "/metrics", headers={"Authorization": "Bearer guessed"}
+        )
+        right = await metrics_client.get(
+            "/metrics", headers={"Authorization": "Bearer scrape-secret"}
+        )
+
+        assert missing.status_code == wrong.status_code == 401
+        assert missing.headers["www-authenticate"] == "Bearer"
+        assert right.status_code == 200
+
+    async def test_metrics_report_route_templates(self, metrics_client: AsyncClient) -> None:
+        """Test that requests are counted under their route template, not raw path"""
+        client = metrics_client
+        await client.get("/posts/999999")
+        await client.get("/static/style.css")
+        await client.get("/search", params={"q": "metrics"})
+
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'method="GET",route="/posts/{post_id}"' in body
+        assert 'route="/static/{path}",status="200"' in body
+        assert "/posts/999999" not in body
+        assert 'blog_db_pool_checked_out{engine="writer"}' in body
+        assert "# TYPE blog_password_hash_duration_seconds histogram" in body
+        assert 'blog_template_render_seconds_count{template="search.html"}' in body
+
+
+@pytest.mark.asyncio
+class TestQueryBudgets:
+    """Test cases pinning how many SQL statements each page may issue"""
+
+    async def _cold_login(self, client: AsyncClient) -> str:
+        await client.post(
+            "/auth/register", data={"username": "budgeter", "password": "budgetpass"}
+        )
+        await client.post(
+            "/auth/login", data={"username": "budgeter", "password": "budgetpass"}
+        )
+        await client.post("/posts", data={"title": "Budgeted", "content": "Counted words"})
+        page = (await client.get("/")).text
+        post_url = "/posts/" + page.split('href="/posts/')[1].split('"')[0]
+        # Measure with nothing cached, the worst case.
+        dependencies.feed_page_cache.invalidate()
+        dependencies.session_user_cache.clear()
+        dependencies.author_name_cache.clear()
+        return post_url
+
+    async def test_feed_budget(self, client: AsyncClient) -> None:
+        """Test that the feed costs session, page and authors"""
+        await self._cold_login(client)
+        with query_budget(3):
+            assert (await client.get("/")).status_code == 200
+
+    async def test_cached_feed_budget(self, client: AsyncClient) -> None:
+        """Test that a cached feed page and its 304 reach no SQL for anonymous readers"""
+        await self._cold_login(client)
+        await client.post("/auth/logout")
+        client.cookies.clear()
+        etag = (await client.get("/")).headers["etag"]
+        with query_budget(0):
+            assert (await client.get("/")).headers["x-cache"] == "HIT"
+            assert (await client.get("/", headers={"If-None-Match": etag})).status_code == 304
+
+    async def test_post_detail_budget(self, client: AsyncClient) -> None:
+        """Test that a post page costs session, post and author"""
+        post_url = await self._cold_login(client)
+        with query_budget(3):
+            assert (await client.get(post_url)).status_code == 200
+
+    async def test_search_budget(self, client: AsyncClient) -> None:
+        """Test that a search costs session, term frequencies, matches and authors"""
+        await self._cold_login(client)
+        with query_budget(4):
+            assert (await client.get("/search", params={"q": "counted"})).status_code == 200
+
+    async def test_debug_mode_reports_server_timing(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that BLOG_DEBUG adds the request's query count as Server-Timing"""
+        monkeypatch.setenv("BLOG_DEBUG", "1")
+        get_settings.cache_clear()
+        app = create_app()
+        get_settings.cache_clear()
+        dependencies.feed_page_cache.invalidate()
+        dependencies.author_name_cache.clear()
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as debug_client:
+            response = await debug_client.get("/")
+        timing = re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"])
+        assert timing is not None and int(timing.group(1)) >= 1
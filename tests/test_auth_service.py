@@ -1,7 +1,11 @@
-from typing import Optional, Dict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Tuple
 
 from app.domain.entities import User, Session
+from app.domain.events import SessionRevoked
 from app.domain.interfaces import UserRepository, SessionRepository
+from app.domain.sessions import SessionPolicy, last_seen
+from app.infrastructure.event_bus import InProcessEventBus
 from app.use_cases.auth_service import AuthService
 
 
@@ -27,8 +31,9 @@ class InMemoryUserRepo(UserRepository):
 
 
 class InMemorySessionRepo(SessionRepository):
-    def __init__(self) -> None:
+    def __init__(self, user_repo: Optional[InMemoryUserRepo] = None) -> None:
         self.sessions: Dict[str, Session] = {}
+        self._user_repo = user_repo
 
     def add(self, session: Session) -> Session:
         self.sessions[session.id] = session
@@ -37,9 +42,38 @@ class InMemorySessionRepo(SessionRepository):
     def get(self, session_id: str) -> Optional[Session]:
         return self.sessions.get(session_id)
 
+    def get_with_user(self, session_id: str) -> Optional[Tuple[Session, User]]:
+        session = self.sessions.get(session_id)
+        if session is None or self._user_repo is None:
+            return None
+        user = self._user_repo.get_by_id(session.user_id)
+        return None if user is None else (session, user)
+
+    def touch(self, session_id: str, seen_at: datetime) -> None:
+        self.sessions[session_id].last_seen_at = seen_at
+
     def delete(self, session_id: str) -> None:
         self.sessions.pop(session_id, None)
 
+    def delete_for_user(self, user_id: int) -> List[str]:
+        doomed = [s.id for s in self.sessions.values() if s.user_id == user_id]
+        for session_id in doomed:
+            del self.sessions[session_id]
+        return doomed
+
+    def delete_expired(
+        self, created_before: Optional[datetime], seen_before: Optional[datetime], limit: int
+    ) -> int:
+        doomed = [
+            s.id
+            for s in self.sessions.values()
+            if (created_before is not None and s.created_at < created_before)
+            or (seen_before is not None and last_seen(s) < seen_before)
+        ][:limit]
+        for session_id in doomed:
+            del self.sessions[session_id]
+        return len(doomed)
+
 
 def test_register_and_authenticate() -> None:
     user_repo = InMemoryUserRepo()
@@ -52,3 +86,157 @@ def test_register_and_authenticate() -> None:
     session = service.authenticate("alice", "password123")
     assert session is not None
     assert session_repo.get(session.id) is not None
+
+
+def test_session_repo_resolves_user_and_logout_publishes_revocation() -> None:
+    user_repo = InMemoryUserRepo()
+    session_repo = InMemorySessionRepo(user_repo)
+    published: List[SessionRevoked] = []
+    events = InProcessEventBus()
+    events.subscribe(SessionRevoked, published.append)
+    service = AuthService(user_repo=user_repo, session_repo=session_repo, events=events)
+
+    service.register("carol", "password123")
+    session = service.authenticate("carol", "password123")
+    assert session is not None
+    user = service.get_session_user(session.id)
+    assert user is not None and user.username == "carol"
+
+    service.logout(session.id)
+    assert service.get_session_user(session.id) is None
+    assert published == [SessionRevoked(session_id=session.id)]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = datetime(2024, 1, 1)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def _service_with_policy(
+    policy: SessionPolicy,
+) -> Tuple[AuthService, InMemorySessionRepo, FakeClock, List[SessionRevoked]]:
+    user_repo = InMemoryUserRepo()
+    session_repo = InMemorySessionRepo(user_repo)
+    clock = FakeClock()
+    published: List[SessionRevoked] = []
+    events = InProcessEventBus()
+    events.subscribe(SessionRevoked, published.append)
+    service = AuthService(
+        user_repo=user_repo,
+        session_repo=session_repo,
+        events=events,
+        session_policy=policy,
+        clock=clock,
+    )
+    service.register("dave", "password123")
+    return service, session_repo, clock, published
+
+
+def _login(service: AuthService, clock: FakeClock) -> Session:
+    session = service.authenticate("dave", "password123")
+    assert session is not None
+    session.created_at = clock.now
+    return session
+
+
+def test_idle_sessions_expire_and_activity_slides_the_window() -> None:
+    policy = SessionPolicy(idle_ttl=timedelta(hours=1), touch_interval=timedelta(minutes=5))
+    service, session_repo, clock, published = _service_with_policy(policy)
+    session = _login(service, clock)
+
+    clock.now += timedelta(minutes=50)
+    assert service.get_session_user(session.id) is not None
+    assert session_repo.sessions[session.id].last_seen_at == clock.now
+
+    clock.now += timedelta(minutes=50)
+    assert service.get_session(session.id) is not None
+
+    clock.now += timedelta(minutes=61)
+    assert service.get_session_user(session.id) is None
+    assert session.id not in session_repo.sessions
+    assert published == [SessionRevoked(session_id=session.id)]
+
+
+def test_recent_activity_is_not_rewritten_on_every_request() -> None:
+    policy = SessionPolicy(idle_ttl=timedelta(hours=1), touch_interval=timedelta(minutes=5))
+    service, session_repo, clock, _ = _service_with_policy(policy)
+    session = _login(service, clock)
+
+    clock.now += timedelta(minutes=1)
+    assert service.get_session(session.id) is not None
+    assert session_repo.sessions[session.id].last_seen_at is None
+
+
+def test_absolute_ttl_ends_even_active_sessions() -> None:
+    policy = SessionPolicy(absolute_ttl=timedelta(hours=2), idle_ttl=timedelta(hours=1))
+    service, _, clock, _ = _service_with_policy(policy)
+    session = _login(service, clock)
+
+    for _ in range(4):
+        clock.now += timedelta(minutes=30)
+        assert service.get_session(session.id) is not None
+    clock.now += timedelta(minutes=1)
+    assert service.get_session(session.id) is None
+
+
+def test_revoke_all_sessions_signs_user_out_everywhere() -> None:
+    service, session_repo, clock, published = _service_with_policy(SessionPolicy())
+    first = _login(service, clock)
+    second = _login(service, clock)
+    assert first.id != second.id
+
+    assert service.revoke_all_sessions(first.user_id) == 2
+    assert session_repo.sessions == {}
+    assert {event.session_id for event in published} == {first.id, second.id}
+
+
+class RecordingSessionRepo(InMemorySessionRepo):
+    """Writer over another repo's sessions that records what it wrote"""
+
+    def __init__(self, reader: InMemorySessionRepo) -> None:
+        super().__init__()
+        self.sessions = reader.sessions
+        self.writes: List[str] = []
+
+    def get_with_user(self, session_id: str) -> Optional[Tuple[Session, User]]:
+        raise AssertionError("lookups belong on the reader")
+
+    def touch(self, session_id: str, seen_at: datetime) -> None:
+        self.writes.append("touch")
+        super().touch(session_id, seen_at)
+
+    def delete(self, session_id: str) -> None:
+        self.writes.append("delete")
+        super().delete(session_id)
+
+
+def test_session_lookups_only_reach_the_writer_to_write() -> None:
+    policy = SessionPolicy(idle_ttl=timedelta(hours=1), touch_interval=timedelta(minutes=5))
+    user_repo = InMemoryUserRepo()
+    reader = InMemorySessionRepo(user_repo)
+    writer = RecordingSessionRepo(reader)
+    clock = FakeClock()
+    service = AuthService(
+        user_repo=user_repo,
+        session_repo=reader,
+        session_policy=policy,
+        clock=clock,
+        session_writer=writer,
+    )
+    service.register("erin", "password123")
+    session = service.authenticate("erin", "password123")
+    assert session is not None
+    session.created_at = clock.now
+
+    clock.now += timedelta(minutes=1)
+    assert service.get_session_user(session.id) is not None
+    assert writer.writes == []
+
+    clock.now += timedelta(minutes=10)
+    assert service.get_session_user(session.id) is not None
+    clock.now += timedelta(hours=2)
+    assert service.get_session_user(session.id) is None
+    assert writer.writes == ["touch", "delete"]
@@ -1,9 +1,11 @@
 """Unit tests for BlogService"""
-from typing import Optional, List, Dict
+import hashlib
+from typing import AsyncIterator, Iterator, Optional, List, Dict, Sequence
 import pytest
 
-from app.domain.entities import Post
+from app.domain.entities import Post, PostPage, SearchHit, SearchPage, StoredImage
 from app.domain.interfaces import PostRepository, ImageStorageService
+from app.domain.pagination import encode_cursor, decode_cursor
 from app.use_cases.blog_service import BlogService
 
 
@@ -20,9 +22,20 @@ class InMemoryPostRepo(PostRepository):
         self.posts[post.id] = post
         return post
 
+    def bulk_add(self, posts: Sequence[Post]) -> int:
+        for post in posts:
+            self.add(post)
+        return len(posts)
+
     def get_by_id(self, post_id: int) -> Optional[Post]:
         return self.posts.get(post_id)
 
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Post]:
+        return iter(sorted(self.posts.values(), key=lambda p: p.id))
+
+    def set_image_variants(self, post_id: int, variants: Dict[int, str]) -> None:
+        self.posts[post_id].image_variants = dict(variants)
+
     def list_recent(self, limit: int = 20) -> List[Post]:
         sorted_posts = sorted(
             self.posts.values(),
@@ -31,6 +44,29 @@ class InMemoryPostRepo(PostRepository):
         )
         return sorted_posts[:limit]
 
+    def list_page(self, after_cursor: Optional[str] = None, limit: int = 20) -> PostPage:
+        ordered = sorted(
+            self.posts.values(), key=lambda p: (p.created_at, p.id), reverse=True
+        )
+        if after_cursor is not None:
+            key = decode_cursor(after_cursor)
+            ordered = [p for p in ordered if (p.created_at, p.id) < key]
+        items = ordered[:limit]
+        next_cursor = None
+        if len(ordered) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return PostPage(items=items, next_cursor=next_cursor)
+
+    def search(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> SearchPage:
+        needle = query.lower()
+        hits = [
+            SearchHit(post=p, snippet=p.content)
+            for p in self.posts.values()
+            if needle and (needle in p.title.lower() or needle in p.content.lower())
+        ]
+        return SearchPage(hits=hits[:limit])
+
 
 class InMemoryImageStorage(ImageStorageService):
     """In-memory implementation of ImageStorageService for testing"""
@@ -44,6 +80,20 @@ class InMemoryImageStorage(ImageStorageService):
         self.images[path] = data
         return path
 
+    async def save_image_stream(
+        self, filename: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[StoredImage]:
+        """Collect the chunks and save them like save_image"""
+        data = b"".join([chunk async for chunk in chunks])
+        if not data:
+            return None
+        path = self.save_image(filename, data)
+        return StoredImage(path=path, size_bytes=len(data), sha256=hashlib.sha256(data).hexdigest())
+
+    def delete_image(self, path: str) -> None:
+        """Forget a saved image"""
+        self.images.pop(path, None)
+
 
 @pytest.fixture
 def post_repo() -> InMemoryPostRepo:
@@ -98,6 +148,24 @@ class TestBlogService:
         assert post.image_path == "test_photo.jpg"
         assert image_storage.images[post.image_path] == image_data
 
+    async def test_create_post_with_streamed_image(
+        self, blog_service: BlogService, image_storage: InMemoryImageStorage
+    ) -> None:
+        """Test storing an upload chunk by chunk, then attaching it to a post"""
+
+        async def chunks() -> AsyncIterator[bytes]:
+            yield b"fake_"
+            yield b"image"
+
+        stored = await blog_service.save_image_upload("photo.png", chunks())
+        assert stored is not None
+        post = blog_service.create_post(
+            author_id=1, title="Streamed", content="Content", image_path=stored.path
+        )
+
+        assert post.image_path == "test_photo.png"
+        assert image_storage.images[post.image_path] == b"fake_image"
+
     def test_create_post_with_filename_but_no_bytes(
         self, blog_service: BlogService
     ) -> None:
@@ -134,6 +202,30 @@ class TestBlogService:
         posts = blog_service.list_recent_posts(limit=3)
         assert len(posts) == 3
 
+    def test_list_posts_page_walks_all_posts(self, blog_service: BlogService) -> None:
+        """Test following next_cursor visits every post exactly once"""
+        for i in range(7):
+            blog_service.create_post(
+                author_id=1, title=f"Post {i}", content=f"Content {i}"
+            )
+
+        seen = []
+        page = blog_service.list_posts_page(limit=3)
+        seen.extend(p.id for p in page.items)
+        while page.next_cursor:
+            page = blog_service.list_posts_page(after_cursor=page.next_cursor, limit=3)
+            seen.extend(p.id for p in page.items)
+
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+
+    def test_list_posts_page_rejects_garbage_cursor(
+        self, blog_service: BlogService
+    ) -> None:
+        """Test that a tampered cursor is reported as a ValueError"""
+        with pytest.raises(ValueError):
+            blog_service.list_posts_page(after_cursor="not-a-cursor")
+
     def test_get_existing_post(self, blog_service: BlogService) -> None:
         """Test retrieving an existing post"""
         created_post = blog_service.create_post(
@@ -0,0 +1,211 @@
+"""Tests for the change bus shared by workers through change_log"""
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Generator, List
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+
+from app.config import Settings
+from app.domain.entities import Post
+from app.domain.events import ImageVariantsReady, PostCreated, SessionRevoked
+from app.infrastructure.change_bus import SqliteChangeBus
+from app.infrastructure.db import create_sqlite_engine
+from app.infrastructure.models import ChangeLogModel
+from app.infrastructure.schema import ensure_schema
+from app.infrastructure.sql_instrumentation import query_budget
+
+POST = Post(
+    id=7,
+    author_id=1,
+    title="Hello",
+    content="World",
+    image_path="a.png",
+    created_at=datetime(2024, 5, 1, 12, 30),
+    image_variants={320: "a-320.webp"},
+    author_username="alice",
+)
+
+
+@pytest.fixture
+def engine(tmp_path: Path) -> Generator[Engine, None, None]:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}", Settings())
+    ensure_schema(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def make_bus(engine: Engine) -> Generator[Callable[..., SqliteChangeBus], None, None]:
+    """Buses standing in for workers; their threads only wake on publish"""
+    buses: List[SqliteChangeBus] = []
+
+    def make(poll_seconds: float = 3600.0, **kwargs: Any) -> SqliteChangeBus:
+        bus = SqliteChangeBus(lambda: engine, poll_seconds=poll_seconds, **kwargs)
+        buses.append(bus)
+        return bus
+
+    yield make
+    for bus in buses:
+        bus.stop()
+
+
+def _rows(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(ChangeLogModel)).scalar()
+
+
+def test_events_reach_cross_worker_subscribers_elsewhere(
+    make_bus: Callable[..., SqliteChangeBus]
+) -> None:
+    """Every worker's local handlers run; only opted-in ones hear other workers"""
+    sender, receiver = make_bus(), make_bus()
+    sent_local: List[object] = []
+    sent_remote: List[object] = []
+    received: List[object] = []
+    received_local_only: List[object] = []
+    sender.subscribe(PostCreated, sent_local.append)
+    sender.subscribe(PostCreated, sent_remote.append, cross_worker=True)
+    receiver.subscribe(PostCreated, received.append, cross_worker=True)
+    receiver.subscribe(PostCreated, received_local_only.append)
+    sender.start()
+    receiver.start()
+
+    sender.publish(PostCreated.of(POST))
+    assert [event.post for event in sent_local] == [POST]
+
+    assert sender.poll() == 0
+    assert receiver.poll() == 1
+    assert received == [PostCreated(post_id=7, created_at=datetime(2024, 5, 1, 12, 30))]
+    assert received_local_only == []
+    assert [event.post for event in sent_remote] == [POST]
+
+
+def test_new_posts_are_shared_without_their_content(
+    engine: Engine, make_bus: Callable[..., SqliteChangeBus]
+) -> None:
+    """change_log holds a new post's id and time, and other workers get no post"""
+    sender, receiver = make_bus(), make_bus()
+    received: List[PostCreated] = []
+    receiver.subscribe(PostCreated, received.append, cross_worker=True)
+    sender.start()
+    receiver.start()
+
+    sender.publish(PostCreated.of(POST))
+    sender.poll()
+    receiver.poll()
+
+    with engine.connect() as conn:
+        payload = conn.execute(select(ChangeLogModel.payload)).scalar_one()
+    assert payload == {"post_id": 7, "created_at": "2024-05-01T12:30:00"}
+    assert [event.post for event in received] == [None]
+
+
+def test_every_shared_kind_round_trips(make_bus: Callable[..., SqliteChangeBus]) -> None:
+    sender, receiver = make_bus(), make_bus()
+    received: List[object] = []
+    for event_type in (SessionRevoked, ImageVariantsReady):
+        receiver.subscribe(event_type, received.append, cross_worker=True)
+    sender.start()
+    receiver.start()
+
+    events = [
+        SessionRevoked(session_id="abc"),
+        ImageVariantsReady(post_id=7, variants={640: "x.webp"}),
+    ]
+    for event in events:
+        sender.publish(event)
+    sender.poll()
+    receiver.poll()
+
+    assert received == events
+
+
+def test_idle_poll_is_one_pragma(make_bus: Callable[..., SqliteChangeBus]) -> None:
+    """Without commits from other connections change_log is not read"""
+    bus = make_bus()
+    bus.start()
+
+    with query_budget(1):
+        assert bus.poll() == 0
+
+
+def test_only_events_after_start_are_delivered(
+    engine: Engine, make_bus: Callable[..., SqliteChangeBus]
+) -> None:
+    """Rows from before a worker started, or of unknown kinds, are skipped"""
+    with engine.begin() as conn:
+        conn.execute(
+            insert(ChangeLogModel),
+            [{"kind": "session_revoked", "payload": {"session_id": "old"}, "origin": "gone"}],
+        )
+    receiver = make_bus()
+    received: List[object] = []
+    receiver.subscribe(SessionRevoked, received.append, cross_worker=True)
+    receiver.start()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(ChangeLogModel),
+            [
+                {"kind": "from_a_newer_build", "payload": {}, "origin": "other"},
+                {"kind": "session_revoked", "payload": {"session_id": "new"}, "origin": "other"},
+            ],
+        )
+
+    assert receiver.poll() == 1
+    assert received == [SessionRevoked(session_id="new")]
+
+
+def test_unstarted_bus_keeps_events_local(
+    engine: Engine, make_bus: Callable[..., SqliteChangeBus]
+) -> None:
+    bus = make_bus()
+    received: List[object] = []
+    bus.subscribe(SessionRevoked, received.append)
+
+    bus.publish(SessionRevoked(session_id="abc"))
+
+    assert received == [SessionRevoked(session_id="abc")]
+    assert _rows(engine) == 0
+
+
+def test_background_thread_delivers_and_stop_flushes(
+    engine: Engine, make_bus: Callable[..., SqliteChangeBus]
+) -> None:
+    sender, receiver = make_bus(poll_seconds=0.01), make_bus(poll_seconds=0.01)
+    received: List[object] = []
+    receiver.subscribe(SessionRevoked, received.append, cross_worker=True)
+    sender.start()
+    receiver.start()
+
+    sender.publish(SessionRevoked(session_id="abc"))
+    deadline = time.monotonic() + 5
+    while not received and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert received == [SessionRevoked(session_id="abc")]
+
+    sender.publish(SessionRevoked(session_id="def"))
+    sender.stop()
+    assert _rows(engine) == 2
+
+
+def test_prune_drops_rows_past_retention(
+    engine: Engine, make_bus: Callable[..., SqliteChangeBus]
+) -> None:
+    now = datetime(2024, 5, 1, 12, 0)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(ChangeLogModel),
+            [
+                {"kind": "session_revoked", "payload": {}, "origin": "x", "created_at": created_at}
+                for created_at in (now - timedelta(hours=2), now)
+            ],
+        )
+    bus = make_bus(retention_seconds=3600.0, clock=lambda: now)
+
+    assert bus.prune() == 1
+    assert _rows(engine) == 1
@@ -0,0 +1,97 @@
+"""Tests for the SQLite engine profile"""
+import threading
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.infrastructure.db import (
+    create_async_sqlite_engine,
+    create_sqlite_engine,
+    sqlite_pragmas,
+)
+
+
+def _pragma(engine: Engine, name: str) -> Any:
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_connections_get_the_configured_pragmas(tmp_path: Path) -> None:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}", Settings())
+    try:
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1  # NORMAL
+        assert _pragma(engine, "busy_timeout") == 5000
+        assert _pragma(engine, "cache_size") == -32_000
+        assert _pragma(engine, "temp_store") == 2  # MEMORY
+    finally:
+        engine.dispose()
+
+
+async def test_async_engine_gets_the_same_pragmas(tmp_path: Path) -> None:
+    settings = Settings(db_busy_timeout_ms=1234)
+    engine = create_async_sqlite_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'blog.sqlite3'}", settings
+    )
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 1234
+    finally:
+        await engine.dispose()
+
+
+def test_read_engine_refuses_writes(tmp_path: Path) -> None:
+    url = f"sqlite:///{tmp_path / 'blog.sqlite3'}"
+    writer = create_sqlite_engine(url, Settings())
+    reader = create_sqlite_engine(url, Settings(), read_only=True)
+    try:
+        with writer.begin() as conn:
+            conn.execute(text("CREATE TABLE notes (body TEXT)"))
+            conn.execute(text("INSERT INTO notes VALUES ('hello')"))
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT body FROM notes")).scalar() == "hello"
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO notes VALUES ('nope')"))
+    finally:
+        reader.dispose()
+        writer.dispose()
+
+
+def test_concurrent_writers_wait_instead_of_failing(tmp_path: Path) -> None:
+    engine = create_sqlite_engine(
+        f"sqlite:///{tmp_path / 'blog.sqlite3'}", Settings(db_pool_size=2)
+    )
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (n INTEGER)"))
+    errors: List[BaseException] = []
+
+    def write(worker: int) -> None:
+        try:
+            for i in range(25):
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO counter VALUES (:n)"), {"n": worker * 100 + i})
+        except BaseException as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert errors == []
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM counter")).scalar() == 200
+    finally:
+        engine.dispose()
+
+
+def test_unknown_pragma_values_are_rejected() -> None:
+    with pytest.raises(ValueError):
+        sqlite_pragmas(Settings(db_journal_mode="wal; DROP TABLE posts"))
@@ -0,0 +1,70 @@
+"""Tests for Atom and RSS feed serialization"""
+from datetime import datetime
+from typing import List
+from xml.etree import ElementTree as ET
+
+from app.api.feeds import ATOM_NS, render_feed
+from app.domain.entities import Post
+
+A = f"{{{ATOM_NS}}}"
+
+
+def _posts() -> List[Post]:
+    return [
+        Post(
+            id=i,
+            author_id=1,
+            title=f"Post {i} <&>",
+            content="Body with <html> & entities",
+            created_at=datetime(2024, 1, i, 8, 30),
+            author_username="writer",
+        )
+        for i in (2, 1)
+    ]
+
+
+def test_atom_page_links_to_the_next_one() -> None:
+    """Entries are escaped text and rel="next" carries the cursor"""
+    feed = render_feed("atom", _posts(), "https://blog.example/", None, "abc")
+    root = ET.fromstring(feed.body)
+
+    assert root.tag == f"{A}feed"
+    links = {link.get("rel"): link.get("href") for link in root.findall(f"{A}link")}
+    assert links["self"] == "https://blog.example/feed.xml"
+    assert links["next"] == "https://blog.example/feed.xml?cursor=abc"
+    assert root.findtext(f"{A}updated") == "2024-01-02T08:30:00Z"
+    entries = root.findall(f"{A}entry")
+    assert [e.findtext(f"{A}title") for e in entries] == ["Post 2 <&>", "Post 1 <&>"]
+    assert entries[0].findtext(f"{A}id") == "https://blog.example/posts/2"
+    assert entries[0].findtext(f"{A}author/{A}name") == "writer"
+    assert entries[0].findtext(f"{A}content") == "Body with <html> & entities"
+
+
+def test_last_page_has_no_next_link() -> None:
+    feed = render_feed("atom", [], "https://blog.example/", "abc", None)
+    root = ET.fromstring(feed.body)
+
+    assert [link.get("rel") for link in root.findall(f"{A}link")] == ["self", "alternate"]
+
+
+def test_rss_uses_atom_links_for_paging() -> None:
+    """RSS items carry permalinks and the channel an atom:link next page"""
+    feed = render_feed("rss", _posts(), "https://blog.example/", "abc", "def")
+    channel = ET.fromstring(feed.body).find("channel")
+
+    assert channel is not None
+    assert feed.media_type == "application/rss+xml"
+    links = {link.get("rel"): link.get("href") for link in channel.findall(f"{A}link")}
+    assert links["self"] == "https://blog.example/feed.xml?format=rss&cursor=abc"
+    assert links["next"] == "https://blog.example/feed.xml?format=rss&cursor=def"
+    item = channel.findall("item")[0]
+    assert item.findtext("guid") == "https://blog.example/posts/2"
+    assert item.findtext("pubDate") == "Tue, 02 Jan 2024 08:30:00 GMT"
+
+
+def test_etag_follows_the_content() -> None:
+    posts = _posts()
+    same = render_feed("atom", posts, "https://blog.example/", None, None)
+
+    assert same.etag == render_feed("atom", posts, "https://blog.example/", None, None).etag
+    assert same.etag != render_feed("atom", posts[1:], "https://blog.example/", None, None).etag
@@ -0,0 +1,64 @@
+"""Tests for the responsive image variant pipeline"""
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+from app.infrastructure.image_variants import (
+    ImageVariantPipeline,
+    is_variant_path,
+    render_variants,
+    variant_path,
+)
+
+
+def _write_png(path: Path, size: Tuple[int, int]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, (200, 40, 90)).save(path, "PNG")
+
+
+def test_variants_are_width_bounded_webp(tmp_path: Path) -> None:
+    _write_png(tmp_path / "ab" / "photo.png", (1000, 500))
+
+    variants = render_variants(str(tmp_path), "ab/photo.png", (320, 640, 1280))
+
+    assert variants == {
+        320: "ab/photo.w320.webp",
+        640: "ab/photo.w640.webp",
+        1000: "ab/photo.w1000.webp",
+    }
+    with Image.open(tmp_path / variants[320]) as small:
+        assert small.format == "WEBP"
+        assert small.size == (320, 160)
+    assert all(is_variant_path(path) for path in variants.values())
+    assert not is_variant_path("ab/photo.png")
+
+
+def test_small_images_get_one_reencoded_copy(tmp_path: Path) -> None:
+    _write_png(tmp_path / "icon.png", (100, 100))
+
+    assert render_variants(str(tmp_path), "icon.png", (320, 640)) == {
+        100: variant_path("icon.png", 100)
+    }
+
+
+def test_pipeline_reports_finished_variants(tmp_path: Path) -> None:
+    _write_png(tmp_path / "photo.png", (800, 600))
+    (tmp_path / "notes.png").write_bytes(b"not really an image")
+    ready: List[Tuple[int, Dict[int, str]]] = []
+    done = threading.Event()
+
+    def on_ready(post_id: int, variants: Dict[int, str]) -> None:
+        ready.append((post_id, variants))
+        done.set()
+
+    pipeline = ImageVariantPipeline(on_ready, widths=(320,), workers=1)
+    try:
+        pipeline.submit(tmp_path, 7, "notes.png").exception(timeout=30)
+        pipeline.submit(tmp_path, 8, "photo.png").result(timeout=30)
+        assert done.wait(timeout=5)
+    finally:
+        pipeline.shutdown()
+
+    assert ready == [(8, {320: "photo.w320.webp"})]
@@ -0,0 +1,83 @@
+"""Tests for the metrics registry and request metrics middleware"""
+from typing import Dict
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.api.request_metrics import UNMATCHED, HttpMetrics, RequestMetricsMiddleware
+from app.infrastructure.metrics import MetricsRegistry
+
+
+def _samples(text: str) -> Dict[str, str]:
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#")
+    )
+
+
+class TestMetricsRegistry:
+    def test_renders_counters_and_gauges(self) -> None:
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests.", ["path"])
+        in_flight = registry.gauge("in_flight", "In flight.")
+        requests.inc('/a"b')
+        requests.inc('/a"b', amount=2)
+        in_flight.add(3)
+        in_flight.add(-1)
+
+        text = registry.render()
+
+        assert "# TYPE requests_total counter" in text
+        assert _samples(text) == {'requests_total{path="/a\\"b"}': "3", "in_flight": "2"}
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, "/")
+
+        samples = _samples(registry.render())
+
+        assert samples['latency_seconds_bucket{route="/",le="0.1"}'] == "2"
+        assert samples['latency_seconds_bucket{route="/",le="1"}'] == "3"
+        assert samples['latency_seconds_bucket{route="/",le="+Inf"}'] == "4"
+        assert samples['latency_seconds_count{route="/"}'] == "4"
+        assert samples['latency_seconds_sum{route="/"}'] == "3.65"
+
+    def test_rejects_duplicate_names(self) -> None:
+        registry = MetricsRegistry()
+        registry.gauge("up", "Up.")
+        with pytest.raises(ValueError):
+            registry.counter("up", "Up again.")
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template() -> None:
+    registry = MetricsRegistry()
+    app = FastAPI()
+    files = FastAPI()
+    app.mount("/files", files)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    @files.get("/{name}")
+    async def file(name: str) -> PlainTextResponse:
+        return PlainTextResponse(name)
+
+    app.add_middleware(RequestMetricsMiddleware, metrics=HttpMetrics(registry))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/nowhere")
+        await client.get("/files/a.css")
+
+    samples = _samples(registry.render())
+    assert samples['blog_http_requests_total{method="GET",route="/items/{item_id}",status="200"}'] == "2"
+    assert samples[f'blog_http_requests_total{{method="GET",route="{UNMATCHED}",status="404"}}'] == "1"
+    assert samples['blog_http_requests_total{method="GET",route="/files/{name}",status="200"}'] == "1"
+    assert samples['blog_http_request_duration_seconds_count{method="GET",route="/items/{item_id}"}'] == "2"
+    assert samples["blog_http_requests_in_flight"] == "0"
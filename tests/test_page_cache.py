@@ -0,0 +1,123 @@
+"""Unit tests for the rendered page cache"""
+import asyncio
+from typing import List
+
+import pytest
+
+from app.api.page_cache import HIT, MISS, STALE, PageCache, viewer_key
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingRenderer:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return f"render #{self.calls}"
+
+
+@pytest.mark.asyncio
+class TestPageCache:
+    """Test cases for PageCache"""
+
+    async def test_second_request_is_a_hit(self) -> None:
+        cache = PageCache()
+        render = CountingRenderer()
+
+        first = await cache.get_or_render("anon|", render)
+        second = await cache.get_or_render("anon|", render)
+
+        assert first == ("render #1", MISS)
+        assert second == ("render #1", HIT)
+        assert render.calls == 1
+        stats = cache.stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+
+    async def test_entries_expire_after_ttl(self) -> None:
+        clock = FakeClock()
+        cache = PageCache(ttl_seconds=10, clock=clock)
+        render = CountingRenderer()
+
+        await cache.get_or_render("anon|", render)
+        clock.now = 11
+        body, status = await cache.get_or_render("anon|", render)
+
+        assert (body, status) == ("render #2", MISS)
+
+    async def test_invalidate_forces_rerender(self) -> None:
+        cache = PageCache()
+        render = CountingRenderer()
+
+        await cache.get_or_render("anon|", render)
+        cache.invalidate()
+        body, status = await cache.get_or_render("anon|", render)
+
+        assert (body, status) == ("render #2", MISS)
+        assert cache.stats().invalidations == 1
+
+    async def test_least_recently_used_entry_is_evicted(self) -> None:
+        cache = PageCache(max_entries=2)
+        render = CountingRenderer()
+
+        await cache.get_or_render("a", render)
+        await cache.get_or_render("b", render)
+        await cache.get_or_render("a", render)
+        await cache.get_or_render("c", render)
+
+        assert cache.stats().evictions == 1
+        assert (await cache.get_or_render("a", render))[1] == HIT
+        assert (await cache.get_or_render("b", render))[1] == MISS
+
+    async def test_concurrent_misses_share_one_render(self) -> None:
+        cache = PageCache()
+        render = CountingRenderer(delay=0.01)
+
+        results = await asyncio.gather(
+            *(cache.get_or_render("anon|", render) for _ in range(10))
+        )
+
+        assert render.calls == 1
+        assert {body for body, _ in results} == {"render #1"}
+
+    async def test_stale_while_revalidate_serves_old_page_once_refreshed(self) -> None:
+        cache = PageCache(stale_seconds=30)
+        render = CountingRenderer()
+        await cache.get_or_render("anon|", render)
+        cache.invalidate()
+
+        statuses: List[str] = []
+        for _ in range(5):
+            body, status = await cache.get_or_render("anon|", render)
+            assert body == "render #1"
+            statuses.append(status)
+        await asyncio.sleep(0)
+
+        assert statuses == [STALE] * 5
+        assert render.calls == 2
+        assert await cache.get_or_render("anon|", render) == ("render #2", HIT)
+
+    async def test_failed_render_is_not_cached(self) -> None:
+        cache = PageCache()
+
+        async def boom() -> str:
+            raise ValueError("bad cursor")
+
+        with pytest.raises(ValueError):
+            await cache.get_or_render("anon|x", boom)
+        assert cache.stats().size == 0
+
+
+def test_viewer_key_separates_anonymous_and_users() -> None:
+    assert viewer_key(None) == "anon"
+    assert viewer_key("alice") == "user:alice"
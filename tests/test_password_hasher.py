@@ -0,0 +1,81 @@
+"""Tests for the pooled password hasher"""
+import threading
+
+import pytest
+
+from app.domain.interfaces import PasswordHasher, PasswordHasherBusy
+from app.infrastructure.hashing_pool import PooledPasswordHasher
+from app.use_cases.auth_service import BcryptPasswordHasher
+
+
+class BlockingHasher(PasswordHasher):
+    """Hasher whose calls wait until released, to hold pool slots open"""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def hash(self, password: str) -> str:
+        self.release.wait(timeout=5)
+        return f"hashed:{password}"
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        self.release.wait(timeout=5)
+        return password_hash == f"hashed:{password}"
+
+    async def hash_async(self, password: str) -> str:
+        raise NotImplementedError
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        raise NotImplementedError
+
+
+def test_pooled_hasher_round_trips_with_bcrypt() -> None:
+    hasher = PooledPasswordHasher(BcryptPasswordHasher(), workers=1, queue_size=1)
+    try:
+        password_hash = hasher.hash("s3cret")
+        assert password_hash.startswith("$2")
+        assert hasher.verify("s3cret", password_hash)
+        assert not hasher.verify("wrong", password_hash)
+        stats = hasher.stats()
+        assert stats.completed == 3
+        assert stats.in_flight == 0
+        assert stats.latency_count == 3
+        assert stats.latency_max_seconds > 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pooled_hasher_async_variants() -> None:
+    hasher = PooledPasswordHasher(BcryptPasswordHasher(), workers=1, queue_size=0)
+    try:
+        password_hash = await hasher.hash_async("s3cret")
+        assert await hasher.verify_async("s3cret", password_hash)
+    finally:
+        hasher.shutdown()
+
+
+def test_saturated_pool_rejects_immediately() -> None:
+    inner = BlockingHasher()
+    hasher = PooledPasswordHasher(inner, workers=1, queue_size=1)
+    try:
+        futures = [hasher._submit(inner.hash, f"pw{i}") for i in range(2)]
+        stats = hasher.stats()
+        assert stats.in_flight == 2
+        assert stats.queue_depth == 1
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("one too many")
+        assert hasher.stats().rejected == 1
+
+        inner.release.set()
+        assert [f.result(timeout=5) for f in futures] == ["hashed:pw0", "hashed:pw1"]
+        assert hasher.hash("again") == "hashed:again"
+    finally:
+        inner.release.set()
+        hasher.shutdown()
+
+
+def test_unknown_pool_kind_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        PooledPasswordHasher(BcryptPasswordHasher(), kind="fibers")
@@ -0,0 +1,65 @@
+"""Tests for the streamed post export"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List
+
+from app.domain.entities import Post
+from app.use_cases.post_export import export_posts, export_posts_async
+from app.use_cases.post_import import read_post_records
+
+
+def _posts(count: int) -> List[Post]:
+    return [
+        Post(
+            id=i,
+            author_id=7,
+            title=f"Post {i}",
+            content="Grüße, \"quoted\"\nand a second line " * 20,
+            created_at=datetime(2020, 1, 1, 12, 30),
+            image_path="ab/cd/abcd.png" if i % 2 else None,
+            author_username="olduser",
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def test_jsonl_export_reads_back_as_import_records() -> None:
+    """An export is valid importer input with the same fields"""
+    data = b"".join(export_posts(_posts(3), "jsonl"))
+
+    records = list(read_post_records(io.StringIO(data.decode()), "jsonl"))
+
+    assert [r["title"] for r in records] == ["Post 1", "Post 2", "Post 3"]
+    assert records[0]["author"] == "olduser"
+    assert records[0]["created_at"] == "2020-01-01T12:30:00Z"
+    assert records[0]["image"] == "ab/cd/abcd.png"
+    assert records[1]["image"] is None
+
+
+def test_large_export_is_chunked_and_gzipped_csv_round_trips() -> None:
+    """Output arrives in several chunks that decompress to the whole CSV"""
+    posts = _posts(500)
+
+    chunks = list(export_posts(posts, "csv", compress=True))
+
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(b"".join(chunks)).decode())))
+    assert len(rows) == 500
+    assert rows[0]["content"] == posts[0].content
+    assert rows[1]["image"] == ""
+
+
+async def test_async_export_matches_sync() -> None:
+    posts = _posts(50)
+
+    async def stream() -> AsyncIterator[Post]:
+        for post in posts:
+            yield post
+
+    chunks = [chunk async for chunk in export_posts_async(stream(), "jsonl")]
+
+    assert b"".join(chunks) == b"".join(export_posts(posts, "jsonl"))
+    assert json.loads(b"".join(chunks).splitlines()[-1])["id"] == 50
@@ -0,0 +1,221 @@
+"""Tests for the bulk post importer"""
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Generator, List, Tuple
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.entities import Post
+from app.infrastructure.db import Base
+from app.infrastructure.models import UserModel
+from app.infrastructure.repositories import SqlAlchemyPostRepository, SqlAlchemyUserRepository
+from app.infrastructure.search import ensure_search_index
+from app.infrastructure.storage_local import LocalImageStorage
+from app.use_cases.post_import import (
+    ImportCheckpoint,
+    PostImportError,
+    PostImportReport,
+    PostImportService,
+    read_post_records,
+)
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db() -> Generator[Session, None, None]:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(UserModel(id=7, username="olduser", password_hash="x"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _service(db: Session, tmp_path: Path, batch_size: int = 2) -> PostImportService:
+    return PostImportService(
+        SqlAlchemyPostRepository(db),
+        SqlAlchemyUserRepository(db),
+        LocalImageStorage(tmp_path / "uploads"),
+        image_dir=tmp_path / "export",
+        batch_size=batch_size,
+        clock=lambda: NOW,
+    )
+
+
+def _jsonl(*records: dict) -> io.StringIO:
+    return io.StringIO("".join(json.dumps(record) + "\n" for record in records))
+
+
+class TestReadPostRecords:
+    """Streaming parsers for the two input formats"""
+
+    def test_jsonl_skips_blank_lines_and_resumes(self) -> None:
+        """Skipped records are counted but not parsed"""
+        source = io.StringIO('{"title": "a"}\n\nnot json at all\n{"title": "c"}\n')
+
+        assert list(read_post_records(source, "jsonl", skip=2)) == [{"title": "c"}]
+
+    def test_jsonl_errors_name_the_record(self) -> None:
+        """A malformed line is reported by its record number"""
+        source = io.StringIO('{"title": "a"}\n[1, 2]\n')
+
+        with pytest.raises(PostImportError, match="Record 2"):
+            list(read_post_records(source, "jsonl"))
+
+    def test_csv_uses_the_header_and_quoted_newlines(self) -> None:
+        """Multi-line CSV fields count as one record"""
+        source = io.StringIO('title,content\nFirst,"two\nlines"\nSecond,plain\n')
+
+        records = list(read_post_records(source, "csv", skip=1))
+
+        assert records == [{"title": "Second", "content": "plain"}]
+        source.seek(0)
+        assert next(read_post_records(source, "csv"))["content"] == "two\nlines"
+
+    def test_unknown_format_is_rejected(self) -> None:
+        with pytest.raises(ValueError, match="xml"):
+            list(read_post_records(io.StringIO(""), "xml"))
+
+
+class TestPostImportService:
+    """Batched inserts, image copies and progress reporting"""
+
+    def test_imports_in_batches_with_original_timestamps(
+        self, db: Session, tmp_path: Path
+    ) -> None:
+        """Every batch is committed and reported; authors resolve by name or id"""
+        records = _jsonl(
+            {"author": "olduser", "title": "One", "content": "c", "created_at": "2015-03-01 10:00Z"},
+            {"author_id": 7, "title": "Two", "content": "c", "created_at": "2015-03-02T10:00+02:00"},
+            {"author": "olduser", "title": "Three", "content": "c"},
+        )
+        progress: List[Tuple[int, PostImportReport]] = []
+
+        report = _service(db, tmp_path).run(
+            read_post_records(records, "jsonl"), on_batch=lambda n, r: progress.append((n, r))
+        )
+
+        assert report.posts_added == 3
+        assert [n for n, _ in progress] == [2, 3]
+        assert [r.posts_added for _, r in progress] == [2, 3]
+        posts = {p.title: p for p in SqlAlchemyPostRepository(db).list_recent()}
+        assert posts["One"].created_at == datetime(2015, 3, 1, 10, 0)
+        assert posts["Two"].created_at == datetime(2015, 3, 2, 8, 0)
+        assert posts["Three"].created_at == NOW
+        assert {p.author_username for p in posts.values()} == {"olduser"}
+
+    def test_copies_images_into_storage(self, db: Session, tmp_path: Path) -> None:
+        """Image paths are read under image_dir and replaced by stored paths"""
+        (tmp_path / "export" / "img").mkdir(parents=True)
+        (tmp_path / "export" / "img" / "cat.png").write_bytes(b"meow")
+        records = _jsonl(
+            *(
+                {"author": "olduser", "title": f"Cat {i}", "content": "c", "image": "img/cat.png"}
+                for i in range(3)
+            )
+        )
+
+        report = _service(db, tmp_path, batch_size=10).run(read_post_records(records, "jsonl"))
+
+        assert report.images_copied == 3
+        stored = [p.image_path for p in SqlAlchemyPostRepository(db).list_recent()]
+        assert len(set(stored)) == 3
+        for path in stored:
+            assert path is not None
+            assert (tmp_path / "uploads" / path).read_bytes() == b"meow"
+
+    def test_bad_record_stops_after_committed_batches(
+        self, db: Session, tmp_path: Path
+    ) -> None:
+        """Earlier batches stay; the error names the record to fix"""
+        records = _jsonl(
+            {"author": "olduser", "title": "One", "content": "c"},
+            {"author": "olduser", "title": "Two", "content": "c"},
+            {"author": "olduser", "title": "Three", "content": "c"},
+            {"author": "nobody", "title": "Four", "content": "c"},
+        )
+
+        with pytest.raises(PostImportError, match="Record 4: no user named 'nobody'"):
+            _service(db, tmp_path).run(read_post_records(records, "jsonl"))
+
+        assert sorted(p.title for p in SqlAlchemyPostRepository(db).list_recent()) == [
+            "One",
+            "Two",
+        ]
+
+    def test_missing_image_names_the_record(self, db: Session, tmp_path: Path) -> None:
+        records = _jsonl({"author": "olduser", "title": "T", "content": "c", "image": "gone.png"})
+
+        with pytest.raises(PostImportError, match="Record 5: can't read image 'gone.png'"):
+            _service(db, tmp_path).run(read_post_records(records, "jsonl"), first_record=5)
+
+    @pytest.mark.parametrize("image", ["/etc/hostname", "../secret.txt", "img/../../secret.txt"])
+    def test_images_outside_the_image_directory_are_refused(
+        self, db: Session, tmp_path: Path, image: str
+    ) -> None:
+        """Test that a record can't copy any readable file into public uploads"""
+        (tmp_path / "export").mkdir()
+        (tmp_path / "secret.txt").write_text("not for the web")
+        records = _jsonl({"author": "olduser", "title": "T", "content": "c", "image": image})
+
+        with pytest.raises(PostImportError, match="outside the image directory"):
+            _service(db, tmp_path).run(read_post_records(records, "jsonl"))
+
+        assert list((tmp_path / "uploads").iterdir()) == []
+
+    def test_failed_batch_removes_the_images_it_stored(
+        self, db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that images of a batch that isn't inserted don't stay in uploads"""
+        (tmp_path / "export").mkdir()
+        (tmp_path / "export" / "cat.png").write_bytes(b"meow")
+        records = [
+            {"author": "olduser", "title": f"Cat {i}", "content": "c", "image": "cat.png"}
+            for i in range(2)
+        ]
+        service = _service(db, tmp_path, batch_size=10)
+
+        with pytest.raises(PostImportError, match="Record 3: can't read image 'gone.png'"):
+            service.run(records + [{**records[0], "image": "gone.png"}])
+        assert list((tmp_path / "uploads").iterdir()) == []
+
+        def insert_fails(repo: SqlAlchemyPostRepository, posts: List[Post]) -> int:
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(SqlAlchemyPostRepository, "bulk_add", insert_fails)
+        with pytest.raises(RuntimeError):
+            service.run(records)
+        assert list((tmp_path / "uploads").iterdir()) == []
+
+
+class TestImportCheckpoint:
+    """Resume position stored next to the input"""
+
+    def test_round_trip_and_missing_file(self, tmp_path: Path) -> None:
+        checkpoint = ImportCheckpoint(tmp_path / "posts.jsonl.checkpoint", "/data/posts.jsonl")
+        assert checkpoint.load() == 0
+
+        checkpoint.save(5000)
+
+        assert checkpoint.load() == 5000
+        assert [p.name for p in tmp_path.iterdir()] == ["posts.jsonl.checkpoint"]
+
+    def test_refuses_another_inputs_checkpoint(self, tmp_path: Path) -> None:
+        path = tmp_path / "progress"
+        ImportCheckpoint(path, "/data/a.jsonl").save(10)
+
+        with pytest.raises(ValueError, match="a.jsonl"):
+            ImportCheckpoint(path, "/data/b.jsonl").load()
@@ -0,0 +1,402 @@
+"""Tests for the SQLAlchemy repositories against an in-memory database"""
+from datetime import datetime, timedelta
+from typing import Generator, Iterator, List, Optional
+
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.entities import Post
+from app.domain.search import HIGHLIGHT_END, HIGHLIGHT_START
+from app.domain.sessions import SessionPolicy
+from app.infrastructure.db import Base
+from app.infrastructure import repositories
+from app.infrastructure.models import PostModel, SessionModel, UserModel
+from app.infrastructure.repositories import SqlAlchemyPostRepository, SqlAlchemySessionRepository
+from app.infrastructure.session_reaper import SessionReaper
+from app.infrastructure.ttl_cache import TTLCache
+from app.infrastructure.search import ensure_search_index
+
+
+@pytest.fixture
+def db() -> Generator[Session, None, None]:
+    """Fresh in-memory SQLite database with the app schema"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(UserModel(id=1, username="author", password_hash="x"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+class TestPostRepositoryPaging:
+    """Keyset pagination over the posts table"""
+
+    def test_list_page_breaks_created_at_ties_by_id(self, db: Session) -> None:
+        """Posts sharing a timestamp are neither skipped nor repeated"""
+        same_instant = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(5):
+            db.add(
+                PostModel(
+                    author_id=1,
+                    title=f"Post {i}",
+                    content="...",
+                    created_at=same_instant,
+                )
+            )
+        db.commit()
+        repo = SqlAlchemyPostRepository(db)
+
+        first = repo.list_page(limit=2)
+        second = repo.list_page(after_cursor=first.next_cursor, limit=2)
+        third = repo.list_page(after_cursor=second.next_cursor, limit=2)
+
+        ids = [p.id for page in (first, second, third) for p in page.items]
+        assert ids == [5, 4, 3, 2, 1]
+        assert third.next_cursor is None
+
+    def test_list_page_is_newest_first(self, db: Session) -> None:
+        """Pages are ordered by created_at descending"""
+        for day in (3, 1, 2):
+            db.add(
+                PostModel(
+                    author_id=1,
+                    title=f"Day {day}",
+                    content="...",
+                    created_at=datetime(2024, 1, day),
+                )
+            )
+        db.commit()
+        repo = SqlAlchemyPostRepository(db)
+
+        page = repo.list_page(limit=10)
+
+        assert [p.title for p in page.items] == ["Day 3", "Day 2", "Day 1"]
+        assert page.next_cursor is None
+
+    def test_list_page_rejects_invalid_cursor(self, db: Session) -> None:
+        """A malformed cursor surfaces as ValueError"""
+        repo = SqlAlchemyPostRepository(db)
+        with pytest.raises(ValueError):
+            repo.list_page(after_cursor="%%%")
+
+
+@pytest.fixture
+def statements(db: Session) -> Iterator[List[str]]:
+    """SQL statements executed on the test database while the test runs"""
+    executed: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore[no-untyped-def]
+        executed.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+class TestPostRepositoryAuthors:
+    """Author usernames resolved for listed posts"""
+
+    def _seed(self, db: Session, posts: int) -> None:
+        for i in range(posts):
+            user_id = 100 + i
+            db.add(UserModel(id=user_id, username=f"writer{i}", password_hash="x"))
+            db.add(PostModel(author_id=user_id, title=f"Post {i}", content="..."))
+        db.commit()
+
+    @pytest.mark.parametrize("posts", [3, 30])
+    def test_feed_query_count_is_independent_of_size(
+        self, db: Session, statements: List[str], posts: int
+    ) -> None:
+        """One query for the page and one batched lookup for every author"""
+        self._seed(db, posts)
+        repo = SqlAlchemyPostRepository(db)
+        statements.clear()
+
+        page = repo.list_page(limit=50)
+
+        assert len(page.items) == posts
+        assert all(p.author_username == f"writer{p.author_id - 100}" for p in page.items)
+        assert len(statements) == 2
+
+    def test_cached_authors_are_not_queried_again(
+        self, db: Session, statements: List[str]
+    ) -> None:
+        """A warm cache leaves only the page query"""
+        self._seed(db, 5)
+        cache: "TTLCache[int, str]" = TTLCache(max_entries=100, ttl_seconds=60)
+        SqlAlchemyPostRepository(db, cache).list_recent()
+        statements.clear()
+
+        posts = SqlAlchemyPostRepository(db, cache).list_recent()
+
+        assert [p.author_username for p in posts] == [f"writer{i}" for i in range(4, -1, -1)]
+        assert len(statements) == 1
+
+    def test_get_by_id_and_search_include_author(self, db: Session) -> None:
+        """Single posts and search hits carry the username too"""
+        repo = SqlAlchemyPostRepository(db)
+        post = repo.add(Post(id=None, author_id=1, title="Hello", content="findme"))
+        assert post.id is not None
+
+        fetched = repo.get_by_id(post.id)
+        assert fetched is not None and fetched.author_username == "author"
+        assert [hit.post.author_username for hit in repo.search("findme").hits] == ["author"]
+
+
+class TestPostRepositoryBulkAdd:
+    """Many posts inserted with one executemany"""
+
+    def test_bulk_add_keeps_timestamps_and_indexes_for_search(
+        self, db: Session, statements: List[str]
+    ) -> None:
+        """One INSERT for the batch; the search triggers still fire per row"""
+        start = datetime(2019, 5, 1)
+        posts = [
+            Post(
+                id=None,
+                author_id=1,
+                title=f"Imported {i}",
+                content="archived words",
+                created_at=start + timedelta(minutes=i),
+            )
+            for i in range(50)
+        ]
+        repo = SqlAlchemyPostRepository(db)
+
+        assert repo.bulk_add(posts) == 50
+
+        assert len([s for s in statements if s.startswith("INSERT INTO posts")]) == 1
+        assert repo.list_recent(limit=1)[0].created_at == start + timedelta(minutes=49)
+        assert len(repo.search("archived", limit=100).hits) == 50
+        assert repo.bulk_add([]) == 0
+
+
+class TestPostRepositoryIterAll:
+    """Every post streamed in keyset batches"""
+
+    def test_iter_all_reads_in_batches_oldest_first(
+        self, db: Session, statements: List[str]
+    ) -> None:
+        """One bounded query per batch, with authors filled in"""
+        repo = SqlAlchemyPostRepository(db)
+        repo.bulk_add([Post(id=None, author_id=1, title=f"P{i}", content="c") for i in range(25)])
+        statements.clear()
+
+        posts = list(repo.iter_all(batch_size=10))
+
+        assert [p.title for p in posts] == [f"P{i}" for i in range(25)]
+        assert {p.author_username for p in posts} == {"author"}
+        post_queries = [s for s in statements if "FROM posts" in s]
+        assert len(post_queries) == 3
+        assert all("LIMIT" in s for s in post_queries)
+
+    def test_iter_all_holds_no_transaction_between_batches(self, db: Session) -> None:
+        """A slow consumer doesn't keep one read snapshot open throughout"""
+        repo = SqlAlchemyPostRepository(db)
+        repo.bulk_add([Post(id=None, author_id=1, title=f"P{i}", content="c") for i in range(15)])
+        posts = repo.iter_all(batch_size=10)
+
+        next(posts)
+
+        assert not db.in_transaction()
+        assert len(list(posts)) == 14
+
+
+class TestPostRepositoryImageVariants:
+    """Rendered image variants stored alongside image_path"""
+
+    def test_variants_round_trip_with_int_widths(self, db: Session) -> None:
+        """Widths come back as ints even though JSON keys are strings"""
+        repo = SqlAlchemyPostRepository(db)
+        post_id = repo.add(
+            Post(id=None, author_id=1, title="t", content="c", image_path="a.png")
+        ).id
+        assert post_id is not None
+        fresh = repo.get_by_id(post_id)
+        assert fresh is not None and fresh.image_variants == {}
+
+        repo.set_image_variants(post_id, {320: "a.w320.webp", 640: "a.w640.webp"})
+        db.expire_all()
+
+        stored = repo.get_by_id(post_id)
+        assert stored is not None
+        assert stored.image_variants == {320: "a.w320.webp", 640: "a.w640.webp"}
+
+
+class TestPostRepositorySearch:
+    """Full-text search through the posts_fts index"""
+
+    def _add(self, repo: SqlAlchemyPostRepository, title: str, content: str) -> int:
+        post = repo.add(Post(id=None, author_id=1, title=title, content=content))
+        assert post.id is not None
+        return post.id
+
+    def test_title_matches_outrank_body_matches(self, db: Session) -> None:
+        """Title hits are weighted above body hits and snippets mark the match"""
+        repo = SqlAlchemyPostRepository(db)
+        body_id = self._add(repo, "Weekend notes", "Went running by the river.")
+        title_id = self._add(repo, "Running shoes", "A review of trail footwear.")
+        self._add(repo, "Cooking", "Soup again.")
+
+        page = repo.search("run")
+
+        assert [hit.post.id for hit in page.hits] == [title_id, body_id]
+        assert f"{HIGHLIGHT_START}running{HIGHLIGHT_END}" in page.hits[1].snippet
+        assert page.next_cursor is None
+
+    def test_search_pages_with_cursor(self, db: Session) -> None:
+        """Every match is returned exactly once across pages"""
+        repo = SqlAlchemyPostRepository(db)
+        ids = {self._add(repo, f"Post {i}", "shared keyword") for i in range(5)}
+
+        first = repo.search("keyword", limit=2)
+        second = repo.search("keyword", limit=2, cursor=first.next_cursor)
+        third = repo.search("keyword", limit=2, cursor=second.next_cursor)
+
+        seen = [hit.post.id for page in (first, second, third) for hit in page.hits]
+        assert sorted(seen) == sorted(ids)
+        assert third.next_cursor is None
+
+    def test_common_terms_are_listed_newest_first(
+        self, db: Session, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """A term in too many posts to rank cheaply pages by id instead"""
+        monkeypatch.setattr(repositories, "RANKED_TERM_POSTS_MAX", 3)
+        repo = SqlAlchemyPostRepository(db)
+        ids = [self._add(repo, f"Post {i}", "everywhere") for i in range(5)]
+        rare_id = self._add(repo, "Rare", "everywhere once")
+
+        first = repo.search("everywhere", limit=4)
+        second = repo.search("everywhere", limit=4, cursor=first.next_cursor)
+
+        seen = [hit.post.id for page in (first, second) for hit in page.hits]
+        assert seen == [rare_id, *reversed(ids)]
+        assert second.next_cursor is None
+        # Every term of a query has to be rare enough for it to be ranked.
+        assert [hit.post.id for hit in repo.search("everywhere once").hits] == [rare_id]
+
+    def test_query_syntax_is_not_interpreted(self, db: Session) -> None:
+        """FTS operators and stray quotes in user input are treated as words"""
+        repo = SqlAlchemyPostRepository(db)
+        self._add(repo, "Hello", "world")
+
+        assert repo.search('hello" OR "x').hits == []
+        assert [hit.post.title for hit in repo.search('"hello').hits] == ["Hello"]
+        assert repo.search("  *** ").hits == []
+
+    def test_index_follows_updates_and_deletes(self, db: Session) -> None:
+        """Triggers keep the index in step with the posts table"""
+        repo = SqlAlchemyPostRepository(db)
+        post_id = self._add(repo, "Draft", "placeholder text")
+
+        row = db.get(PostModel, post_id)
+        assert row is not None
+        row.content = "final wording"
+        db.commit()
+        assert repo.search("placeholder").hits == []
+        assert [hit.post.id for hit in repo.search("wording").hits] == [post_id]
+
+        db.delete(row)
+        db.commit()
+        assert repo.search("wording").hits == []
+
+    def test_rejects_invalid_cursor(self, db: Session) -> None:
+        """A malformed cursor surfaces as ValueError"""
+        repo = SqlAlchemyPostRepository(db)
+        with pytest.raises(ValueError):
+            repo.search("anything", cursor="%%%")
+
+
+class TestSessionRepositoryExpiry:
+    """Expiry, revocation and batched purges of the sessions table"""
+
+    NOW = datetime(2024, 6, 1)
+
+    def _add_session(
+        self, db: Session, session_id: str, age: timedelta, idle: Optional[timedelta], user_id: int = 1
+    ) -> None:
+        # Core insert, so a None last_seen_at stays NULL like on rows
+        # created before the column existed.
+        db.execute(
+            insert(SessionModel).values(
+                id=session_id,
+                user_id=user_id,
+                created_at=self.NOW - age,
+                last_seen_at=None if idle is None else self.NOW - idle,
+            )
+        )
+        db.commit()
+
+    def test_delete_expired_honours_both_cutoffs(self, db: Session) -> None:
+        """Old, idle and legacy never-seen sessions go; active ones stay"""
+        self._add_session(db, "fresh", timedelta(hours=1), timedelta(minutes=1))
+        self._add_session(db, "too-old", timedelta(days=40), timedelta(minutes=1))
+        self._add_session(db, "idle", timedelta(days=9), timedelta(days=8))
+        self._add_session(db, "legacy-idle", timedelta(days=8), None)
+        self._add_session(db, "legacy-fresh", timedelta(hours=2), None)
+        repo = SqlAlchemySessionRepository(db)
+
+        deleted = repo.delete_expired(
+            self.NOW - timedelta(days=30), self.NOW - timedelta(days=7), limit=100
+        )
+
+        assert set(db.scalars(select(SessionModel.id))) == {"fresh", "legacy-fresh"}
+        assert deleted == 3
+
+    def test_delete_expired_is_bounded_by_limit(self, db: Session) -> None:
+        """One call never deletes more than one batch"""
+        for i in range(7):
+            self._add_session(db, f"s{i}", timedelta(days=40), None)
+        repo = SqlAlchemySessionRepository(db)
+
+        assert repo.delete_expired(self.NOW - timedelta(days=30), None, limit=5) == 5
+        assert repo.delete_expired(self.NOW - timedelta(days=30), None, limit=5) == 2
+
+    def test_delete_for_user_returns_revoked_ids(
+        self, db: Session, statements: List[str]
+    ) -> None:
+        """Only the given user's sessions are removed, in one statement"""
+        db.add(UserModel(id=2, username="other", password_hash="x"))
+        self._add_session(db, "a", timedelta(0), None)
+        self._add_session(db, "b", timedelta(0), None)
+        self._add_session(db, "c", timedelta(0), None, user_id=2)
+        repo = SqlAlchemySessionRepository(db)
+
+        db.commit()
+        statements.clear()
+
+        assert sorted(repo.delete_for_user(1)) == ["a", "b"]
+        assert len([s for s in statements if "sessions" in s]) == 1
+        assert list(db.scalars(select(SessionModel.id))) == ["c"]
+
+    def test_reaper_drains_backlog_in_batches(self, db: Session, statements: List[str]) -> None:
+        """The reaper loops over small batches until nothing expired is left"""
+        for i in range(12):
+            self._add_session(db, f"old{i}", timedelta(days=10), timedelta(days=10))
+        self._add_session(db, "active", timedelta(days=1), timedelta(minutes=3))
+        reaper = SessionReaper(
+            sessionmaker(bind=db.get_bind()),
+            SessionPolicy(idle_ttl=timedelta(days=7)),
+            batch_size=5,
+            pause_seconds=0,
+            clock=lambda: self.NOW,
+        )
+        statements.clear()
+
+        assert reaper.reap() == 12
+
+        deletes = [s for s in statements if s.startswith("DELETE")]
+        assert len(deletes) == 3
+        assert list(db.scalars(select(SessionModel.id))) == ["active"]
@@ -0,0 +1,150 @@
+"""Tests for the versioned schema check run at startup"""
+import threading
+from pathlib import Path
+from typing import Generator, List, Optional
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.config import Settings
+from app.infrastructure import schema
+from app.infrastructure.db import create_sqlite_engine
+from app.infrastructure.schema import (
+    SCHEMA_VERSION,
+    ensure_schema,
+    schema_fingerprint,
+    schema_version,
+)
+from app.infrastructure.sql_instrumentation import query_budget
+
+# The models as of each SCHEMA_VERSION. A failure here means the models
+# changed: bump SCHEMA_VERSION and pin the new fingerprint under it.
+FINGERPRINTS = {1: "eb3c10f94cb67221", 2: "2a4ea491a0f8a67b"}
+
+
+@pytest.fixture
+def engine(tmp_path: Path) -> Generator[Engine, None, None]:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}", Settings())
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def test_models_match_the_schema_version() -> None:
+    assert schema_fingerprint() == FINGERPRINTS[SCHEMA_VERSION]
+
+
+def test_new_database_is_created_and_versioned(engine: Engine) -> None:
+    assert schema_version(engine) == 0
+
+    assert ensure_schema(engine) is True
+
+    assert schema_version(engine) == SCHEMA_VERSION
+    tables = set(inspect(engine).get_table_names())
+    assert {"users", "posts", "sessions", "posts_fts"} <= tables
+
+
+def test_current_database_costs_one_query(engine: Engine) -> None:
+    """No reflection or DDL once the recorded version is current"""
+    ensure_schema(engine)
+
+    with query_budget(1):
+        assert ensure_schema(engine) is False
+
+
+def test_unversioned_database_gets_missing_columns(engine: Engine) -> None:
+    """Databases from before versioning are upgraded in place"""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE posts (id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, "
+                "title VARCHAR(200) NOT NULL, content TEXT NOT NULL, created_at DATETIME NOT NULL)"
+            )
+        )
+        conn.execute(
+            text("INSERT INTO posts VALUES (1, 1, 'Old', 'post', '2020-01-01 00:00:00')")
+        )
+
+    assert ensure_schema(engine) is True
+
+    columns = {column["name"] for column in inspect(engine).get_columns("posts")}
+    assert {"image_path", "image_variants"} <= columns
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT title FROM posts")).scalar() == "Old"
+        # The search index is filled from existing posts.
+        hits = conn.execute(text("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'old'"))
+        assert hits.scalars().all() == [1]
+
+
+def test_newer_database_is_left_alone(engine: Engine) -> None:
+    """A database a newer build already upgraded keeps its version"""
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION + 1}"))
+
+    assert ensure_schema(engine) is False
+
+    assert schema_version(engine) == SCHEMA_VERSION + 1
+    assert inspect(engine).get_table_names() == []
+
+
+def test_migrations_run_once_for_versions_above_the_database(
+    engine: Engine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ran: List[int] = []
+    monkeypatch.setattr(schema, "SCHEMA_VERSION", 3)
+    monkeypatch.setattr(
+        schema,
+        "MIGRATIONS",
+        [(version, lambda bind, version=version: ran.append(version)) for version in (1, 2, 3)],
+    )
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA user_version = 1"))
+
+    assert schema.ensure_schema(engine) is True
+    assert schema.ensure_schema(engine) is False
+
+    assert ran == [2, 3]
+    assert schema_version(engine) == 3
+
+
+def test_failed_upgrade_leaves_nothing_behind(
+    engine: Engine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tables created before a failing step are rolled back with it"""
+
+    def broken(conn: object) -> None:
+        raise RuntimeError("migration failed")
+
+    monkeypatch.setattr(schema, "MIGRATIONS", [(SCHEMA_VERSION, broken)])
+
+    with pytest.raises(RuntimeError):
+        ensure_schema(engine)
+
+    assert schema_version(engine) == 0
+    assert inspect(engine).get_table_names() == []
+
+
+def test_workers_starting_together_take_turns(tmp_path: Path) -> None:
+    """Only one of several concurrent starts on a new database upgrades it"""
+    url = f"sqlite:///{tmp_path / 'blog.sqlite3'}"
+    engines = [create_sqlite_engine(url, Settings()) for _ in range(4)]
+    results: List[Optional[bool]] = [None] * len(engines)
+    start = threading.Barrier(len(engines))
+
+    def run(index: int) -> None:
+        start.wait()
+        results[index] = ensure_schema(engines[index])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(engines))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results, key=bool) == [False, False, False, True]
+        assert schema_version(engines[0]) == SCHEMA_VERSION
+    finally:
+        for engine in engines:
+            engine.dispose()
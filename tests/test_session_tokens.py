@@ -0,0 +1,191 @@
+"""Tests for the signed-token session store"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.domain.entities import Session as DomainSession
+from app.infrastructure.db import Base
+from app.infrastructure.models import SessionRevocationModel
+from app.infrastructure.session_tokens import (
+    AsyncSignedTokenSessionRepository,
+    SessionTokenCodec,
+    SignedTokenSessionRepository,
+    TokenClaims,
+    TokenRevocationList,
+    parse_signing_keys,
+)
+
+KEY_A = ("a", b"a" * 32)
+KEY_B = ("b", b"b" * 32)
+TTL = timedelta(days=1)
+LOGIN = datetime(2024, 1, 1, 12, 0, 0)
+
+
+class FakeClock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture
+def session_factory(tmp_path: Path) -> Generator["sessionmaker[Session]", None, None]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    statements: List[str] = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    factory = sessionmaker(bind=engine)
+    factory.statements = statements  # type: ignore[attr-defined]
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock(LOGIN)
+
+
+def _repo(
+    factory: "sessionmaker[Session]", clock: FakeClock, keys=(KEY_A,), refresh_seconds: float = 0.0
+) -> SignedTokenSessionRepository:
+    revocations = TokenRevocationList(factory, refresh_seconds=refresh_seconds, clock=clock)
+    return SignedTokenSessionRepository(SessionTokenCodec(keys), revocations, TTL, clock=clock)
+
+
+def _login(repo: SignedTokenSessionRepository, user_id: int = 1) -> DomainSession:
+    return repo.add(
+        DomainSession(id="ignored", user_id=user_id, created_at=LOGIN, username=f"user{user_id}")
+    )
+
+
+class TestParseSigningKeys:
+    def test_first_key_signs(self) -> None:
+        keys = parse_signing_keys(f"new:{'n' * 32}, old:{'o' * 32}")
+        assert [key_id for key_id, _ in keys] == ["new", "old"]
+
+    @pytest.mark.parametrize(
+        "raw", ["", "nosecret", f"bad.id:{'x' * 32}", "short:tooshort", f"a:{'x' * 32},a:{'y' * 32}"]
+    )
+    def test_rejects_invalid_keys(self, raw: str) -> None:
+        with pytest.raises(ValueError):
+            parse_signing_keys(raw)
+
+
+class TestSessionTokenCodec:
+    def _claims(self) -> TokenClaims:
+        return TokenClaims("sid", 7, "alice", LOGIN, LOGIN + TTL)
+
+    def test_round_trip(self) -> None:
+        codec = SessionTokenCodec([KEY_A])
+        assert codec.verify(codec.issue(self._claims())) == self._claims()
+
+    def test_rejects_tampered_token(self) -> None:
+        codec = SessionTokenCodec([KEY_A])
+        key_id, payload, signature = codec.issue(self._claims()).split(".")
+        forged = SessionTokenCodec([("a", b"z" * 32)]).issue(
+            TokenClaims("sid", 1, "admin", LOGIN, LOGIN + TTL)
+        )
+        assert codec.verify(f"{key_id}.{forged.split('.')[1]}.{signature}") is None
+        assert codec.verify(forged) is None
+        assert codec.verify("not-a-token") is None
+
+    def test_rotation_keeps_old_tokens_valid(self) -> None:
+        old_token = SessionTokenCodec([KEY_A]).issue(self._claims())
+        rotated = SessionTokenCodec([KEY_B, KEY_A])
+        assert rotated.issue(self._claims()).startswith("b.")
+        assert rotated.verify(old_token) == self._claims()
+        assert SessionTokenCodec([KEY_B]).verify(old_token) is None
+
+
+class TestSignedTokenSessionRepository:
+    def test_verifies_without_queries(
+        self, session_factory: "sessionmaker[Session]", clock: FakeClock
+    ) -> None:
+        repo = _repo(session_factory, clock, refresh_seconds=3600)
+        token = _login(repo).id
+        repo.get(token)  # first call loads the revocation list
+        session_factory.statements.clear()  # type: ignore[attr-defined]
+        found = repo.get_with_user(token)
+        assert found is not None
+        session, user = found
+        assert (session.user_id, session.created_at) == (1, LOGIN)
+        assert (user.id, user.username) == (1, "user1")
+        assert session_factory.statements == []  # type: ignore[attr-defined]
+
+    def test_expired_token_is_rejected(
+        self, session_factory: "sessionmaker[Session]", clock: FakeClock
+    ) -> None:
+        repo = _repo(session_factory, clock)
+        token = _login(repo).id
+        clock.now = LOGIN + TTL
+        assert repo.get(token) is None
+
+    def test_logout_reaches_other_workers(
+        self, session_factory: "sessionmaker[Session]", clock: FakeClock
+    ) -> None:
+        worker_a = _repo(session_factory, clock)
+        worker_b = _repo(session_factory, clock)
+        token = _login(worker_a).id
+        assert worker_b.get(token) is not None
+        worker_a.delete(token)
+        assert worker_a.get(token) is None
+        assert worker_b.get(token) is None
+
+    def test_revoke_all_only_hits_earlier_tokens(
+        self, session_factory: "sessionmaker[Session]", clock: FakeClock
+    ) -> None:
+        repo = _repo(session_factory, clock)
+        first, other_user = _login(repo).id, _login(repo, user_id=2).id
+        clock.now = LOGIN + timedelta(minutes=1)
+        assert repo.delete_for_user(1) == []
+        assert repo.get(first) is None
+        assert repo.get(other_user) is not None
+        later = repo.add(
+            DomainSession(
+                id="x", user_id=1, created_at=clock.now + timedelta(seconds=1), username="user1"
+            )
+        )
+        assert repo.get(later.id) is not None
+
+    def test_login_right_after_revoke_all_is_valid(
+        self, session_factory: "sessionmaker[Session]", clock: FakeClock
+    ) -> None:
+        """Test that a token issued in the same second as the revoke survives it"""
+        repo = _repo(session_factory, clock)
+        clock.now = LOGIN + timedelta(minutes=1, microseconds=400_000)
+        repo.delete_for_user(1)
+        clock.now += timedelta(microseconds=100_000)
+
+        fresh = repo.add(DomainSession(id="x", user_id=1, created_at=clock.now, username="user1"))
+
+        assert repo.get(fresh.id) is not None
+
+    def test_delete_expired_prunes_revocations(
+        self, session_factory: "sessionmaker[Session]", clock: FakeClock
+    ) -> None:
+        repo = _repo(session_factory, clock)
+        repo.delete(_login(repo).id)
+        assert repo.delete_expired(None, None, limit=10) == 0
+        clock.now = LOGIN + TTL
+        assert repo.delete_expired(None, None, limit=10) == 1
+        with session_factory() as db:
+            assert db.execute(select(SessionRevocationModel)).all() == []
+
+
+async def test_async_repository_logout(
+    session_factory: "sessionmaker[Session]", clock: FakeClock
+) -> None:
+    revocations = TokenRevocationList(session_factory, refresh_seconds=0.0, clock=clock)
+    repo = AsyncSignedTokenSessionRepository(SessionTokenCodec([KEY_A]), revocations, TTL, clock=clock)
+    session = await repo.add(DomainSession(id="x", user_id=3, created_at=LOGIN, username="carol"))
+    found = await repo.get_with_user(session.id)
+    assert found is not None and found[1].username == "carol"
+    await repo.delete(session.id)
+    assert await repo.get(session.id) is None
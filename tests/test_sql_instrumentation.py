@@ -0,0 +1,91 @@
+"""Tests for per-request SQL counting and the slow-query log"""
+import logging
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.infrastructure.db import Base
+from app.infrastructure.models import UserModel
+from app.infrastructure.repositories import (
+    AsyncSqlAlchemyPostRepository,
+    SqlAlchemyPostRepository,
+)
+from app.infrastructure.sql_instrumentation import (
+    collect_queries,
+    instrument_engine,
+    normalize_sql,
+    query_budget,
+)
+
+SLOW_LOGGER = "app.infrastructure.sql_instrumentation"
+
+
+def test_normalize_sql_folds_literals_and_in_lists() -> None:
+    sql = """SELECT users.id
+        FROM users WHERE users.id IN (?, ?, ?) AND name = 'o''brien' AND age > 42"""
+    assert normalize_sql(sql) == (
+        "SELECT users.id FROM users WHERE users.id IN (...) AND name = ? AND age > ?"
+    )
+
+
+def test_collectors_count_statements_and_time(tmp_path: Path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}")
+    instrument_engine(engine)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        repo = SqlAlchemyPostRepository(db)
+        with collect_queries() as outer:
+            repo.list_recent()
+            with collect_queries(keep_statements=True) as inner:
+                repo.list_recent()
+    assert (outer.count, inner.count) == (2, 1)
+    assert outer.seconds > 0
+    assert inner.statements is not None and "FROM posts" in inner.statements[0]
+
+
+def test_query_budget_reports_the_statements(tmp_path: Path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}")
+    instrument_engine(engine)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        repo = SqlAlchemyPostRepository(db)
+        with pytest.raises(AssertionError, match="2 queries run, budget is 1"):
+            with query_budget(1):
+                repo.list_recent()
+                repo.get_by_id(1)
+
+
+def test_slow_queries_are_logged_with_repository_method(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}")
+    instrument_engine(engine, slow_query_ms=1e-6)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        with caplog.at_level(logging.WARNING, logger=SLOW_LOGGER):
+            SqlAlchemyPostRepository(db).get_by_id(7)
+    assert "from repositories.SqlAlchemyPostRepository.get_by_id:" in caplog.text
+    assert "WHERE posts.id = ?" in caplog.text
+
+
+async def test_async_slow_queries_find_the_awaiting_repository(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'blog.sqlite3'}")
+    instrument_engine(engine.sync_engine, slow_query_ms=1e-6)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with async_sessionmaker(engine)() as db:
+            db.add(UserModel(id=1, username="author", password_hash="x"))
+            await db.commit()
+            with caplog.at_level(logging.WARNING, logger=SLOW_LOGGER):
+                with collect_queries() as stats:
+                    await AsyncSqlAlchemyPostRepository(db).list_recent()
+    finally:
+        await engine.dispose()
+    assert stats.count == 1
+    assert "from repositories.AsyncSqlAlchemyPostRepository.list_recent:" in caplog.text
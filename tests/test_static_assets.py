@@ -0,0 +1,86 @@
+"""Unit tests for fingerprinted static assets"""
+from pathlib import Path
+
+import pytest
+
+from app.api.static_assets import StaticAssets, choose_encoding
+
+
+@pytest.fixture
+def static_dir(tmp_path: Path) -> Path:
+    (tmp_path / "style.css").write_text("body { color: black; }\n" * 50)
+    (tmp_path / "tiny.css").write_text("a{}")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(1000))
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "photo.png").write_bytes(b"\x89PNG")
+    (tmp_path / ".hidden.css").write_text("x")
+    return tmp_path
+
+
+class TestStaticAssets:
+    """Manifest building"""
+
+    def test_url_changes_with_content(self, static_dir: Path) -> None:
+        """The fingerprint follows the file's bytes"""
+        before = StaticAssets(static_dir).url("style.css")
+        (static_dir / "style.css").write_text("body { color: red; }\n" * 50)
+        after = StaticAssets(static_dir).url("style.css")
+
+        assert before.startswith("/static/style.") and before.endswith(".css")
+        assert before != after
+
+    def test_unknown_and_excluded_paths_keep_plain_urls(self, static_dir: Path) -> None:
+        """Only files the manifest knows are rewritten"""
+        assets = StaticAssets(static_dir, exclude=("uploads",))
+
+        assert assets.url("uploads/photo.png") == "/static/uploads/photo.png"
+        assert assets.url("missing.js") == "/static/missing.js"
+        assert assets.url(".hidden.css") == "/static/.hidden.css"
+
+    def test_only_worthwhile_text_is_compressed(self, static_dir: Path) -> None:
+        """Small files and binary formats are served as they are"""
+        assets = StaticAssets(static_dir)
+
+        def codings(name: str) -> set:
+            asset = assets.get(assets.url(name)[len("/static/"):])
+            assert asset is not None
+            return set(asset.bodies)
+
+        assert "gzip" in codings("style.css")
+        assert codings("tiny.css") == {"identity"}
+        assert codings("logo.png") == {"identity"}
+
+    def test_brotli_when_available(self, static_dir: Path) -> None:
+        """Brotli bodies are built when the optional package is installed"""
+        pytest.importorskip("brotli")
+        assets = StaticAssets(static_dir)
+        asset = assets.get(assets.url("style.css")[len("/static/"):])
+        assert asset is not None and "br" in asset.bodies
+
+    def test_version_tracks_every_asset(self, static_dir: Path) -> None:
+        """Any changed asset changes the manifest version"""
+        before = StaticAssets(static_dir).version
+        (static_dir / "tiny.css").write_text("b{}")
+        assert StaticAssets(static_dir).version != before
+
+
+class TestChooseEncoding:
+    """Accept-Encoding negotiation"""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("*", "br"),
+            ("identity", "identity"),
+            ("", "identity"),
+            ("gzip;q=bogus", "identity"),
+        ],
+    )
+    def test_preference(self, header: str, expected: str) -> None:
+        assert choose_encoding(header, {"identity", "gzip", "br"}) == expected
+
+    def test_only_available_codings(self) -> None:
+        assert choose_encoding("br, gzip", {"identity", "gzip"}) == "gzip"
@@ -0,0 +1,197 @@
+"""Tests for the content-addressed image store"""
+import hashlib
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Generator, List
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.infrastructure.db import Base
+from app.infrastructure.models import ImageBlobModel, PostModel, UserModel
+from app.infrastructure import storage_cas
+from app.infrastructure.storage_cas import ContentAddressedImageStorage
+
+
+@pytest.fixture
+def session_factory(tmp_path: Path) -> Generator["sessionmaker[Session]", None, None]:
+    """Session factory over a fresh on-disk database with one user"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'blog.sqlite3'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(UserModel(id=1, username="author", password_hash="x"))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def uploads(tmp_path: Path) -> Path:
+    return tmp_path / "uploads"
+
+
+@pytest.fixture
+def storage(
+    uploads: Path, session_factory: "sessionmaker[Session]"
+) -> ContentAddressedImageStorage:
+    return ContentAddressedImageStorage(uploads, session_factory)
+
+
+async def _stream(data: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), 100):
+        yield data[start:start + 100]
+
+
+def _files(root: Path) -> List[str]:
+    return sorted(str(p.relative_to(root)) for p in root.rglob("*") if p.is_file())
+
+
+def _blob(factory: "sessionmaker[Session]", sha256: str) -> ImageBlobModel:
+    with factory() as db:
+        return db.scalars(select(ImageBlobModel).where(ImageBlobModel.sha256 == sha256)).one()
+
+
+def _add_post(factory: "sessionmaker[Session]", image_path: str) -> None:
+    with factory() as db:
+        db.add(PostModel(author_id=1, title="t", content="c", image_path=image_path))
+        db.commit()
+
+
+async def test_identical_uploads_share_one_blob(
+    storage: ContentAddressedImageStorage,
+    uploads: Path,
+    session_factory: "sessionmaker[Session]",
+) -> None:
+    data = b"banner" * 100
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    first = await storage.save_image_stream("banner.PNG", _stream(data))
+    second = await storage.save_image_stream("copy.jpg", _stream(data))
+    third = storage.save_image("again.png", data)
+
+    assert first is not None and second is not None
+    assert first.path == second.path == third == f"{sha256[:2]}/{sha256[2:4]}/{sha256}.png"
+    assert _files(uploads) == [first.path]
+    assert (uploads / first.path).read_bytes() == data
+    assert _blob(session_factory, sha256).ref_count == 3
+
+
+async def test_garbage_collection_keeps_referenced_and_recent_blobs(
+    storage: ContentAddressedImageStorage,
+    uploads: Path,
+    session_factory: "sessionmaker[Session]",
+) -> None:
+    used = await storage.save_image_stream("used.png", _stream(b"used"))
+    orphan = await storage.save_image_stream("orphan.png", _stream(b"orphan"))
+    assert used is not None and orphan is not None
+    _add_post(session_factory, used.path)
+
+    report = storage.collect_garbage(grace_seconds=3600)
+    assert report.blobs_removed == 0
+
+    later = datetime.utcnow() + timedelta(hours=2)
+    report = storage.collect_garbage(grace_seconds=3600, now=later)
+
+    assert (report.blobs_checked, report.blobs_removed, report.bytes_freed) == (2, 1, 6)
+    assert _files(uploads) == [used.path]
+    assert _blob(session_factory, used.sha256).ref_count == 1
+    assert not (uploads / orphan.path).parent.exists()
+
+
+def test_save_racing_with_garbage_collection_keeps_its_blob(
+    storage: ContentAddressedImageStorage,
+    uploads: Path,
+    session_factory: "sessionmaker[Session]",
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A save landing between GC's DELETE and its unlink still has its file"""
+    data = b"orphan, then reposted"
+    path = storage.save_image("old.png", data)
+    unlink_blob = storage._unlink_blob
+    racing: List[threading.Thread] = []
+
+    def unlink_with_a_save_in_between(blob: str) -> None:
+        thread = threading.Thread(target=storage.save_image, args=("new.png", data))
+        thread.start()
+        racing.append(thread)
+        # Long enough for the save to reach the database and wait there.
+        thread.join(0.2)
+        unlink_blob(blob)
+
+    monkeypatch.setattr(storage, "_unlink_blob", unlink_with_a_save_in_between)
+
+    later = datetime.utcnow() + timedelta(hours=2)
+    assert storage.collect_garbage(grace_seconds=3600, now=later).blobs_removed == 1
+    racing[0].join()
+
+    assert (uploads / path).read_bytes() == data
+    assert _blob(session_factory, hashlib.sha256(data).hexdigest()).ref_count == 1
+
+
+def test_save_recreates_a_shard_emptied_by_garbage_collection(
+    storage: ContentAddressedImageStorage,
+    uploads: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """GC may remove the shard directory between a save's mkdir and rename"""
+    replace = os.replace
+    calls: List[str] = []
+
+    def replace_after_gc(source: str, target: str) -> None:
+        calls.append(target)
+        if len(calls) == 1:
+            shutil.rmtree(Path(target).parent.parent)
+        replace(source, target)
+
+    monkeypatch.setattr(storage_cas.os, "replace", replace_after_gc)
+
+    path = storage.save_image("a.png", b"sharded")
+
+    assert len(calls) == 2
+    assert (uploads / path).read_bytes() == b"sharded"
+
+
+async def test_deleting_an_image_drops_one_reference(
+    storage: ContentAddressedImageStorage,
+    uploads: Path,
+    session_factory: "sessionmaker[Session]",
+) -> None:
+    """A shared blob stays on disk for the uploads still holding it"""
+    first = await storage.save_image_stream("a.png", _stream(b"shared"))
+    await storage.save_image_stream("b.png", _stream(b"shared"))
+    assert first is not None
+
+    storage.delete_image(first.path)
+
+    assert _blob(session_factory, first.sha256).ref_count == 1
+    assert _files(uploads) == [first.path]
+
+
+def test_migration_dedupes_flat_uploads_and_repoints_posts(
+    storage: ContentAddressedImageStorage,
+    uploads: Path,
+    session_factory: "sessionmaker[Session]",
+) -> None:
+    (uploads / "aaa.png").write_bytes(b"same")
+    (uploads / "bbb.png").write_bytes(b"same")
+    (uploads / "ccc.gif").write_bytes(b"different")
+    for name in ("aaa.png", "bbb.png", "bbb.png", "ccc.gif"):
+        _add_post(session_factory, name)
+
+    report = storage.migrate_flat_uploads()
+
+    assert (report.files_seen, report.blobs_created, report.duplicates_removed) == (3, 2, 1)
+    assert report.bytes_freed == 4
+    same = hashlib.sha256(b"same").hexdigest()
+    assert len(_files(uploads)) == 2
+    with session_factory() as db:
+        paths = db.scalars(select(PostModel.image_path).order_by(PostModel.id)).all()
+    assert paths[:3] == [f"{same[:2]}/{same[2:4]}/{same}.png"] * 3
+    assert all((uploads / path).exists() for path in paths)
+    assert _blob(session_factory, same).ref_count == 3
+    assert storage.migrate_flat_uploads().files_seen == 0
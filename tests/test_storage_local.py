@@ -0,0 +1,51 @@
+"""Tests for local image storage"""
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator, List
+
+import pytest
+
+from app.domain.interfaces import ImageTooLarge
+from app.infrastructure.storage_local import LocalImageStorage
+
+
+async def _stream(parts: List[bytes]) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+async def test_stream_is_written_atomically_with_hash(tmp_path: Path) -> None:
+    storage = LocalImageStorage(tmp_path)
+    parts = [b"a" * 1000, b"b" * 1000, b"c"]
+
+    stored = await storage.save_image_stream("cat.png", _stream(parts))
+
+    assert stored is not None
+    assert stored.path.endswith(".png")
+    assert stored.size_bytes == 2001
+    assert stored.sha256 == hashlib.sha256(b"".join(parts)).hexdigest()
+    assert (tmp_path / stored.path).read_bytes() == b"".join(parts)
+    assert [p.name for p in tmp_path.iterdir()] == [stored.path]
+
+
+async def test_oversized_stream_is_rejected_midway(tmp_path: Path) -> None:
+    storage = LocalImageStorage(tmp_path, max_bytes=1500)
+    consumed: List[int] = []
+
+    async def chunks() -> AsyncIterator[bytes]:
+        for i in range(10):
+            consumed.append(i)
+            yield b"x" * 1000
+
+    with pytest.raises(ImageTooLarge):
+        await storage.save_image_stream("big.png", chunks())
+
+    assert consumed == [0, 1]
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_empty_stream_stores_nothing(tmp_path: Path) -> None:
+    storage = LocalImageStorage(tmp_path)
+
+    assert await storage.save_image_stream("empty.png", _stream([])) is None
+    assert list(tmp_path.iterdir()) == []
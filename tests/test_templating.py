@@ -0,0 +1,89 @@
+"""Tests for the template environment: bytecode cache, reloads and timings"""
+
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from app.api.templating import (
+    TemplateEnvironment,
+    build_templates,
+    precompile_templates,
+)
+
+
+@pytest.fixture
+def template_dir(tmp_path: Path) -> Path:
+    directory = tmp_path / "templates"
+    directory.mkdir()
+    (directory / "base.html").write_text("<main>{% block body %}{% endblock %}</main>")
+    (directory / "page.html").write_text(
+        '{% extends "base.html" %}{% block body %}Hi {{ name }}{% endblock %}'
+    )
+    return directory
+
+
+class TestTemplating:
+    """Test cases for the template environment"""
+
+    def test_renders_are_timed_by_template(
+        self, template_dir: Path, tmp_path: Path
+    ) -> None:
+        """Test that only the requested template is timed, its layout included"""
+        renders: List[Tuple[float, str]] = []
+        templates = build_templates(
+            template_dir, None, on_render=lambda s, n: renders.append((s, n))
+        )
+
+        html = templates.get_template("page.html").render(name="<you>")
+
+        assert html == "<main>Hi &lt;you&gt;</main>"
+        assert [name for _, name in renders] == ["page.html"]
+        assert renders[0][0] >= 0
+
+    def test_precompiled_bytecode_survives_a_restart(
+        self, template_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a restarted environment loads every template without compiling it"""
+        cache_dir = tmp_path / "cache"
+        templates = build_templates(template_dir, cache_dir)
+        assert not cache_dir.exists()
+        assert precompile_templates(templates.env) == 2
+        assert len(list(cache_dir.iterdir())) == 2
+
+        def no_compiling(*args: object, **kwargs: object) -> None:
+            raise AssertionError("template compiled despite the bytecode cache")
+
+        restarted = build_templates(template_dir, cache_dir)
+        monkeypatch.setattr(TemplateEnvironment, "compile", no_compiling)
+
+        assert precompile_templates(restarted.env) == 2
+        assert (
+            restarted.get_template("page.html").render(name="again")
+            == "<main>Hi again</main>"
+        )
+
+    def test_edits_need_a_restart_unless_auto_reload(
+        self, template_dir: Path, tmp_path: Path
+    ) -> None:
+        """Test that edits need a restart unless auto_reload checks the source"""
+        cache_dir = tmp_path / "cache"
+        fixed = build_templates(template_dir, cache_dir)
+        live = build_templates(template_dir, cache_dir, auto_reload=True)
+        precompile_templates(fixed.env)
+        precompile_templates(live.env)
+
+        (template_dir / "page.html").write_text(
+            '{% extends "base.html" %}{% block body %}Bye {{ name }}{% endblock %}'
+        )
+        # Reloads compare modification times, which may be coarse.
+        mtime = (template_dir / "page.html").stat().st_mtime + 10
+        os.utime(template_dir / "page.html", (mtime, mtime))
+
+        assert fixed.get_template("page.html").render(name="x") == "<main>Hi x</main>"
+        assert live.get_template("page.html").render(name="x") == "<main>Bye x</main>"
+        restarted = build_templates(template_dir, cache_dir)
+        assert (
+            restarted.get_template("page.html").render(name="x") == "<main>Bye x</main>"
+        )
@@ -0,0 +1,61 @@
+"""Tests for the in-process TTL cache"""
+
+from typing import List
+
+from app.infrastructure.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl() -> None:
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(max_entries=4, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats().evictions == 1
+
+
+def test_pop_and_pop_where() -> None:
+    cache: TTLCache[str, int] = TTLCache(max_entries=8, ttl_seconds=60)
+    for i, key in enumerate("abcd"):
+        cache.set(key, i)
+
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+
+    dropped = cache.pop_where(lambda key, value: value % 2 == 1)
+    assert dropped == 2
+    remaining: List[str] = [key for key in "abcd" if cache.get(key) is not None]
+    assert remaining == ["c"]
+
+
+def test_zero_capacity_disables_caching() -> None:
+    cache: TTLCache[str, int] = TTLCache(max_entries=0, ttl_seconds=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None